@@ -1,22 +1,44 @@
 ﻿import os
+import sys
+import uuid
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from functools import partial
 from pathlib import Path
 
-import joblib
-import streamlit as st
-import pandas as pd
-import numpy as np
-import pydeck as pdk
-import google.generativeai as genai
-
 # ============================================================
 # REPO ROOT (define early so helpers can use it)
 # ============================================================
 REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+# Cold-start profile: each phase is timed on the first run of this process
+# only and written to data/cache/startup_timing.json once the page renders.
+# Heavy optional dependencies (pydeck, google.generativeai, scikit-learn) are
+# imported where they are first used, not here.
+from regionmatch.startup import PROFILE, format_report
+
+with PROFILE.phase("import streamlit"):
+    import streamlit as st
+with PROFILE.phase("import pandas"):
+    import pandas as pd
+with PROFILE.phase("import numpy"):
+    import numpy as np
+
+with PROFILE.phase("import regionmatch"):
+    from regionmatch.base_scores import base_scores_key, evict_base_scores, get_base_scores, prepare_features
+    from regionmatch.constants import INDUSTRIES, UK_CITIES, URGENCY
+    from regionmatch.dataset import load_dataset, resolve_dataset_path
+    from regionmatch.explain import ExplanationService, build_prompt, explanation_key, gemini_model
+    from regionmatch import registry
+    from regionmatch.scenarios import ScenarioTensor, tensor_key
+    from regionmatch.scoring import Profile, Ranker, city_centre
 
 # ============================================================
 # GEMINI API CONFIG (define early so helpers can use it)
-#   - Must be BEFORE generate_explanation() to avoid NameError
+#   - Must be BEFORE request_explanation() to avoid NameError
 #   - Prefer Streamlit secrets, fallback to env var
+#   - The SDK itself is imported and configured on the first explanation request
 # ============================================================
 GEMINI_API_KEY = ""
 try:
@@ -28,11 +50,7 @@ except Exception:
 if not GEMINI_API_KEY:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 
-if GEMINI_API_KEY:
-    genai.configure(api_key= GEMINI_API_KEY)
-    gemini_available = True
-else:
-    gemini_available = False
+gemini_available = bool(GEMINI_API_KEY)
 
 # ============================================================
 # Page config
@@ -230,166 +248,75 @@ select {
 """, unsafe_allow_html=True)
 
 # ============================================================
-# CITY DATA (Expanded list)
-# ============================================================
-UK_CITIES = [
-    # England
-    ("London", -0.1276, 51.5072),
-    ("Birmingham", -1.8904, 52.4862),
-    ("Manchester", -2.2426, 53.4808),
-    ("Leeds", -1.5491, 53.8008),
-    ("Liverpool", -2.9916, 53.4084),
-    ("Bristol", -2.5879, 51.4545),
-    ("Sheffield", -1.4701, 53.3811),
-    ("Newcastle upon Tyne", -1.6178, 54.9783),
-    ("Nottingham", -1.1505, 52.9548),
-    ("Leicester", -1.1332, 52.6369),
-    ("Southampton", -1.4043, 50.9097),
-    ("Portsmouth", -1.0873, 50.8198),
-    ("Brighton", -0.1364, 50.8225),
-    ("Cambridge", 0.1218, 52.2053),
-    ("Oxford", -1.2577, 51.7520),
-    ("Reading", -0.9781, 51.4543),
-    ("Milton Keynes", -0.7594, 52.0406),
-    ("Luton", -0.4176, 51.8797),
-    ("Peterborough", -0.2420, 52.5695),
-    ("Norwich", 1.2974, 52.6309),
-    ("Ipswich", 1.1555, 52.0567),
-    ("York", -1.0815, 53.9590),
-    ("Hull", -0.3367, 53.7457),
-    ("Middlesbrough", -1.2348, 54.5742),
-    ("Sunderland", -1.3822, 54.9069),
-    ("Derby", -1.4766, 52.9225),
-    ("Stoke-on-Trent", -2.1794, 53.0027),
-    ("Wolverhampton", -2.1276, 52.5862),
-    ("Coventry", -1.5106, 52.4068),
-    ("Northampton", -0.8901, 52.2405),
-    ("Cheltenham", -2.0713, 51.8994),
-    ("Swindon", -1.7809, 51.5558),
-    ("Exeter", -3.5339, 50.7184),
-    ("Plymouth", -4.1427, 50.3755),
-    ("Bournemouth", -1.8795, 50.7192),
-
-    # Wales
-    ("Cardiff", -3.1791, 51.4816),
-    ("Swansea", -3.9436, 51.6214),
-    ("Newport", -2.9984, 51.5842),
-
-    # Scotland
-    ("Edinburgh", -3.1883, 55.9533),
-    ("Glasgow", -4.2518, 55.8642),
-    ("Aberdeen", -2.0943, 57.1497),
-    ("Dundee", -2.9707, 56.4620),
-    ("Inverness", -4.2247, 57.4778),
-
-    # Northern Ireland
-    ("Belfast", -5.9301, 54.5973),
-    ("Derry/Londonderry", -7.3092, 54.9966),
-]
+# CITY DATA (Expanded list, see regionmatch/constants.py)
+# ============================================================
 cities_df = pd.DataFrame(UK_CITIES, columns=["city", "lng", "lat"])
 
-INDUSTRIES = [
-    "Technology", "Creative", "Innovation",
-    "Business Services", "Retail/Hospitality", "Industrial/Logistics"
-]
-URGENCY = ["<3 months", "3-6 months", "6+ months"]
-
 # ============================================================
 # MAP CONFIG
 # ============================================================
 MAP_STYLE = "https://basemaps.cartocdn.com/gl/dark-matter-gl-style/style.json"
 MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN", "")
 
+# Longest a rerun waits for an explanation before leaving it to finish in the background
+EXPLANATION_TIMEOUT_S = 60
+
+# Default for the "prefetch all top areas" toggle (costs up to 5 model calls per ranking)
+PREFETCH_EXPLANATIONS = os.getenv("REGIONMATCH_PREFETCH_EXPLANATIONS", "").lower() in ("1", "true", "yes")
+
 # ============================================================
 # HELPERS
 # ============================================================
-def clamp(v, lo, hi):
-    return max(lo, min(hi, v))
-
-def clamp_to_uk(lng, lat):
-    return clamp(lng, -8.8, 2.3), clamp(lat, 49.8, 60.9)
-
-def haversine_km(lat1, lon1, lat2, lon2):
-    """Vectorized Haversine distance (km)."""
-    R = 6371.0
-    lat1 = np.radians(np.asarray(lat1, dtype=float))
-    lon1 = np.radians(np.asarray(lon1, dtype=float))
-    lat2 = np.radians(float(lat2))
-    lon2 = np.radians(float(lon2))
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = np.sin(dlat/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin(dlon/2)**2
-    return 2 * R * np.arcsin(np.sqrt(a))
-
-def minmax_series(s):
-    s = pd.to_numeric(s, errors="coerce")
-    if s.nunique(dropna=True) <= 1:
-        return pd.Series(np.zeros(len(s)), index=s.index)
-    return (s - s.min()) / (s.max() - s.min())
-
-def generate_explanation(lad_name, score, lad_data, industry, employees, urgency):
-    """Generate a human-readable explanation using Gemini API."""
-    if not gemini_available:
-        return "API key not configured. Please set GEMINI_API_KEY to enable AI explanations."
+def explanation_job(lad_name, score, lad_data, industry, employees, urgency):
+    """(cache key, prompt) for one area's explanation."""
+    area = lad_data.get("lad_code", lad_name)
+    key = explanation_key(area, score, industry, employees, urgency)
+    prompt = build_prompt(lad_name, score, lad_data, industry, employees, urgency)
+    return key, prompt
 
-    try:
-        context_fields = []
-        for col in [
-            "core_tech_density", "creative_density", "innovation_density",
-            "business_services_density", "job_liquidity_score_1_10",
-            "reddit_sentiment_score_1_10", "approval_rate",
-            "median_decision_days", "business_density",
-            "micro_ratio", "sme_ratio", "large_ratio", "scaling_index"
-        ]:
-            if col in lad_data.index:
-                val = lad_data.get(col, "N/A")
-                if isinstance(val, (int, float, np.floating)) and not pd.isna(val):
-                    context_fields.append(f"{col}: {float(val):.2f}")
-
-        context = "\n".join(context_fields) if context_fields else "Standard metrics"
-
-        prompt = f"""Explain why '{lad_name}' received a compatibility score of {round(float(score), 2)}/100 for a {industry} business with {employees} employees looking to expand with a {urgency} hiring timeline.
-
-Key metrics for {lad_name}:
-{context}
-
-Provide a concise, professional explanation (2-3 sentences) that a business owner would understand. Focus on why this location is a good fit for their specific needs. Be positive but honest."""
-
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        return getattr(response, "text", "").strip() or "No explanation returned."
-    except Exception as e:
-        return f"Error generating explanation: {str(e)}"
-
-def safe_dataset_path():
-    """Prefer geo -> clean -> v1, checking repo and processed folders."""
-    candidates = [
-        REPO_ROOT / "data" / "processed" / "training_data_geo.csv",
-        REPO_ROOT / "training_data_geo.csv",
-        REPO_ROOT / "data" / "processed" / "training_data_clean.csv",
-        REPO_ROOT / "training_data_clean.csv",
-        REPO_ROOT / "training_data_v1.csv",
-    ]
-    for path in candidates:
-        if path.exists():
-            return str(path)
-    raise FileNotFoundError("No training dataset found in expected locations.")
+def request_explanation(lad_name, score, lad_data, industry, employees, urgency):
+    """Start (or join an identical in-flight) Gemini explanation; returns a Future."""
+    key, prompt = explanation_job(lad_name, score, lad_data, industry, employees, urgency)
+    return load_explanation_service().submit(key, prompt)
 
 # ============================================================
 # LOAD MODEL & DATA
 # ============================================================
-@st.cache_resource
-def load_model():
-    model = joblib.load(REPO_ROOT / "models" / "location_model.joblib")
-    features = joblib.load(REPO_ROOT / "models" / "model_features.joblib")
-    return model, features
+# Model versions come from the registry (regionmatch/registry.py). Every rerun
+# reads its CURRENT pointer, so a newly published version is picked up without a
+# restart; a run already in progress finishes on the version it started with.
+# Two versions stay cached so sessions mid-switch do not reload the old one.
+@st.cache_resource(max_entries=2)
+def load_model(version):
+    """NumPy linear scorer when exported (no scikit-learn), else the joblib pipeline."""
+    with PROFILE.phase("load model"):
+        return registry.load_version(registry.get(version))
 
-@st.cache_data
+@st.cache_resource
 def load_data(path: str):
-    return pd.read_csv(path)
+    """One read-only (memory-mapped when a columnar artifact exists) copy per process."""
+    with PROFILE.phase("load data"):
+        return load_dataset(path)
 
-pipe, feature_list = load_model()
-DATA_PATH = safe_dataset_path()
+@st.cache_resource
+def load_explanation_service():
+    """One explanation worker pool and cache per server process, shared by all sessions."""
+    return ExplanationService(model_factory=partial(gemini_model, api_key=GEMINI_API_KEY))
+
+@st.cache_resource(max_entries=2)
+def load_score_tensor(key: str, path: str):
+    """Precomputed rankings (scripts/build/build_score_tensor.py); None if missing or stale."""
+    with PROFILE.phase("load score tensor"):
+        return ScenarioTensor.load(path, key)
+
+@st.cache_resource(max_entries=2)
+def load_ranker(scores_key: str, path: str, tensor_path: str, _base):
+    """Headless ranker (regionmatch.scoring) over the shared dataset, base scores and tensor."""
+    return Ranker(load_data(path), _base, load_score_tensor(tensor_key(scores_key), tensor_path))
+
+MODEL_VERSION = registry.current()
+pipe, feature_list, MODEL_FILES = load_model(MODEL_VERSION.version)
+DATA_PATH = resolve_dataset_path()
 df = load_data(DATA_PATH)
 
 # ============================================================
@@ -409,19 +336,18 @@ employees = st.sidebar.number_input("👥 Employees", min_value=1, max_value=100
 st.sidebar.markdown('<div class="sidebar-section"></div>', unsafe_allow_html=True)
 urgency = st.sidebar.selectbox("⏱️  Hiring Urgency", URGENCY)
 
+st.sidebar.markdown('<div class="sidebar-section"></div>', unsafe_allow_html=True)
+prefetch_explanations = st.sidebar.checkbox(
+    "⚡ Prefetch analysis for all top areas",
+    value=PREFETCH_EXPLANATIONS,
+    disabled=not gemini_available,
+    help="Generate explanations for every recommended area in the background so switching areas is instant."
+)
+
 # ============================================================
 # MAP VIEW STATE
 # ============================================================
-sel = cities_df[cities_df.city == city].iloc[0]
-target_lng, target_lat = clamp_to_uk(float(sel.lng), float(sel.lat))
-
-view_state = pdk.ViewState(
-    longitude=target_lng,
-    latitude=target_lat,
-    zoom=10.5,
-    pitch=55,
-    bearing=-15
-)
+target_lat, target_lng = city_centre(city)
 
 # ============================================================
 # MODEL SCORING
@@ -433,123 +359,47 @@ if missing_features:
         "they were added as 0 so scoring can continue."
     )
 
-X = df.reindex(columns=feature_list).copy()
-for c in X.columns:
-    X[c] = pd.to_numeric(X[c], errors="coerce")
-X = X.fillna(X.median(numeric_only=True))
-X = X.fillna(0)
-
-base = pipe.predict(X)
-
-# Only industry and hiring urgency should affect recommendations.
-# Build a compact adjustment that depends on industry match and urgency level.
-adj = np.zeros(len(df), dtype=float)
-
-# Industry mapping (same as before)
-industry_col_map = {
-    "Technology": "core_tech_density",
-    "Creative": "creative_density",
-    "Innovation": "innovation_density",
-    "Business Services": "business_services_density",
-    "Retail/Hospitality": "business_density",
-    "Industrial/Logistics": "business_density"
-}
-
-industry_col = industry_col_map.get(industry)
-if industry_col and industry_col in df.columns:
-    industry_boost = minmax_series(df[industry_col]).values
-else:
-    industry_boost = np.zeros(len(df), dtype=float)
-
-# Urgency factor controls how strongly industry match moves ranking
-urgency_factor_map = {
-    "<3 months": 1.0,
-    "3-6 months": 0.6,
-    "6+ months": 0.3,
-}
-urgency_factor = urgency_factor_map.get(urgency, 0.6)
-
-# Apply a modest industry-based adjustment scaled by urgency
-adj += urgency_factor * 0.20 * industry_boost
-
-base_std = float(np.std(base)) + 1e-9
-adj_std = float(np.std(adj)) + 1e-9
-adj_scaled = adj * (base_std / adj_std)
-
-final_score = 0.50 * base + 0.50 * adj_scaled
-
-df_scored = df[["lad_code", "lad_name"]].copy()
-df_scored["score"] = final_score
-
-# Normalize to 0–100 (fix mojibake in comment too)
-df_scored["score"] = 100 * (df_scored["score"] - df_scored["score"].min()) / (
-    df_scored["score"].max() - df_scored["score"].min() + 1e-9
-)
-
-# ============================================================
-# CANDIDATE POOL (use entire dataset independent of selected city)
-# ============================================================
-# We intentionally do NOT filter candidates by distance to the selected city.
-# This keeps recommendations stable regardless of the chosen map focus; only
-# the per-area explanation changes when the user selects an area.
-has_centroids = {"lad_lat", "lad_lng"}.issubset(df.columns)
-
-# Prepare df_local with lat/lng when available so the map can still plot centroids,
-# but use the full scored dataset as the candidate pool for ranking.
-df_local = df_scored.copy()
-if has_centroids:
-    lat = pd.to_numeric(df.get("lad_lat"), errors="coerce")
-    lng = pd.to_numeric(df.get("lad_lng"), errors="coerce")
-    # attach lat/lng columns (may contain NaNs) for mapping purposes
-    df_local["lad_lat"] = lat.values
-    df_local["lad_lng"] = lng.values
-
-# City-based filtering: only evaluate LADs within the selected city (50 km radius)
-candidates = df_local.copy()
-
-if has_centroids:
-    # compute haversine distance (km) from the selected city to each area
-    dist_km = haversine_km(
-        df_local.get("lad_lat", np.nan).fillna(target_lat).values,
-        df_local.get("lad_lng", np.nan).fillna(target_lng).values,
-        target_lat,
-        target_lng,
+# The base score only depends on the model and the dataset, so it is cached per
+# (model, features, dataset) hash and shared by every rerun and session. The
+# on-disk copy lives in the model version's directory, and scores of any other
+# version are dropped from memory once this one is in use.
+SCORES_KEY = base_scores_key(*MODEL_FILES, DATA_PATH)
+with PROFILE.phase("base scores"):
+    base = get_base_scores(
+        SCORES_KEY,
+        lambda: pipe.predict(prepare_features(df, feature_list)),
+        len(df),
+        MODEL_VERSION.base_scores_path,
     )
-    # Keep only LADs within 50 km radius of the selected city
-    city_mask = dist_km <= 50.0
-    candidates = candidates.loc[city_mask].copy()
-
-# Exclude LADs that are in the selected city itself (within 10 km radius)
-if has_centroids:
-    in_city_dist = haversine_km(
-        candidates.get("lad_lat", np.nan).fillna(target_lat).values,
-        candidates.get("lad_lng", np.nan).fillna(target_lng).values,
-        target_lat,
-        target_lng,
-    )
-    # Keep only LADs that are NOT in the city (> 10 km away)
-    not_in_city_mask = in_city_dist > 10.0
-    candidates = candidates.loc[not_in_city_mask].copy()
-
-# Re-normalize scores within the city's candidate set for local ranking
-if len(candidates) > 0:
-    if candidates["score"].nunique(dropna=True) > 1:
-        candidates["score"] = 100 * (candidates["score"] - candidates["score"].min()) / (
-            candidates["score"].max() - candidates["score"].min() + 1e-9
-        )
-
-# Generate random cap between 99 and 99.5 for highest score
-rng_cap = np.random.default_rng()
-max_score_cap = float(rng_cap.uniform(99.0, 99.5))
-
-# Pick top N by score
-top = candidates.sort_values("score", ascending=False).head(5).copy()
-
-# Scale top scores so highest is between 99-99.5 (random)
-if len(top) > 0 and top["score"].max() > 0:
-    top_score_max = float(top["score"].max())
-    scale_factor = max_score_cap / top_score_max
-    top["score"] = top["score"] * scale_factor
+evict_base_scores(keep=(SCORES_KEY,))
+
+# Pick top N by score (an O(1) score-tensor lookup when it covers these inputs,
+# otherwise the live pipeline) and cap the best score at a random 99-99.5.
+ranker = load_ranker(SCORES_KEY, DATA_PATH, str(MODEL_VERSION.score_tensor_path), base)
+with PROFILE.phase("first score"):
+    top = ranker.rank(Profile(industry, urgency, employees), city)
+
+# ============================================================
+# EXPLANATION PREFETCH (opt-in)
+# ============================================================
+# Queue explanations for every top area so switching areas is a cache hit.
+# A new batch (inputs changed) cancels whatever this session queued before.
+if gemini_available:
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    if prefetch_explanations:
+        prefetch_jobs = []
+        for lad_name, lad_score in zip(top["lad_name"], top["score"]):
+            match = df[df["lad_name"] == lad_name]
+            if not match.empty:
+                prefetch_jobs.append(
+                    explanation_job(lad_name, lad_score, match.iloc[0], industry, employees, urgency)
+                )
+        prefetch_keys = [key for key, _ in prefetch_jobs]
+        if st.session_state.get("prefetch_keys") != prefetch_keys:
+            load_explanation_service().prefetch(session_id, prefetch_jobs)
+            st.session_state["prefetch_keys"] = prefetch_keys
+    elif st.session_state.pop("prefetch_keys", None) is not None:
+        load_explanation_service().cancel_session(session_id)
 
 # ============================================================
 # MAP LAYERS
@@ -566,22 +416,35 @@ cloud = pd.DataFrame({
     "score": sampled_scores.tolist(),
 })
 
-hex_layer = pdk.Layer(
-    "HexagonLayer",
-    cloud,
-    get_position=["lng", "lat"],
-    radius=1400,
-    elevation_scale=30,
-    extruded=True,
-    pickable=True,
-)
+def build_deck(cloud, target_lat, target_lng):
+    """pydeck is only imported here, when the map column actually renders."""
+    with PROFILE.phase("import pydeck"):
+        import pydeck as pdk
+
+    view_state = pdk.ViewState(
+        longitude=target_lng,
+        latitude=target_lat,
+        zoom=10.5,
+        pitch=55,
+        bearing=-15
+    )
 
-deck = pdk.Deck(
-    layers=[hex_layer],
-    map_style=MAP_STYLE,
-    initial_view_state=view_state,
-    tooltip={"text": "Heat score: {score}"}
-)
+    hex_layer = pdk.Layer(
+        "HexagonLayer",
+        cloud,
+        get_position=["lng", "lat"],
+        radius=1400,
+        elevation_scale=30,
+        extruded=True,
+        pickable=True,
+    )
+
+    return pdk.Deck(
+        layers=[hex_layer],
+        map_style=MAP_STYLE,
+        initial_view_state=view_state,
+        tooltip={"text": "Heat score: {score}"}
+    )
 
 # ============================================================
 # HEADER - Compact
@@ -621,6 +484,7 @@ with left_col:
     )
 
     explanation_container = st.container(border=True)
+    explanation_future = None
 
     with explanation_container:
         if selected_area:
@@ -636,16 +500,19 @@ with left_col:
                 st.markdown("")
 
                 if gemini_available:
-                    with st.spinner("🤖 Generating personalized analysis..."):
-                        explanation = generate_explanation(
-                            selected_area,
-                            selected_score,
-                            selected_row,
-                            industry,
-                            employees,
-                            urgency
-                        )
-                    st.markdown(f'<div class="explanation-box">{explanation}</div>', unsafe_allow_html=True)
+                    # Generation runs off the script thread; the slot is filled at the
+                    # end of the script so the map and stats render first.
+                    explanation_future = request_explanation(
+                        selected_area,
+                        selected_score,
+                        selected_row,
+                        industry,
+                        employees,
+                        urgency
+                    )
+                    explanation_slot = st.empty()
+                    if not explanation_future.done():
+                        explanation_slot.info("🤖 Generating personalized analysis...")
                 else:
                     st.info("🔑 To unlock AI-powered explanations, please set your GEMINI_API_KEY.")
         else:
@@ -656,7 +523,7 @@ with left_col:
 # ============================================================
 with right_col:
     st.markdown('<div class="section-header">🗺️  Location Map</div>', unsafe_allow_html=True)
-    st.pydeck_chart(deck, use_container_width=True, height=360)
+    st.pydeck_chart(build_deck(cloud, target_lat, target_lng), use_container_width=True, height=360)
 
     st.markdown("")
     st.markdown('<div class="section-header">📈 Quick Stats</div>', unsafe_allow_html=True)
@@ -679,3 +546,21 @@ with right_col:
             <div style="font-size: 1.75rem; font-weight: 700; color: #10b981;">{top_score}</div>
         </div>
         ''', unsafe_allow_html=True)
+
+# ============================================================
+# STARTUP REPORT (first run of this process, before waiting on Gemini)
+# ============================================================
+if not PROFILE.written:
+    print(format_report(PROFILE.write()), flush=True)
+
+# ============================================================
+# EXPLANATION (filled last so the table and map never wait on Gemini)
+# ============================================================
+if explanation_future is not None:
+    try:
+        explanation = explanation_future.result(timeout=EXPLANATION_TIMEOUT_S)
+    except FuturesTimeoutError:
+        explanation = "The analysis is taking longer than usual. Reselect the area in a moment to see it."
+    except Exception as e:
+        explanation = f"Error generating explanation: {str(e)}"
+    explanation_slot.markdown(f'<div class="explanation-box">{explanation}</div>', unsafe_allow_html=True)
@@ -0,0 +1,12 @@
+"""Shared, Streamlit-free helpers for RegionMatch.
+
+``app/app.py`` and the scripts under ``scripts/`` import from here so that
+expensive state (model predictions, build artifacts) is computed once and
+reused instead of being rebuilt inline in every entry point.
+"""
+
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MODELS_DIR = REPO_ROOT / "models"
+DATA_DIR = REPO_ROOT / "data"
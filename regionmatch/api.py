@@ -0,0 +1,189 @@
+"""
+HTTP scoring API (ASGI, FastAPI).
+
+    uvicorn regionmatch.api:app --workers 4
+
+Each worker process loads the model (the NumPy export when current, else
+``location_model.joblib``), the dataset, the cached base scores and the score
+tensor once at startup through :meth:`regionmatch.scoring.Ranker.load`, so a
+request is a tensor lookup (or one live ranking) with no per-request loading.
+Each request checks the registry's CURRENT pointer (regionmatch/registry.py);
+after a publish or rollback the first request reloads the ranker for the new
+version and swaps it in.
+
+Endpoints:
+
+- ``GET /rank?industry=&urgency=&city=[&top_n=&seed=&format=]`` - top areas
+  for a business profile around a city, as the app ranks them.
+- ``GET /explain?area=&score=&industry=&employees=&urgency=`` - the Gemini
+  explanation for one area, served through the shared explanation cache.
+- ``GET /health``
+
+``/rank`` answers JSON by default and an Arrow IPC stream with
+``format=arrow`` or ``Accept: application/vnd.apache.arrow.stream``.
+"""
+
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Optional
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response
+
+from regionmatch.constants import INDUSTRIES, TOP_N, URGENCY
+from regionmatch.explain import ExplanationService, build_prompt, explanation_key, gemini_model
+from regionmatch.registry import REGISTRY_DIR, current_version
+from regionmatch.scoring import Profile, Ranker, city_centre
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MAX_TOP_N = 50
+
+# Longest /explain waits for Gemini before answering 504 (generation keeps going
+# in the background and lands in the cache).
+EXPLANATION_TIMEOUT_S = float(os.getenv("REGIONMATCH_EXPLANATION_TIMEOUT_S", "30"))
+
+_state = {}
+_reload_lock = threading.Lock()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    ranker = Ranker.load()
+    # Build the spatial index now so the first live ranking does not pay for it
+    ranker.index
+    _state["ranker"] = ranker
+    api_key = os.getenv("GEMINI_API_KEY", "")
+    _state["explainer"] = (
+        ExplanationService(model_factory=partial(gemini_model, api_key=api_key)) if api_key else None
+    )
+    try:
+        yield
+    finally:
+        if _state.get("explainer") is not None:
+            _state["explainer"].shutdown(wait=False)
+        _state.clear()
+
+
+app = FastAPI(title="RegionMatch", lifespan=lifespan)
+
+
+def current_ranker(registry_dir=REGISTRY_DIR) -> Ranker:
+    """The loaded ranker, reloaded first if CURRENT now names another model version."""
+    version = current_version(registry_dir)
+    ranker = _state["ranker"]
+    if ranker.version == version:
+        return ranker
+    with _reload_lock:
+        # another request may have swapped it while this one waited
+        ranker = _state["ranker"]
+        if ranker.version != version:
+            ranker = Ranker.load(registry_dir=registry_dir)
+            ranker.index
+            _state["ranker"] = ranker
+        return ranker
+
+
+def _check_choice(name, value, choices):
+    if value not in choices:
+        raise HTTPException(422, f"Unknown {name} {value!r}; expected one of {list(choices)}")
+
+
+def _arrow_response(columns) -> Response:
+    import pyarrow as pa
+
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+
+@app.get("/health")
+def health():
+    ranker = _state.get("ranker")
+    return {
+        "status": "ok" if ranker is not None else "loading",
+        "areas": int(len(ranker.df)) if ranker is not None else 0,
+        "model_version": ranker.version if ranker is not None else None,
+        "score_tensor": ranker is not None and ranker.tensor is not None,
+        "explanations": _state.get("explainer") is not None,
+    }
+
+
+@app.get("/rank")
+def rank(
+    request: Request,
+    industry: str,
+    urgency: str,
+    city: str,
+    top_n: int = Query(TOP_N, ge=1, le=MAX_TOP_N),
+    seed: Optional[int] = Query(None, description="Seed for a reproducible 99-99.5 cap"),
+    format: Optional[str] = Query(None, pattern="^(json|arrow)$"),
+):
+    _check_choice("industry", industry, INDUSTRIES)
+    _check_choice("urgency", urgency, URGENCY)
+    try:
+        city_centre(city)
+    except ValueError as e:
+        raise HTTPException(422, str(e)) from None
+
+    rng = np.random.default_rng(seed) if seed is not None else None
+    top = current_ranker().rank(Profile(industry, urgency), city, top_n=top_n, rng=rng)
+    codes = top["lad_code"].astype(str).tolist()
+    names = top["lad_name"].astype(str).tolist()
+    scores = top["score"].astype(float).tolist()
+
+    wants_arrow = format == "arrow" or (format is None and ARROW_MEDIA_TYPE in request.headers.get("accept", ""))
+    if wants_arrow:
+        return _arrow_response({
+            "rank": np.arange(1, len(codes) + 1, dtype=np.int16),
+            "lad_code": codes,
+            "lad_name": names,
+            "score": scores,
+        })
+    return {
+        "city": city,
+        "industry": industry,
+        "urgency": urgency,
+        "results": [
+            {"rank": i, "lad_code": c, "lad_name": n, "score": sc}
+            for i, (c, n, sc) in enumerate(zip(codes, names, scores), 1)
+        ],
+    }
+
+
+@app.get("/explain")
+async def explain(
+    area: str = Query(..., description="lad_code or lad_name"),
+    score: float = Query(..., ge=0, le=100),
+    industry: str = Query(...),
+    urgency: str = Query(...),
+    employees: int = Query(25, ge=1),
+):
+    explainer = _state.get("explainer")
+    if explainer is None:
+        raise HTTPException(503, "Explanations are unavailable: GEMINI_API_KEY is not set")
+    _check_choice("industry", industry, INDUSTRIES)
+    _check_choice("urgency", urgency, URGENCY)
+
+    df = current_ranker().df
+    match = df[(df["lad_code"].astype(str) == area) | (df["lad_name"].astype(str) == area)]
+    if match.empty:
+        raise HTTPException(404, f"Unknown area {area!r}")
+    row = match.iloc[0]
+    lad_code, lad_name = str(row["lad_code"]), str(row["lad_name"])
+
+    key = explanation_key(lad_code, score, industry, employees, urgency)
+    prompt = build_prompt(lad_name, score, row, industry, employees, urgency)
+    future = explainer.submit(key, prompt)
+    try:
+        text = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), EXPLANATION_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise HTTPException(504, "The explanation is still being generated; retry shortly") from None
+    except Exception as e:
+        raise HTTPException(502, f"Error generating explanation: {e}") from None
+    return {"lad_code": lad_code, "lad_name": lad_name, "score": score, "explanation": text}
@@ -0,0 +1,120 @@
+"""
+Per-LAD base score cache.
+
+The base score is ``pipe.predict`` over the prepared feature matrix. It only
+depends on the model, its feature list and the dataset, so it is keyed on the
+SHA-256 of those files and cached twice:
+
+1. in-process, so every Streamlit rerun / session in the same server shares it
+2. on disk next to the model (``models/base_scores.npz``, or the model
+   version's directory in the registry), so a fresh process skips the
+   prediction entirely when nothing changed
+
+Reruns then only pay for the cheap industry/urgency adjustment.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from regionmatch import MODELS_DIR
+
+BASE_SCORES_PATH = MODELS_DIR / "base_scores.npz"
+
+_digest_cache = {}
+_scores_cache = {}
+_lock = threading.Lock()
+
+
+def file_digest(path) -> str:
+    """SHA-256 of a file, memoised on (path, mtime, size)."""
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    digest = _digest_cache.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _digest_cache[memo_key] = digest
+    return digest
+
+
+def base_scores_key(*paths) -> str:
+    """Combined cache key for the model/feature/dataset files that feed a prediction."""
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(file_digest(p).encode("ascii"))
+    return h.hexdigest()
+
+
+def prepare_features(df: pd.DataFrame, feature_list) -> pd.DataFrame:
+    """Feature matrix exactly as the app has always fed it to the model."""
+    X = df.reindex(columns=feature_list).copy()
+    for c in X.columns:
+        # float64 like the training CSV, even when the dataset stores float32
+        X[c] = pd.to_numeric(X[c], errors="coerce").astype(float)
+    X = X.fillna(X.median(numeric_only=True))
+    return X.fillna(0)
+
+
+def _read_artifact(path: Path, key: str, n_rows: int):
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            if str(npz["key"]) != key:
+                return None
+            scores = np.asarray(npz["scores"], dtype=float)
+    except Exception:
+        return None
+    return scores if scores.shape == (n_rows,) else None
+
+
+def _write_artifact(path: Path, key: str, scores: np.ndarray) -> None:
+    # Write to a temp file and rename so concurrent readers never see a partial file.
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    try:
+        np.savez(tmp, key=np.array(key), scores=scores)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def get_base_scores(key: str, compute, n_rows: int, cache_path=BASE_SCORES_PATH) -> np.ndarray:
+    """
+    Return the base scores for ``key``.
+
+    ``compute`` is only called (once per process) when neither the in-process
+    cache nor the persisted artifact match the key. The returned array is
+    read-only because it is shared between sessions.
+    """
+    with _lock:
+        scores = _scores_cache.get(key)
+        if scores is not None:
+            return scores
+
+        scores = _read_artifact(Path(cache_path), key, n_rows)
+        if scores is None:
+            scores = np.asarray(compute(), dtype=float).ravel()
+            _write_artifact(Path(cache_path), key, scores)
+
+        scores.setflags(write=False)
+        _scores_cache[key] = scores
+        return scores
+
+
+def evict_base_scores(keep=()) -> None:
+    """
+    Drop in-process base scores for every key not in ``keep`` (e.g. after a
+    model version switch). Callers still holding an evicted array keep it.
+    """
+    with _lock:
+        for key in [k for k in _scores_cache if k not in keep]:
+            del _scores_cache[key]
@@ -0,0 +1,262 @@
+"""
+Batch ranking for large lists of business profiles.
+
+    python -m regionmatch.batch profiles.csv rankings.parquet --top-n 5
+
+Profiles are streamed from a CSV with ``industry``, ``urgency`` and ``city``
+columns (``employees`` and anything else are ignored: they do not move the
+ranking). The ranking only depends on (city, industry, urgency), so each
+worker holds the score tensor for the requested ``top_n`` (the shipped one
+when it is wide enough, otherwise built once in memory from the cached base
+predictions) and a chunk of profiles is ranked with one fancy-indexing
+lookup plus a vectorised 99-99.5 cap.
+
+The output is long format, one row per (profile, rank): ``profile`` (0-based
+row in the input), the optional ``--id-column``, ``rank``, ``lad_code``,
+``lad_name`` and ``score``. It is written as Parquet (needs pyarrow) or CSV
+depending on the extension. Large inputs are spread over a process pool, and
+throughput is reported in profiles/sec on stderr.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from regionmatch.constants import TOP_N
+from regionmatch.scenarios import ScenarioTensor
+from regionmatch.scoring import SCORE_CAP_RANGE, Ranker
+
+PROFILE_COLUMNS = ("industry", "urgency", "city")
+DEFAULT_CHUNKSIZE = 50_000
+
+# Inputs smaller than this are ranked in-process; a pool only pays off beyond it.
+POOL_MIN_BYTES = 8 << 20
+
+
+class BatchRanker:
+    """Vectorised top-N lookups for chunks of profiles."""
+
+    def __init__(self, ranker: Ranker, top_n: int = TOP_N):
+        tensor = ranker.tensor
+        if tensor is None or tensor.top_idx.shape[-1] < top_n:
+            tensor = ScenarioTensor.build(ranker.base, ranker.df, top_n=top_n, index=ranker.index)
+        self.tensor = tensor
+        self.top_n = top_n
+        self.lad_code = ranker.lad_code
+        self.lad_name = ranker.lad_name
+
+    def rank_chunk(self, profiles: pd.DataFrame, start: int = 0, rng=None, id_column=None, cap=True):
+        """
+        Rank a chunk of profiles whose first row is input row ``start``.
+
+        Returns ``(rankings, skipped)`` where ``skipped`` lists the input rows
+        whose city, industry or urgency is unknown.
+        """
+        cols = {c: profiles[c].astype(str).str.strip().to_numpy(dtype=object) for c in PROFILE_COLUMNS}
+        idx, scores, covered = self.tensor.lookup_many(cols["city"], cols["industry"], cols["urgency"])
+        idx, scores = idx[:, : self.top_n], scores[:, : self.top_n]
+        rows = np.arange(start, start + len(profiles))
+
+        if cap:
+            rng = np.random.default_rng() if rng is None else rng
+            caps = rng.uniform(*SCORE_CAP_RANGE, size=len(profiles))
+            best = scores[:, 0]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                factor = np.where(best > 0, caps / best, 1.0)
+            scores = scores * factor[:, None]
+
+        valid = idx >= 0
+        profile_pos, rank_pos = np.nonzero(valid)
+        lad = idx[valid]
+        out = {"profile": rows[profile_pos]}
+        if id_column is not None:
+            out[id_column] = profiles[id_column].to_numpy(dtype=object)[profile_pos]
+        out["rank"] = (rank_pos + 1).astype(np.int16)
+        out["lad_code"] = self.lad_code[lad]
+        out["lad_name"] = self.lad_name[lad]
+        out["score"] = scores[valid]
+        return pd.DataFrame(out), rows[~covered].tolist()
+
+
+class RankingWriter:
+    """Appends ranking chunks to a Parquet or CSV file; the file appears on close()."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.parquet = self.path.suffix.lower() in (".parquet", ".pq")
+        self._tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        self._writer = None
+        self._rows = 0
+        self._empty = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._empty is None:
+            self._empty = df.iloc[:0]
+        if df.empty:
+            return
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self._tmp, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            df.to_csv(self._tmp, mode="a" if self._rows else "w", header=not self._rows, index=False)
+        self._rows += len(df)
+
+    def close(self) -> int:
+        """Finish the file and return the number of rows written."""
+        if self._writer is not None:
+            self._writer.close()
+        elif self._rows == 0:
+            empty = self._empty if self._empty is not None else pd.DataFrame(
+                columns=["profile", "rank", "lad_code", "lad_name", "score"]
+            )
+            if self.parquet:
+                empty.to_parquet(self._tmp, index=False)
+            else:
+                empty.to_csv(self._tmp, index=False)
+        os.replace(self._tmp, self.path)
+        return self._rows
+
+
+# Per-process state for pool workers
+_worker = None
+
+
+def _init_worker(top_n):
+    global _worker
+    _worker = BatchRanker(Ranker.load(), top_n)
+
+
+def _rank_in_worker(chunk, start, seed, id_column, cap):
+    return _worker.rank_chunk(chunk, start, np.random.default_rng(seed), id_column, cap)
+
+
+def read_profiles(path, chunksize=DEFAULT_CHUNKSIZE, id_column=None):
+    """Stream the profile columns of a CSV in chunks (all read as strings)."""
+    header = pd.read_csv(path, nrows=0).columns
+    wanted = list(PROFILE_COLUMNS) + ([id_column] if id_column else [])
+    missing = [c for c in wanted if c not in header]
+    if missing:
+        raise ValueError(f"{path} is missing profile column(s): {', '.join(missing)}")
+    return pd.read_csv(path, usecols=wanted, dtype=str, chunksize=chunksize, keep_default_na=False)
+
+
+def rank_file(
+    src,
+    dst,
+    top_n=TOP_N,
+    chunksize=DEFAULT_CHUNKSIZE,
+    workers=None,
+    seed=None,
+    id_column=None,
+    cap=True,
+    log=sys.stderr,
+):
+    """
+    Rank every profile in ``src`` and write the rankings to ``dst``.
+
+    ``workers=None`` picks in-process for small inputs and one process per CPU
+    for large ones. Returns a summary dict (profiles, rows, skipped, seconds,
+    profiles_per_sec).
+    """
+    if workers is None:
+        workers = (os.cpu_count() or 1) if os.path.getsize(src) >= POOL_MIN_BYTES else 1
+
+    def chunk_seed(n):
+        return None if seed is None else [seed, n]
+
+    t0 = time.perf_counter()
+    writer = RankingWriter(dst)
+    n_profiles = 0
+    skipped = []
+
+    def collect(result, n_rows):
+        nonlocal n_profiles
+        rankings, bad = result
+        writer.write(rankings)
+        skipped.extend(bad)
+        n_profiles += n_rows
+        elapsed = time.perf_counter() - t0
+        print(f"  ranked {n_profiles:,} profiles ({n_profiles / max(elapsed, 1e-9):,.0f}/s)", file=log)
+
+    chunks = read_profiles(src, chunksize, id_column)
+    start = 0
+    if workers <= 1:
+        batch = BatchRanker(Ranker.load(), top_n)
+        for n, chunk in enumerate(chunks):
+            collect(batch.rank_chunk(chunk, start, np.random.default_rng(chunk_seed(n)), id_column, cap), len(chunk))
+            start += len(chunk)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(top_n,)) as pool:
+            pending = deque()
+            for n, chunk in enumerate(chunks):
+                fut = pool.submit(_rank_in_worker, chunk, start, chunk_seed(n), id_column, cap)
+                pending.append((fut, len(chunk)))
+                start += len(chunk)
+                # Bounded in-flight window keeps memory flat and output in input order
+                if len(pending) >= 2 * workers:
+                    fut, n_rows = pending.popleft()
+                    collect(fut.result(), n_rows)
+            while pending:
+                fut, n_rows = pending.popleft()
+                collect(fut.result(), n_rows)
+
+    n_rows = writer.close()
+    elapsed = time.perf_counter() - t0
+    return {
+        "profiles": n_profiles,
+        "rows": n_rows,
+        "skipped": skipped,
+        "workers": workers,
+        "seconds": elapsed,
+        "profiles_per_sec": n_profiles / max(elapsed, 1e-9),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank areas for every business profile in a CSV.")
+    parser.add_argument("profiles", help="CSV with industry, urgency and city columns")
+    parser.add_argument("output", help="Output path (.parquet or .csv)")
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: auto by input size)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for a reproducible 99-99.5 cap")
+    parser.add_argument("--no-cap", action="store_true", help="Write uncapped 0-100 scores")
+    parser.add_argument("--id-column", default=None, help="Input column copied into the output")
+    args = parser.parse_args(argv)
+
+    summary = rank_file(
+        args.profiles,
+        args.output,
+        top_n=args.top_n,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        seed=args.seed,
+        id_column=args.id_column,
+        cap=not args.no_cap,
+    )
+    skipped = summary["skipped"]
+    if skipped:
+        shown = ", ".join(str(r) for r in skipped[:10])
+        print(f"Skipped {len(skipped):,} profile(s) with an unknown city/industry/urgency (rows {shown}"
+              f"{', ...' if len(skipped) > 10 else ''})", file=sys.stderr)
+    print(
+        f"Ranked {summary['profiles']:,} profiles -> {summary['rows']:,} rows in {args.output} "
+        f"({summary['seconds']:.2f} s, {summary['profiles_per_sec']:,.0f} profiles/sec, "
+        f"{summary['workers']} worker(s))"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Inputs the ranking is defined over: selectable cities, industries, urgency levels."""
+
+UK_CITIES = [
+    # England
+    ("London", -0.1276, 51.5072),
+    ("Birmingham", -1.8904, 52.4862),
+    ("Manchester", -2.2426, 53.4808),
+    ("Leeds", -1.5491, 53.8008),
+    ("Liverpool", -2.9916, 53.4084),
+    ("Bristol", -2.5879, 51.4545),
+    ("Sheffield", -1.4701, 53.3811),
+    ("Newcastle upon Tyne", -1.6178, 54.9783),
+    ("Nottingham", -1.1505, 52.9548),
+    ("Leicester", -1.1332, 52.6369),
+    ("Southampton", -1.4043, 50.9097),
+    ("Portsmouth", -1.0873, 50.8198),
+    ("Brighton", -0.1364, 50.8225),
+    ("Cambridge", 0.1218, 52.2053),
+    ("Oxford", -1.2577, 51.7520),
+    ("Reading", -0.9781, 51.4543),
+    ("Milton Keynes", -0.7594, 52.0406),
+    ("Luton", -0.4176, 51.8797),
+    ("Peterborough", -0.2420, 52.5695),
+    ("Norwich", 1.2974, 52.6309),
+    ("Ipswich", 1.1555, 52.0567),
+    ("York", -1.0815, 53.9590),
+    ("Hull", -0.3367, 53.7457),
+    ("Middlesbrough", -1.2348, 54.5742),
+    ("Sunderland", -1.3822, 54.9069),
+    ("Derby", -1.4766, 52.9225),
+    ("Stoke-on-Trent", -2.1794, 53.0027),
+    ("Wolverhampton", -2.1276, 52.5862),
+    ("Coventry", -1.5106, 52.4068),
+    ("Northampton", -0.8901, 52.2405),
+    ("Cheltenham", -2.0713, 51.8994),
+    ("Swindon", -1.7809, 51.5558),
+    ("Exeter", -3.5339, 50.7184),
+    ("Plymouth", -4.1427, 50.3755),
+    ("Bournemouth", -1.8795, 50.7192),
+
+    # Wales
+    ("Cardiff", -3.1791, 51.4816),
+    ("Swansea", -3.9436, 51.6214),
+    ("Newport", -2.9984, 51.5842),
+
+    # Scotland
+    ("Edinburgh", -3.1883, 55.9533),
+    ("Glasgow", -4.2518, 55.8642),
+    ("Aberdeen", -2.0943, 57.1497),
+    ("Dundee", -2.9707, 56.4620),
+    ("Inverness", -4.2247, 57.4778),
+
+    # Northern Ireland
+    ("Belfast", -5.9301, 54.5973),
+    ("Derry/Londonderry", -7.3092, 54.9966),
+]
+
+INDUSTRIES = [
+    "Technology", "Creative", "Innovation",
+    "Business Services", "Retail/Hospitality", "Industrial/Logistics"
+]
+URGENCY = ["<3 months", "3-6 months", "6+ months"]
+
+# Dataset column that measures how present each industry is in an area
+INDUSTRY_COL_MAP = {
+    "Technology": "core_tech_density",
+    "Creative": "creative_density",
+    "Innovation": "innovation_density",
+    "Business Services": "business_services_density",
+    "Retail/Hospitality": "business_density",
+    "Industrial/Logistics": "business_density"
+}
+
+# Urgency factor controls how strongly industry match moves ranking
+URGENCY_FACTOR_MAP = {
+    "<3 months": 1.0,
+    "3-6 months": 0.6,
+    "6+ months": 0.3,
+}
+DEFAULT_URGENCY_FACTOR = 0.6
+
+INDUSTRY_WEIGHT = 0.20
+
+# Candidates are LADs within CITY_RADIUS_KM of the selected city but further
+# than IN_CITY_RADIUS_KM (i.e. not the city itself).
+CITY_RADIUS_KM = 50.0
+IN_CITY_RADIUS_KM = 10.0
+
+TOP_N = 5
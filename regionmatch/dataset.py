@@ -0,0 +1,161 @@
+"""
+Locating and loading the LAD training dataset.
+
+Besides the CSVs, a dataset can be stored as a typed columnar artifact: a
+directory next to the CSV (``training_data_geo.columnar/``) with a
+``schema.json`` header (format version, column layout and the SHA-256 of the
+CSV it was built from) and a few ``.npy`` files. Feature columns are float32
+and centroids stay float64, each dtype stored as one column-major (Fortran
+order) block so every column is a contiguous slice; identifier columns are
+categorical (int32 codes + categories). Loading memory-maps the blocks, so a
+cold start does no parsing and replicas on the same host share the pages
+through the OS cache.
+
+Build it with ``python scripts/build/build_columnar_dataset.py``.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from regionmatch import REPO_ROOT
+from regionmatch.base_scores import file_digest
+
+COLUMNAR_FORMAT = "regionmatch-columnar"
+COLUMNAR_VERSION = 1
+SCHEMA_FILE = "schema.json"
+
+CENTROID_COLS = ("lad_lat", "lad_lng")
+
+DATASET_CANDIDATES = [
+    REPO_ROOT / "data" / "processed" / "training_data_geo.csv",
+    REPO_ROOT / "training_data_geo.csv",
+    REPO_ROOT / "data" / "processed" / "training_data_clean.csv",
+    REPO_ROOT / "training_data_clean.csv",
+    REPO_ROOT / "training_data_v1.csv",
+]
+
+
+def safe_dataset_path():
+    """Prefer geo -> clean -> v1, checking repo and processed folders."""
+    for path in DATASET_CANDIDATES:
+        if path.exists():
+            return str(path)
+    raise FileNotFoundError("No training dataset found in expected locations.")
+
+
+def columnar_dir(csv_path) -> Path:
+    return Path(csv_path).with_suffix(".columnar")
+
+
+def read_schema(artifact_dir):
+    """The artifact's schema header, or None if it is missing or from another format version."""
+    try:
+        schema = json.loads((Path(artifact_dir) / SCHEMA_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if schema.get("format") != COLUMNAR_FORMAT or schema.get("version") != COLUMNAR_VERSION:
+        return None
+    return schema
+
+
+def resolve_dataset_path():
+    """
+    Path to load the dataset from, in the same preference order as
+    :func:`safe_dataset_path`: a columnar artifact's ``schema.json`` when it
+    is current for its CSV (or the CSV is not shipped), otherwise the CSV.
+    """
+    for csv_path in DATASET_CANDIDATES:
+        schema = read_schema(columnar_dir(csv_path))
+        if schema is not None:
+            if not csv_path.exists() or schema["source"]["sha256"] == file_digest(csv_path):
+                return str(columnar_dir(csv_path) / SCHEMA_FILE)
+        if csv_path.exists():
+            return str(csv_path)
+    raise FileNotFoundError("No training dataset found in expected locations.")
+
+
+def load_dataset(path) -> pd.DataFrame:
+    """Load a path returned by :func:`resolve_dataset_path` (artifact or CSV)."""
+    path = Path(path)
+    if path.name == SCHEMA_FILE:
+        return load_columnar(path.parent)
+    return pd.read_csv(path)
+
+
+def write_columnar(df: pd.DataFrame, out_dir, source_path) -> dict:
+    """Write ``df`` as a columnar artifact built from ``source_path``; returns the schema."""
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(f"{out_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    columns = []
+    blocks = {"float32": [], "float64": []}
+    for i, col in enumerate(df.columns):
+        numeric = pd.to_numeric(df[col], errors="coerce")
+        if pd.api.types.is_numeric_dtype(df[col]) or numeric.notna().sum() == df[col].notna().sum():
+            kind = "float64" if col in CENTROID_COLS else "float32"
+            columns.append({"name": col, "kind": kind, "block": f"{kind}.npy", "index": len(blocks[kind])})
+            blocks[kind].append(numeric.to_numpy(dtype=kind))
+        else:
+            stem = f"{i:03d}"
+            cat = pd.Categorical(df[col].astype("string").astype(object))
+            np.save(tmp_dir / f"{stem}.codes.npy", cat.codes.astype(np.int32))
+            np.save(tmp_dir / f"{stem}.categories.npy", np.asarray(cat.categories, dtype=str))
+            columns.append({
+                "name": col,
+                "kind": "category",
+                "codes": f"{stem}.codes.npy",
+                "categories": f"{stem}.categories.npy",
+            })
+
+    for kind, arrays in blocks.items():
+        if arrays:
+            np.save(tmp_dir / f"{kind}.npy", np.asfortranarray(np.column_stack(arrays)))
+
+    schema = {
+        "format": COLUMNAR_FORMAT,
+        "version": COLUMNAR_VERSION,
+        "n_rows": int(len(df)),
+        "source": {"path": Path(source_path).name, "sha256": file_digest(source_path)},
+        "columns": columns,
+    }
+    # Header last: a directory without schema.json is never treated as complete.
+    (tmp_dir / SCHEMA_FILE).write_text(json.dumps(schema, indent=2), encoding="utf-8")
+
+    old_dir = out_dir.with_name(f"{out_dir.name}.{os.getpid()}.old")
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return schema
+
+
+def load_columnar(artifact_dir, mmap=True) -> pd.DataFrame:
+    """Read a columnar artifact; numeric columns stay memory-mapped (read-only)."""
+    artifact_dir = Path(artifact_dir)
+    schema = read_schema(artifact_dir)
+    if schema is None:
+        raise ValueError(f"{artifact_dir} is not a {COLUMNAR_FORMAT} v{COLUMNAR_VERSION} artifact")
+
+    mmap_mode = "r" if mmap else None
+    blocks = {}
+    data = {}
+    for col in schema["columns"]:
+        if col["kind"] == "category":
+            codes = np.load(artifact_dir / col["codes"], allow_pickle=False)
+            categories = np.load(artifact_dir / col["categories"], allow_pickle=False)
+            values = pd.Categorical.from_codes(codes, categories=categories.tolist())
+        else:
+            if col["block"] not in blocks:
+                blocks[col["block"]] = np.load(artifact_dir / col["block"], mmap_mode=mmap_mode, allow_pickle=False)
+            values = blocks[col["block"]][:, col["index"]]
+        if len(values) != schema["n_rows"]:
+            raise ValueError(f"Column {col['name']} has {len(values)} rows, expected {schema['n_rows']}")
+        data[col["name"]] = values
+    return pd.DataFrame(data, copy=False)
@@ -0,0 +1,264 @@
+"""
+Cached, non-blocking explanation service in front of Gemini.
+
+Explanations are keyed on what actually changes the answer: the area, the
+score rounded to a whole number, the industry, an employee-count bucket and
+the urgency. Results live in a small SQLite cache (TTL + least-recently-used
+eviction) shared by every session and replica on the host. Generation runs on
+a worker thread so the page can render the table and map first, and identical
+requests that arrive while one is in flight share the same future instead of
+paying for another model call.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from regionmatch import DATA_DIR
+from regionmatch.startup import PROFILE
+
+GEMINI_MODEL = "models/gemini-2.5-flash"
+EXPLANATION_CACHE_PATH = DATA_DIR / "cache" / "explanations.sqlite3"
+
+# Bump when the prompt wording changes so old cached answers are not reused.
+PROMPT_VERSION = 1
+
+CONTEXT_FIELDS = [
+    "core_tech_density", "creative_density", "innovation_density",
+    "business_services_density", "job_liquidity_score_1_10",
+    "reddit_sentiment_score_1_10", "approval_rate",
+    "median_decision_days", "business_density",
+    "micro_ratio", "sme_ratio", "large_ratio", "scaling_index"
+]
+
+
+def employees_bucket(employees) -> str:
+    """UK company size bands; the explanation does not change within a band."""
+    n = int(employees)
+    if n < 10:
+        return "1-9"
+    if n < 50:
+        return "10-49"
+    if n < 250:
+        return "50-249"
+    return "250+"
+
+
+def explanation_key(area, score, industry, employees, urgency, model_name=GEMINI_MODEL) -> str:
+    parts = [
+        f"v{PROMPT_VERSION}", model_name, str(area), str(int(round(float(score)))),
+        str(industry), employees_bucket(employees), str(urgency),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def build_prompt(lad_name, score, lad_data, industry, employees, urgency) -> str:
+    context_fields = []
+    for col in CONTEXT_FIELDS:
+        if col in lad_data.index:
+            val = lad_data.get(col, "N/A")
+            if isinstance(val, (int, float, np.floating)) and not pd.isna(val):
+                context_fields.append(f"{col}: {float(val):.2f}")
+
+    context = "\n".join(context_fields) if context_fields else "Standard metrics"
+
+    return f"""Explain why '{lad_name}' received a compatibility score of {int(round(float(score)))}/100 for a {industry} business with {employees_bucket(employees)} employees looking to expand with a {urgency} hiring timeline.
+
+Key metrics for {lad_name}:
+{context}
+
+Provide a concise, professional explanation (2-3 sentences) that a business owner would understand. Focus on why this location is a good fit for their specific needs. Be positive but honest."""
+
+
+_configured_key = None
+_configure_lock = threading.Lock()
+
+
+def gemini_model(model_name=GEMINI_MODEL, api_key=None):
+    """
+    Default model factory. The Gemini SDK is imported (and configured with
+    ``api_key``) on first use, so pages that never request an explanation
+    never load it.
+    """
+    global _configured_key
+    with PROFILE.phase("import google.generativeai"):
+        import google.generativeai as genai
+
+    if api_key:
+        with _configure_lock:
+            if api_key != _configured_key:
+                genai.configure(api_key=api_key)
+                _configured_key = api_key
+    return genai.GenerativeModel(model_name)
+
+
+class ExplanationCache:
+    """SQLite key/value store with a TTL and least-recently-used eviction."""
+
+    def __init__(self, path=EXPLANATION_CACHE_PATH, ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS explanations_accessed ON explanations (accessed)")
+
+    def _connect(self):
+        # A short-lived connection per call keeps this safe across threads and processes.
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT text FROM explanations WHERE key = ? AND created >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE explanations SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key, text):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO explanations (key, text, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, text, now, now),
+            )
+            conn.execute("DELETE FROM explanations WHERE created < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM explanations WHERE key IN ("
+                " SELECT key FROM explanations ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+
+
+class ExplanationService:
+    """
+    Runs explanation requests on small thread pools.
+
+    Interactive requests (the area the user is looking at) and background
+    prefetches use separate bounded pools, so prefetching never queues ahead of
+    what is on screen. An interactive request for a key whose prefetch is
+    still queued moves that job to the interactive pool; every caller keeps
+    the same future. ``model_factory`` returns an object with
+    ``generate_content(prompt)`` whose result has a ``.text`` attribute (the
+    Gemini SDK shape); tests pass a local stub instead of Gemini.
+    """
+
+    def __init__(self, model_factory=gemini_model, cache=None, max_workers=4, prefetch_workers=2):
+        self._model_factory = model_factory
+        self.cache = cache if cache is not None else ExplanationCache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="explain")
+        self._prefetch_executor = ThreadPoolExecutor(
+            max_workers=prefetch_workers, thread_name_prefix="explain-prefetch"
+        )
+        self._inflight = {}
+        self._jobs = {}  # key -> (pool, pool future running _run for it)
+        # key -> sessions that asked for it; None marks an interactive request,
+        # which is never cancelled.
+        self._owners = {}
+        self._sessions = {}
+        # Re-entrant: a future that is already done runs its callback immediately.
+        self._lock = threading.RLock()
+
+    def submit(self, key, prompt) -> Future:
+        """Future for the explanation; cached answers come back already resolved."""
+        return self._submit(key, prompt, self._executor, None)
+
+    def prefetch(self, session_id, jobs):
+        """
+        Queue ``(key, prompt)`` jobs for a session on the prefetch pool.
+
+        Whatever the session prefetched before is cancelled first, so calling
+        this again when the inputs change replaces the old batch.
+        """
+        self.cancel_session(session_id)
+        return [self._submit(key, prompt, self._prefetch_executor, session_id) for key, prompt in jobs]
+
+    def cancel_session(self, session_id) -> int:
+        """Drop a session's prefetches; queued jobs nobody else is waiting on are cancelled."""
+        cancelled = 0
+        with self._lock:
+            for key in self._sessions.pop(session_id, ()):
+                owners = self._owners.get(key)
+                if owners is None:
+                    continue
+                owners.discard(session_id)
+                if not owners and self._inflight[key].cancel():
+                    cancelled += 1
+        return cancelled
+
+    def _submit(self, key, prompt, executor, owner) -> Future:
+        cached = self.cache.get(key)
+        if cached is not None:
+            fut = Future()
+            fut.set_result(cached)
+            return fut
+
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is None:
+                fut = Future()
+                self._inflight[key] = fut
+                self._owners[key] = set()
+                self._jobs[key] = (executor, executor.submit(self._run, fut, key, prompt))
+                fut.add_done_callback(lambda _f, k=key: self._forget(k))
+            elif owner is None and self._jobs[key][0] is self._prefetch_executor and self._jobs[key][1].cancel():
+                # still queued behind other prefetches: run it on the interactive pool instead
+                self._jobs[key] = (executor, executor.submit(self._run, fut, key, prompt))
+            if not fut.done():
+                self._owners[key].add(owner)
+                if owner is not None:
+                    self._sessions.setdefault(owner, set()).add(key)
+            return fut
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+            job = self._jobs.pop(key, None)
+            if job is not None:
+                job[1].cancel()  # frees the queue slot of a cancelled request
+            for owner in self._owners.pop(key, ()):
+                keys = self._sessions.get(owner)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._sessions[owner]
+
+    def _run(self, fut, key, prompt):
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(self._generate(key, prompt))
+        except BaseException as exc:
+            fut.set_exception(exc)
+
+    def _generate(self, key, prompt):
+        response = self._model_factory().generate_content(prompt)
+        text = (getattr(response, "text", "") or "").strip()
+        if not text:
+            return "No explanation returned."
+        self.cache.set(key, text)
+        return text
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        self._prefetch_executor.shutdown(wait=wait)
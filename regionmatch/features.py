@@ -0,0 +1,167 @@
+"""
+Training features and target_score in one pass.
+
+``build_training_features`` does what clean_dataset.py followed by
+make_target.py (or reset_clean_and_target.py) used to do with a CSV round
+trip in between. It coerces the feature columns once, takes one float block
+and computes every median, fill, min-max and the weighted target score on
+that block with column-wise numpy ops. Text columns are the only ones parsed;
+columns that had no gaps keep their original dtype, so the output matches
+the step-by-step scripts cell for cell.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+ID_COLUMNS = ("lad_code", "lad_name", "council_id")
+RESET_ID_COLUMNS = ("lad_code", "lad_name", "lad_lat", "lad_lng", "council_id")
+
+# Known constant from the earnings aggregation
+BROKEN_COLUMNS = ("earnings_median",)
+
+# Kept by the sparse-column filter even when mostly missing
+PROTECTED_COLUMNS = frozenset([
+    "approval_rate", "median_decision_days", "apps_total", "apps_decided", "commercial_apps",
+    "job_liquidity_score_1_10",
+    "total_businesses", "business_density",
+    "tech_business_total", "tech_business_density",
+    "core_tech_density", "innovation_density", "creative_density", "business_services_density",
+    "scaling_index", "micro_ratio", "sme_ratio", "large_ratio",
+])
+
+# component -> (source columns, lower is better); several columns take the max
+TARGET_COMPONENTS = {
+    "planning_approval": (["approval_rate"], False),
+    "planning_speed": (["median_decision_days"], True),
+    "labour_liquidity": (["job_liquidity_score_1_10"], False),
+    "scaling": (["scaling_index"], False),
+    # max of the normalised ecosystem signals, to avoid double-counting
+    "ecosystem": (["tech_business_density", "core_tech_density", "innovation_density",
+                   "business_density", "tech_density"], False),
+}
+_SOURCE_COLUMNS = {c for source, _ in TARGET_COMPONENTS.values() for c in source}
+
+# Weights (sum to 1.0), renormalised over the components present
+TARGET_WEIGHTS = {
+    "planning_approval": 0.30,
+    "planning_speed": 0.25,
+    "labour_liquidity": 0.20,
+    "scaling": 0.15,
+    "ecosystem": 0.10,
+}
+
+
+def column_range(block: np.ndarray):
+    """Per-column (min, max - min) ignoring NaN; all-NaN columns give NaN."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        lo = np.nanmin(block, axis=0)
+        hi = np.nanmax(block, axis=0)
+    return lo, hi - lo
+
+
+def minmax_columns(block: np.ndarray) -> np.ndarray:
+    """Column-wise (x - min) / (max - min); constant or all-NaN columns become 0."""
+    lo, span = column_range(block)
+    varies = span > 0
+    out = np.zeros_like(block, dtype=np.float64)
+    out[:, varies] = (block[:, varies] - lo[varies]) / span[varies]
+    return out
+
+
+def target_score(num: pd.DataFrame, block: np.ndarray = None):
+    """
+    0-100 weighted score from the min-max components available in ``num``.
+
+    ``block`` is ``num`` as a float array when the caller already has it.
+    Returns ``(score, present)``.
+    """
+    idx = [j for j, c in enumerate(num.columns) if c in _SOURCE_COLUMNS]
+    if block is None:
+        block = num.to_numpy(dtype=np.float64)
+    norm = dict(zip(num.columns[idx], minmax_columns(block[:, idx]).T))
+
+    components = {}
+    for name, (source, invert) in TARGET_COMPONENTS.items():
+        parts = [norm[c] for c in source if c in norm]
+        if not parts:
+            continue
+        part = parts[0] if len(parts) == 1 else np.max(np.column_stack(parts), axis=1)
+        components[name] = 1 - part if invert else part
+
+    if not components:
+        raise SystemExit("No suitable columns found to build a target_score.")
+
+    present = [k for k in TARGET_WEIGHTS if k in components]
+    wsum = sum(TARGET_WEIGHTS[k] for k in present)
+    score = np.zeros(len(num))
+    for k in present:
+        score += TARGET_WEIGHTS[k] / wsum * components[k]
+    return pd.Series((100 * score).round(4), index=num.index), present
+
+
+def build_training_features(
+    df: pd.DataFrame,
+    id_columns=ID_COLUMNS,
+    max_missing: float = None,
+    protected=PROTECTED_COLUMNS,
+    drop_constant: bool = False,
+    target: bool = True,
+    log=print,
+) -> pd.DataFrame:
+    """
+    Cleaned features (+ ``target_score``) from the merged training table.
+
+    Drops BROKEN_COLUMNS, coerces non-identifier columns to numbers, drops
+    columns missing in more than ``max_missing`` of rows (unless protected),
+    fills gaps with column medians, optionally drops constant columns, then
+    appends target_score. Identifier columns pass through untouched.
+    """
+    broken = [c for c in BROKEN_COLUMNS if c in df.columns]
+    if broken:
+        log(f"Dropped {', '.join(broken)}")
+    keep = [c for c in df.columns if c not in broken]
+    ids = [c for c in keep if c in id_columns]
+    feats = [c for c in keep if c not in id_columns]
+
+    # one coercion: only text columns need parsing
+    num = pd.DataFrame(
+        {c: df[c] if is_numeric_dtype(df[c]) else pd.to_numeric(df[c], errors="coerce") for c in feats},
+        index=df.index,
+    )
+    block = num.to_numpy(dtype=np.float64)
+    missing = np.isnan(block)
+
+    if max_missing is not None:
+        sparse = (missing.mean(axis=0) > max_missing) & ~np.isin(feats, list(protected))
+        if sparse.any():
+            log(f"Dropped high-missing columns: {int(sparse.sum())}")
+            feats = [c for c, s in zip(feats, sparse) if not s]
+            block, missing = block[:, ~sparse], missing[:, ~sparse]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        medians = np.nanmedian(block, axis=0)
+    gaps = missing.any(axis=0)
+    block = np.where(missing, medians, block)
+
+    if drop_constant:
+        const = ~(column_range(block)[1] > 0)
+        if const.any():
+            log(f"Dropped constant columns: {int(const.sum())}")
+            feats = [c for c, k in zip(feats, const) if not k]
+            block, gaps = block[:, ~const], gaps[~const]
+
+    # columns without gaps keep their dtype (ints stay ints); filled ones are float
+    out = {c: df[c] for c in ids}
+    for j, c in enumerate(feats):
+        out[c] = pd.Series(block[:, j], index=df.index) if gaps[j] else num[c]
+    out = pd.DataFrame(out, index=df.index)[[c for c in keep if c in ids or c in feats]]
+
+    if target:
+        out["target_score"], present = target_score(out[feats], block)
+        log(f"Created target_score with components: {present}")
+    return out
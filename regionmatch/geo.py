@@ -0,0 +1,24 @@
+"""Small geographic helpers shared by the app and scripts."""
+
+import numpy as np
+
+
+def clamp(v, lo, hi):
+    return max(lo, min(hi, v))
+
+
+def clamp_to_uk(lng, lat):
+    return clamp(lng, -8.8, 2.3), clamp(lat, 49.8, 60.9)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized Haversine distance (km)."""
+    R = 6371.0
+    lat1 = np.radians(np.asarray(lat1, dtype=float))
+    lon1 = np.radians(np.asarray(lon1, dtype=float))
+    lat2 = np.radians(np.asarray(lat2, dtype=float))
+    lon2 = np.radians(np.asarray(lon2, dtype=float))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin(dlon/2)**2
+    return 2 * R * np.arcsin(np.sqrt(a))
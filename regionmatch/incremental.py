@@ -0,0 +1,281 @@
+"""
+Incremental updates of the linear location model from sufficient statistics.
+
+For the imputer -> scaler -> linear-model pipeline, everything the scaler
+and the model need from the training rows is in the cross-products of the
+imputed design ``v = [x, y]``: ``n``, ``sum(v)`` and ``sum(v v^T)``. The
+means and variances give the StandardScaler. The centred, scaled X^T X and
+X^T y give the coefficients:
+
+* Ridge / LinearRegression: one (p x p) solve,
+* Lasso / ElasticNet: coordinate descent on the Gram matrix, warm-started
+  from the current coefficients, until the support settles; one solve on
+  the support then gives the exact minimum.
+
+The refit is converged to machine precision, while sklearn stops coordinate
+descent at its ``tol`` (1e-4 by default). So refitting a Lasso / ElasticNet
+model trained by sklearn moves its predictions a little even when no rows
+changed (up to ~0.016 for a Lasso on the shipped table).
+
+``SufficientStats`` keeps those sums, shifted by the first batch's means so
+that later subtractions do not lose precision. It also keeps the imputed
+rows keyed by LAD code. Appending a batch adds its cross-products and
+replacing a LAD subtracts the old row's first, so an update costs
+O(batch x p^2) plus one small solve. The training table is never re-read.
+
+The imputer's medians are frozen at the last full training run. Rows in a
+batch are imputed with them, so a refit matches a full refit on the
+updated table whenever the fill values are unchanged.
+
+The stats are published with the model, as ``location_model_stats.npz`` in
+its registry version (regionmatch/registry.py). Update with
+``python scripts/train/update_location_model.py BATCH.csv``.
+"""
+
+import copy
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from regionmatch import MODELS_DIR
+
+STATS_PATH = MODELS_DIR / "location_model_stats.npz"
+KEY_COLUMN = "lad_code"
+TARGET_COLUMN = "target_score"
+
+CLOSED_FORM = ("LinearRegression", "Ridge")
+COORDINATE_DESCENT = ("Lasso", "ElasticNet")
+
+
+def supports(pipeline) -> bool:
+    """True for an imputer -> scaler -> linear-model pipeline this module can update."""
+    names = [type(est).__name__ for _, est in getattr(pipeline, "steps", [])]
+    return names[:2] == ["SimpleImputer", "StandardScaler"] and len(names) == 3 and (
+        names[2] in CLOSED_FORM + COORDINATE_DESCENT
+    )
+
+
+def _check(pipeline):
+    if not supports(pipeline):
+        steps = [type(est).__name__ for _, est in getattr(pipeline, "steps", [pipeline])]
+        raise TypeError(f"Incremental updates need SimpleImputer -> StandardScaler -> linear model, not {steps}")
+    imputer, scaler, model = (est for _, est in pipeline.steps)
+    if getattr(imputer, "add_indicator", False):
+        raise TypeError("SimpleImputer(add_indicator=True) is not supported")
+    if not (scaler.with_mean and scaler.with_std):
+        raise TypeError("StandardScaler must centre and scale")
+    if not model.get_params().get("fit_intercept", True) or model.get_params().get("positive", False):
+        raise TypeError(f"{type(model).__name__} must fit an intercept without a positivity constraint")
+    return imputer, scaler, model
+
+
+def _scale(var, mean, n):
+    # StandardScaler's rule: near-constant features keep a scale of 1
+    eps = np.finfo(np.float64).eps
+    constant = var <= n * eps * var + (n * mean * eps) ** 2
+    return np.where(constant, 1.0, np.sqrt(var))
+
+
+def _fill(imputer):
+    """The imputer's fill values for the columns it passes on (all-NaN columns are dropped)."""
+    stats = np.asarray(imputer.statistics_, dtype=np.float64)
+    return stats if getattr(imputer, "keep_empty_features", False) else stats[~np.isnan(stats)]
+
+
+def _active_set_solve(G, b, l1, l2, w):
+    """
+    The exact minimiser for the support and signs of ``w``, from one linear
+    solve; None if it breaks a sign or the optimality condition of a zero
+    coefficient, i.e. ``w`` has not settled on the right support yet.
+    """
+    diag = np.diag(G)
+    active = (w != 0) & (diag > 0)
+    signs = np.sign(w[active])
+    exact = w.copy()
+    try:
+        exact[active] = np.linalg.solve(G[np.ix_(active, active)] + l2 * np.eye(active.sum()), b[active] - l1 * signs)
+    except np.linalg.LinAlgError:
+        return None
+    if np.any(np.sign(exact[active]) != signs):
+        return None
+    grad = b - G @ exact
+    idle = ~active & (diag > 0)
+    if np.any(np.abs(grad[idle]) > l1 * (1 + 1e-9) + 1e-12 * np.abs(b).max()):
+        return None
+    return exact
+
+
+def _coordinate_descent(G, b, l1, l2, w, tol=1e-4, max_iter=100_000):
+    """
+    argmin 0.5 w'Gw - b'w + l1 |w|_1 + 0.5 l2 |w|^2.
+
+    Cyclic coordinate descent from ``w`` finds the support; once the sweeps
+    settle, one solve on the support gives the exact minimum. Returns
+    ``(w, sweeps)``.
+    """
+    w = np.array(w, dtype=np.float64)
+    grad = b - G @ w
+    diag = np.diag(G) + l2
+    for sweep in range(1, max_iter + 1):
+        max_step = 0.0
+        for j in range(len(w)):
+            if diag[j] == 0:
+                continue
+            rho = grad[j] + G[j, j] * w[j]
+            new = np.sign(rho) * max(abs(rho) - l1, 0.0) / diag[j]
+            step = new - w[j]
+            if step:
+                grad -= G[:, j] * step
+                w[j] = new
+                max_step = max(max_step, abs(step))
+        if max_step <= tol * max(np.abs(w).max(), 1.0):
+            exact = _active_set_solve(G, b, l1, l2, w)
+            if exact is not None:
+                return exact, sweep
+            tol /= 10  # wrong support still: keep sweeping, more finely
+    return w, max_iter
+
+
+class SufficientStats:
+    """Shifted sums of ``[x, y]`` and their outer products, plus the rows behind them, keyed by LAD."""
+
+    def __init__(self, features, fill, shift):
+        self.features = list(features)   # columns reaching the model, after the imputer
+        self.fill = np.asarray(fill, dtype=np.float64)
+        self.shift = np.asarray(shift, dtype=np.float64)
+        width = len(self.shift)
+        self.n = 0
+        self.s1 = np.zeros(width)
+        self.s2 = np.zeros((width, width))
+        self.keys = []
+        self.rows = np.empty((0, width))
+        self._index = {}
+
+    @classmethod
+    def from_rows(cls, pipeline, keys, X, y, features):
+        """Stats for the rows ``pipeline`` was fitted on (``X`` unimputed, as the pipeline takes it)."""
+        imputer, _, _ = _check(pipeline)
+        keep = ~np.isnan(imputer.statistics_) | getattr(imputer, "keep_empty_features", False)
+        V = np.column_stack([imputer.transform(X), np.asarray(y, dtype=np.float64)])
+        stats = cls(np.asarray(features)[keep], _fill(imputer), V.mean(axis=0))
+        stats.upsert(keys, V)
+        return stats
+
+    def _add(self, V, sign):
+        D = V - self.shift
+        self.n += sign * len(V)
+        self.s1 += sign * D.sum(axis=0)
+        self.s2 += sign * (D.T @ D)
+
+    def upsert(self, keys, V):
+        """
+        Add imputed rows ``V = [x, y]``; a key already present replaces its
+        old row. Returns ``(appended, replaced)`` counts.
+        """
+        keys = [str(k) for k in keys]
+        V = np.asarray(V, dtype=np.float64)
+        if len(set(keys)) != len(keys):
+            raise ValueError("batch has duplicate keys")
+        if V.shape != (len(keys), len(self.shift)):
+            raise ValueError(f"expected {len(keys)} rows of {len(self.shift)} values, got {V.shape}")
+        if not np.isfinite(V).all():
+            raise ValueError("batch has missing values after imputation")
+
+        old = np.array([k in self._index for k in keys], dtype=bool)
+        positions = [self._index[k] for k, o in zip(keys, old) if o]
+        if positions:
+            self._add(self.rows[positions], -1)
+            self.rows[positions] = V[old]
+        new_keys = [k for k, o in zip(keys, old) if not o]
+        for k in new_keys:
+            self._index[k] = len(self.keys)
+            self.keys.append(k)
+        self.rows = np.vstack([self.rows, V[~old]])
+        self._add(V, +1)
+        return len(new_keys), len(positions)
+
+    def moments(self):
+        """Means of ``[x, y]`` and the centred cross-product matrix sum((v - mean)(v - mean)^T)."""
+        mean = self.shift + self.s1 / self.n
+        centred = self.s2 - np.outer(self.s1, self.s1) / self.n
+        return mean, centred
+
+    def refit(self, pipeline) -> Pipeline:
+        """
+        A new pipeline with ``pipeline``'s imputer and hyperparameters,
+        fitted on the current rows.
+        """
+        imputer, _, model = _check(pipeline)
+        if not np.array_equal(_fill(imputer), self.fill):
+            raise ValueError("stats were built for a different imputer; rebuild them from the training table")
+        if self.n < 2:
+            raise ValueError("need at least two rows to fit")
+
+        p = len(self.features)
+        mean, C = self.moments()
+        var = np.maximum(np.diag(C)[:p] / self.n, 0.0)
+        scale = _scale(var, mean[:p], self.n)
+        G = C[:p, :p] / np.outer(scale, scale)  # Zc^T Zc
+        b = C[:p, p] / scale                     # Zc^T yc
+
+        name = type(model).__name__
+        new_model = clone(model)
+        if name == "LinearRegression":
+            coef = np.linalg.pinv(G, hermitian=True) @ b
+        elif name == "Ridge":
+            coef = np.linalg.solve(G + float(model.alpha) * np.eye(p), b)
+        else:
+            ratio = 1.0 if name == "Lasso" else float(model.l1_ratio)
+            start = np.ravel(model.coef_) if np.shape(getattr(model, "coef_", None)) == (p,) else np.zeros(p)
+            coef, new_model.n_iter_ = _coordinate_descent(
+                G / self.n, b / self.n, model.alpha * ratio, model.alpha * (1 - ratio), start
+            )
+            new_model.dual_gap_ = 0.0
+        new_model.coef_ = coef
+        new_model.intercept_ = float(mean[p])  # the scaled features have mean 0
+        new_model.n_features_in_ = p
+
+        scaler = StandardScaler()
+        scaler.mean_, scaler.var_, scaler.scale_ = mean[:p], var, scale
+        scaler.n_samples_seen_ = self.n
+        scaler.n_features_in_ = p
+        return Pipeline([("imputer", copy.deepcopy(imputer)), ("scaler", scaler), ("model", new_model)])
+
+    def save(self, path=STATS_PATH):
+        path = Path(path)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        with open(tmp, "wb") as f:
+            np.savez(f, features=np.array(self.features), fill=self.fill, shift=self.shift, n=self.n,
+                     s1=self.s1, s2=self.s2, keys=np.array(self.keys, dtype=str), rows=self.rows)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=STATS_PATH):
+        """Load saved stats, or return None when the file is missing."""
+        try:
+            data = np.load(path, allow_pickle=False)
+        except OSError:
+            return None
+        with data:
+            stats = cls(data["features"].tolist(), data["fill"], data["shift"])
+            stats.n = int(data["n"])
+            stats.s1, stats.s2, stats.rows = data["s1"], data["s2"], data["rows"]
+            stats.keys = data["keys"].tolist()
+        stats._index = {k: i for i, k in enumerate(stats.keys)}
+        return stats
+
+
+def batch_rows(pipeline, features, batch: pd.DataFrame, key=KEY_COLUMN, target=TARGET_COLUMN):
+    """``(keys, V)`` for the rows of ``batch`` with a target, imputed as ``pipeline`` does."""
+    missing = [c for c in [key, target, *features] if c not in batch.columns]
+    if missing:
+        raise KeyError(f"batch is missing columns: {missing}")
+    batch = batch[batch[target].notna()]
+    imputer = pipeline.steps[0][1]
+    X = imputer.transform(batch[list(features)])
+    return batch[key].astype(str).tolist(), np.column_stack([X, batch[target].to_numpy(dtype=np.float64)])
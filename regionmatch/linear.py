@@ -0,0 +1,155 @@
+"""
+Pure-NumPy scorer exported from the trained location model.
+
+The model is a scikit-learn ``Pipeline`` of ``SimpleImputer`` ->
+``StandardScaler`` -> a linear regressor (Ridge / ElasticNet), so a prediction
+is::
+
+    coef . (fill(x) - mean) / scale + intercept
+
+which folds into one weight vector and bias: ``fill(x) @ w + b`` with
+``w = coef / scale`` and ``b = intercept - sum(coef * mean / scale)``. The
+imputer medians stay as a fill vector for missing values. The export is a
+``linear_scorer.json`` header (features, bias, fill values, SHA-256 of the
+pipeline it came from) plus ``linear_scorer.npy`` with the weights, and
+scoring it needs neither scikit-learn nor unpickling.
+
+Export with ``python scripts/build/export_linear_scorer.py``.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from regionmatch import MODELS_DIR
+from regionmatch.base_scores import file_digest
+
+MODEL_PATH = MODELS_DIR / "location_model.joblib"
+FEATURES_PATH = MODELS_DIR / "model_features.joblib"
+LINEAR_SCORER_PATH = MODELS_DIR / "linear_scorer.json"
+
+SCORER_FORMAT = "regionmatch-linear"
+SCORER_VERSION = 1
+
+
+def weights_path(scorer_path) -> Path:
+    return Path(scorer_path).with_suffix(".npy")
+
+
+class LinearScorer:
+    """``predict`` is a drop-in for ``Pipeline.predict`` on the exported model."""
+
+    def __init__(self, features, weights, bias, fill):
+        self.features = list(features)
+        self.weights = np.asarray(weights, dtype=float)
+        self.bias = float(bias)
+        self.fill = np.asarray(fill, dtype=float)
+        if not (len(self.features) == len(self.weights) == len(self.fill)):
+            raise ValueError("features, weights and fill must have the same length")
+
+    @classmethod
+    def from_pipeline(cls, pipe, features):
+        """Fold a fitted imputer/scaler/linear-model pipeline into a scorer."""
+        steps = [est for _, est in pipe.steps] if hasattr(pipe, "steps") else [pipe]
+        *transforms, model = steps
+        if not hasattr(model, "coef_") or not hasattr(model, "intercept_"):
+            raise TypeError(f"{type(model).__name__} is not a linear model")
+
+        n = len(features)
+        fill = np.full(n, np.nan)
+        keep = np.ones(n, dtype=bool)   # columns that reach the model
+        mean = np.zeros(n)
+        scale = np.ones(n)
+        for est in transforms:
+            name = type(est).__name__
+            if name == "SimpleImputer":
+                if getattr(est, "add_indicator", False):
+                    raise TypeError("SimpleImputer(add_indicator=True) cannot be folded")
+                stats = np.asarray(est.statistics_, dtype=float)
+                fill = stats
+                # Features that were empty at fit time are dropped by transform()
+                if not getattr(est, "keep_empty_features", False):
+                    keep = ~np.isnan(stats)
+            elif name == "StandardScaler":
+                # mean_ is fitted even with with_mean=False, but transform() only subtracts it when centring
+                if est.with_mean and getattr(est, "mean_", None) is not None:
+                    mean[keep] = est.mean_
+                if est.with_std and getattr(est, "scale_", None) is not None:
+                    scale[keep] = est.scale_
+            else:
+                raise TypeError(f"Cannot fold pipeline step {name}")
+
+        coef = np.zeros(n)
+        coef[keep] = np.ravel(model.coef_)
+        weights = coef / scale
+        bias = float(np.ravel(model.intercept_)[0]) - float(np.sum(coef * mean / scale))
+        return cls(features, weights, bias, np.where(keep, fill, 0.0))
+
+    def predict(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = X.reindex(columns=self.features)
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[None, :]
+        X = np.where(np.isnan(X), self.fill, X)
+        return X @ self.weights + self.bias
+
+    def save(self, path=LINEAR_SCORER_PATH, source=None) -> None:
+        """Write header + weights; ``source`` is the pipeline file it was exported from."""
+        path = Path(path)
+        header = {
+            "format": SCORER_FORMAT,
+            "version": SCORER_VERSION,
+            "features": self.features,
+            "bias": self.bias,
+            "fill": [None if np.isnan(v) else float(v) for v in self.fill],
+            "source": {"path": Path(source).name, "sha256": file_digest(source)} if source else None,
+        }
+        npy = weights_path(path)
+        tmp_npy = npy.with_name(f"{npy.stem}.{os.getpid()}.tmp.npy")
+        tmp_json = path.with_name(f"{path.stem}.{os.getpid()}.tmp.json")
+        np.save(tmp_npy, self.weights)
+        tmp_json.write_text(json.dumps(header, indent=2), encoding="utf-8")
+        # Weights before header: a header always points at weights of the same export.
+        os.replace(tmp_npy, npy)
+        os.replace(tmp_json, path)
+
+    @classmethod
+    def load(cls, path=LINEAR_SCORER_PATH, source=None):
+        """
+        Load an export, or return None when it is missing, from another format
+        version, or was exported from a different ``source`` pipeline file.
+        """
+        path = Path(path)
+        try:
+            header = json.loads(path.read_text(encoding="utf-8"))
+            if header.get("format") != SCORER_FORMAT or header.get("version") != SCORER_VERSION:
+                return None
+            if source is not None and Path(source).exists():
+                if (header.get("source") or {}).get("sha256") != file_digest(source):
+                    return None
+            weights = np.load(weights_path(path), allow_pickle=False)
+        except (OSError, ValueError, KeyError):
+            return None
+        fill = [np.nan if v is None else v for v in header["fill"]]
+        return cls(header["features"], weights, header["bias"], fill)
+
+
+def load_model(model_path=MODEL_PATH, features_path=FEATURES_PATH, scorer_path=LINEAR_SCORER_PATH):
+    """
+    ``(model, feature_list, artifact_paths)`` for scoring.
+
+    Uses the NumPy export when it is current for ``model_path`` and only falls
+    back to unpickling the scikit-learn pipeline otherwise. ``artifact_paths``
+    are the files the predictions depend on, for cache keys.
+    """
+    scorer = LinearScorer.load(scorer_path, source=model_path)
+    if scorer is not None:
+        return scorer, scorer.features, (Path(scorer_path), weights_path(scorer_path))
+
+    import joblib
+
+    return joblib.load(model_path), joblib.load(features_path), (Path(model_path), Path(features_path))
@@ -0,0 +1,206 @@
+"""
+Parallel model selection over shared cross-validation folds.
+
+Every candidate is an sklearn regressor behind the usual median imputer
+(and optionally a StandardScaler). Rather than each candidate running its
+own ``pipeline.fit`` plus ``cross_val_score`` refits, the folds are computed
+once and shared: the fold indices, and per fold the fitted imputer/scaler
+and the transformed train/test arrays. All candidate x fold jobs plus the
+holdout fits then go to one joblib process pool, longest jobs (ensembles)
+first, so the run scales with cores rather than with candidates. Inner
+``n_jobs`` of the estimators is set to 1 to avoid oversubscribing.
+
+Fold scores are the same as ``cross_val_score(Pipeline(...), X, y, cv=k)``
+(unshuffled KFold) and the holdout model is the same as fitting the
+pipeline on the training split.
+"""
+
+import copy
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+HOLDOUT = "holdout"
+LATENCY_REPEATS = 20
+
+
+@dataclass(frozen=True)
+class Candidate:
+    name: str
+    estimator: object
+    scale: bool = True
+
+
+@dataclass
+class PreparedSplit:
+    """One train/test split with its fitted preprocessing and transformed arrays."""
+    imputer: SimpleImputer
+    scaler: StandardScaler
+    X_train: np.ndarray
+    X_test: np.ndarray
+    y_train: np.ndarray
+    y_test: np.ndarray
+
+    def steps(self):
+        steps = [("imputer", self.imputer)]
+        if self.scaler is not None:
+            steps.append(("scaler", self.scaler))
+        return steps
+
+
+def shared_folds(n_samples, n_splits=5):
+    """(train_idx, test_idx) pairs, identical to ``cross_val_score(..., cv=n_splits)`` for a regressor."""
+    return list(KFold(n_splits=n_splits).split(np.zeros((n_samples, 1))))
+
+
+class SplitCache:
+    """
+    Prepared splits keyed by (split, scale). The imputer is fitted once per
+    split and shared by the scaled and unscaled variants.
+    """
+
+    def __init__(self, X, y, splits):
+        # a DataFrame stays one, so the imputer records feature names as Pipeline.fit would
+        self.X = X if isinstance(X, pd.DataFrame) else np.asarray(X, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.splits = splits
+        self._imputed = {}
+        self._prepared = {}
+        self.fits = 0
+
+    def _impute(self, split):
+        if split not in self._imputed:
+            train_idx, test_idx = self.splits[split]
+            rows = self.X.iloc if isinstance(self.X, pd.DataFrame) else self.X
+            imputer = SimpleImputer(strategy="median")
+            self._imputed[split] = (imputer, imputer.fit_transform(rows[train_idx]), imputer.transform(rows[test_idx]))
+            self.fits += 1
+        return self._imputed[split]
+
+    def get(self, split, scale) -> PreparedSplit:
+        key = (split, bool(scale))
+        if key not in self._prepared:
+            train_idx, test_idx = self.splits[split]
+            imputer, X_train, X_test = self._impute(split)
+            scaler = None
+            if scale:
+                scaler = StandardScaler()
+                X_train = scaler.fit_transform(X_train)
+                X_test = scaler.transform(X_test)
+                self.fits += 1
+            self._prepared[key] = PreparedSplit(imputer, scaler, X_train, X_test, self.y[train_idx], self.y[test_idx])
+        return self._prepared[key]
+
+
+def single_threaded(estimator):
+    """Clone of ``estimator`` with any ``n_jobs`` set to 1 (the pool already uses every core)."""
+    estimator = clone(estimator)
+    if "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=1)
+    return estimator
+
+
+def is_heavy(estimator) -> bool:
+    return "n_estimators" in estimator.get_params()
+
+
+def fit_and_score(estimator, X_train, y_train, X_test, y_test, keep=False):
+    """Fit on one split; returns metrics, timings and (when ``keep``) the fitted estimator."""
+    t0 = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pred = estimator.predict(X_test)
+    predict_seconds = time.perf_counter() - t0
+
+    out = {
+        "r2": r2_score(y_test, pred),
+        "rmse": float(np.sqrt(mean_squared_error(y_test, pred))),
+        "mae": mean_absolute_error(y_test, pred),
+        "fit_seconds": fit_seconds,
+        "predict_us_per_row": 1e6 * predict_seconds / max(len(X_test), 1),
+    }
+    if keep:
+        row = X_test[:1]
+        t0 = time.perf_counter()
+        for _ in range(LATENCY_REPEATS):
+            estimator.predict(row)
+        out["predict_ms_single"] = 1e3 * (time.perf_counter() - t0) / LATENCY_REPEATS
+        out["estimator"] = estimator
+    return out
+
+
+def select_models(candidates, X, y, train_idx, test_idx, cv=5, n_jobs=-1, log=print):
+    """
+    Cross-validate and holdout-fit every candidate in one process pool.
+
+    ``X`` (DataFrame or array) / ``y`` are the full (valid-target) data; folds are taken over all
+    of it, the holdout model is fitted on ``train_idx`` and scored on
+    ``test_idx``. Returns ``(table, pipelines)``: one row per candidate
+    sorted by test R2, and the fitted holdout Pipeline per candidate.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    splits = {i: fold for i, fold in enumerate(shared_folds(len(X), cv))}
+    splits[HOLDOUT] = (np.asarray(train_idx), np.asarray(test_idx))
+    cache = SplitCache(X, y, splits)
+
+    jobs = []
+    for cand in candidates:
+        for split in splits:
+            prepared = cache.get(split, cand.scale)
+            jobs.append((cand, split, prepared))
+    # longest first, so the ensembles are not left for the end of the pool
+    jobs.sort(key=lambda job: not is_heavy(job[0].estimator))
+    log(f"  {len(jobs)} fits ({len(candidates)} candidates x {cv} folds + holdout), "
+        f"{cache.fits} shared imputer/scaler fits")
+
+    t0 = time.perf_counter()
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(fit_and_score)(
+            single_threaded(cand.estimator), p.X_train, p.y_train, p.X_test, p.y_test, keep=split == HOLDOUT,
+        )
+        for cand, split, p in jobs
+    )
+    log(f"  all fits done in {time.perf_counter() - t0:.2f} s")
+
+    by_candidate = {c.name: {"cv": [], "holdout": None} for c in candidates}
+    for (cand, split, _), out in zip(jobs, outputs):
+        if split == HOLDOUT:
+            by_candidate[cand.name]["holdout"] = out
+        else:
+            by_candidate[cand.name]["cv"].append(out)
+
+    rows, pipelines = [], {}
+    for cand in candidates:
+        res = by_candidate[cand.name]
+        cv_r2 = np.array([r["r2"] for r in res["cv"]])
+        hold = res["holdout"]
+        estimator = hold["estimator"]
+        if "n_jobs" in estimator.get_params():  # the saved model keeps the candidate's own n_jobs
+            estimator.set_params(n_jobs=cand.estimator.get_params()["n_jobs"])
+        steps = copy.deepcopy(cache.get(HOLDOUT, cand.scale).steps())  # no preprocessing shared between models
+        pipelines[cand.name] = Pipeline(steps + [("model", estimator)])
+        rows.append({
+            "model": cand.name,
+            "cv_mean": cv_r2.mean(),
+            "cv_std": cv_r2.std(),
+            "test_r2": hold["r2"],
+            "test_rmse": hold["rmse"],
+            "test_mae": hold["mae"],
+            "fit_seconds": hold["fit_seconds"],
+            "cv_fit_seconds": sum(r["fit_seconds"] for r in res["cv"]),
+            "predict_us_per_row": hold["predict_us_per_row"],
+            "predict_ms_single": hold["predict_ms_single"],
+        })
+    table = pd.DataFrame(rows).sort_values("test_r2", ascending=False, kind="stable").reset_index(drop=True)
+    return table, pipelines
@@ -0,0 +1,159 @@
+"""
+LAD / council / city name matching.
+
+``normalise_names`` is the one name key used by every merge script. It lower-
+cases, spells out "&", treats hyphens and underscores as spaces, normalises
+comma spacing ("Bristol,City of" and "Bristol, City of" are the same), strips
+the usual local-authority suffixes in a single regex pass (longest first, so
+" metropolitan borough council" never leaves a stray "metropolitan"), and
+drops dots and apostrophes. All of it runs as vectorised ``.str`` ops.
+
+The alias table (``data/processed/lad_aliases.csv``, built by
+``scripts/build/build_lad_aliases.py``) maps name keys to LAD codes. It holds
+each LAD's own name plus the spellings, shared planning services and pre-2023
+districts listed below. A source is joined by attaching ``lad_code`` with one
+exact hash join on the key and then merging on ``lad_code``.
+"""
+
+import re
+
+import pandas as pd
+
+from regionmatch import DATA_DIR
+
+ALIAS_TABLE_PATH = DATA_DIR / "processed" / "lad_aliases.csv"
+
+LA_SUFFIXES = [
+    ", city of", " city of", ", county of",
+    " city council", " borough council", " district council",
+    " county council", " unitary authority",
+    " metropolitan borough council", " metropolitan borough",
+    " london borough council", " london borough",
+    " council",
+]
+_SUFFIX_RE = "|".join(re.escape(s) for s in sorted(LA_SUFFIXES, key=len, reverse=True))
+
+# Other spellings used by the sources, keyed by LAD code
+NAME_ALIASES = {
+    "E07000081": ["Gloucester City"],
+    "E06000018": ["Nottingham City"],
+    "E06000047": ["Durham"],
+    "E07000069": ["Castlepoint"],
+    "E07000208": ["Epsom Ewell"],
+    "E09000011": ["Royal Greenwich"],
+    "E06000010": ["Hull"],
+    "S12000036": ["Edinburgh"],
+}
+
+# Councils that run one planning service for several LADs
+SHARED_SERVICES = {
+    "Adur and Worthing": ["E07000223", "E07000229"],
+    "Babergh and Mid-Suffolk": ["E07000200", "E07000203"],
+    "Bromsgrove and Redditch": ["E07000234", "E07000236"],
+    "Maidstone and Swale": ["E07000110", "E07000113"],
+    "South Norfolk and Broadland": ["E07000149", "E07000144"],
+}
+
+# Districts abolished in the 2020-2023 reorganisations -> their unitary successor
+PREDECESSORS = {
+    "E06000060": ["Aylesbury Vale", "Chiltern", "South Bucks", "Wycombe"],
+    "E06000061": ["Corby", "East Northamptonshire", "Kettering", "Wellingborough"],
+    "E06000062": ["Daventry", "Northampton", "South Northamptonshire"],
+    "E06000063": ["Allerdale", "Carlisle", "Copeland"],
+    "E06000064": ["Barrow-in-Furness", "Eden", "South Lakeland"],
+    "E06000065": ["Craven", "Hambleton", "Harrogate", "Richmondshire", "Ryedale", "Scarborough", "Selby"],
+    "E06000066": ["Mendip", "Sedgemoor", "Somerset West and Taunton", "South Somerset"],
+}
+
+# Lower wins when several source rows land on the same LAD
+ALIAS_PRIORITY = {"name": 0, "alias": 1, "shared": 2, "predecessor": 3}
+
+
+def normalise_names(values) -> pd.Series:
+    """Join key for LAD, council and city names (vectorised)."""
+    s = pd.Series(values, dtype="string").fillna("").str.lower()
+    s = s.str.replace("&", " and ", regex=False)
+    s = s.str.replace(r"[-_/]", " ", regex=True)
+    s = s.str.replace(r"\s*,\s*", ", ", regex=True)
+    s = s.str.replace(r"\s+", " ", regex=True).str.strip()
+    s = s.str.replace(_SUFFIX_RE, "", regex=True)
+    s = s.str.replace(r"[.']", "", regex=True)
+    return s.str.replace(r"\s+", " ", regex=True).str.strip(" ,").astype(object)
+
+
+def build_alias_table(lads: pd.DataFrame) -> pd.DataFrame:
+    """
+    Alias table for the LADs in ``lads`` (``lad_code``, ``lad_name``).
+
+    One row per (alias key, LAD): ``alias``, ``lad_code``, ``lad_name``,
+    ``kind`` (name / alias / shared / predecessor) and ``priority``. Extra
+    aliases for LAD codes not in ``lads`` are skipped.
+    """
+    lads = lads[["lad_code", "lad_name"]].drop_duplicates("lad_code")
+    names = dict(zip(lads["lad_code"], lads["lad_name"]))
+
+    rows = [(name, code, "name") for code, name in names.items()]
+    rows += [(alias, code, "alias") for code, aliases in NAME_ALIASES.items() for alias in aliases]
+    rows += [(alias, code, "shared") for alias, codes in SHARED_SERVICES.items() for code in codes]
+    rows += [(alias, code, "predecessor") for code, aliases in PREDECESSORS.items() for alias in aliases]
+
+    table = pd.DataFrame(rows, columns=["source_name", "lad_code", "kind"])
+    table = table[table["lad_code"].isin(names)]
+    table["alias"] = normalise_names(table["source_name"]).to_numpy()
+    table["lad_name"] = table["lad_code"].map(names)
+    table["priority"] = table["kind"].map(ALIAS_PRIORITY)
+    table = (
+        table.sort_values(["alias", "priority", "lad_code"], kind="stable")
+        .drop_duplicates(["alias", "lad_code"])
+    )
+    # A key that is some LAD's own name never also points at a predecessor's successor
+    best = table.groupby("alias")["priority"].transform("min")
+    table = table[(table["priority"] == best) | (table["kind"] == "shared")]
+    return table[["alias", "lad_code", "lad_name", "kind", "priority"]].reset_index(drop=True)
+
+
+def load_alias_table(path=ALIAS_TABLE_PATH, lads: pd.DataFrame = None) -> pd.DataFrame:
+    """The persisted alias table; built in memory from ``lads`` when the file is missing."""
+    try:
+        return pd.read_csv(path, dtype={"alias": str, "lad_code": str, "lad_name": str, "kind": str},
+                           keep_default_na=False)
+    except FileNotFoundError:
+        if lads is None:
+            raise
+        return build_alias_table(lads)
+
+
+def attach_lad_codes(df: pd.DataFrame, name_col: str, aliases: pd.DataFrame, source: str = None) -> pd.DataFrame:
+    """
+    ``df`` with ``lad_code`` and ``alias_priority`` from an exact join on the name key.
+
+    A shared-service name fans out to one row per LAD; unmatched rows keep a
+    NaN ``lad_code``. With ``source`` the match rate is printed.
+    """
+    keyed = df.assign(_alias=normalise_names(df[name_col]).to_numpy())
+    out = keyed.merge(
+        aliases[["alias", "lad_code", "priority"]].rename(columns={"alias": "_alias", "priority": "alias_priority"}),
+        on="_alias",
+        how="left",
+    )
+    if source is not None:
+        report_match_rate(source, keyed["_alias"], out.loc[out["lad_code"].notna(), "_alias"])
+    return out.drop(columns=["_alias"])
+
+
+def report_match_rate(source, keys, matched_keys) -> float:
+    keys = pd.Series(keys)
+    matched = keys.isin(set(matched_keys))
+    rate = matched.mean() if len(keys) else 1.0
+    print(f"{source}: matched {int(matched.sum())}/{len(keys)} names to a LAD ({rate:.1%})")
+    missing = sorted(set(keys[~matched]) - {""})
+    if missing:
+        shown = ", ".join(missing[:10])
+        print(f"  unmatched: {shown}{', ...' if len(missing) > 10 else ''}")
+    return rate
+
+
+def best_per_lad(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per ``lad_code``: the best-priority match (exact names before aliases)."""
+    matched = df[df["lad_code"].notna()]
+    return matched.sort_values("alias_priority", kind="stable").drop_duplicates("lad_code")
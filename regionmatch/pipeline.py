@@ -0,0 +1,342 @@
+"""
+Declarative, incremental build pipeline.
+
+A Pipeline is a DAG of Sources (input files) and Stages (functions from input
+DataFrames to one output DataFrame). Every node has a content key:
+
+- a Source's key is the SHA-256 of its file (for a directory, such as a
+  Parquet dataset, of every file in it except dot-prefixed temporaries);
+- a Stage's key hashes its name, params, its inputs' keys and its code: the
+  source file of the module that defines its function, of every regionmatch
+  module reachable from it through imports (e.g. the name matching in
+  regionmatch/names.py), and any extra files listed in ``code``. Editing any
+  of them re-runs the stage.
+
+Stage outputs are cached as Parquet in ``data/cache/build/`` with their keys
+in ``manifest.json``. A run only executes stages whose key changed; cached
+parents are read back from Parquet only when a stale child needs them.
+Independent stages run in parallel on a thread pool and hand frames to each
+other in memory. A stage with ``publish`` also gets a CSV copy of its output,
+rewritten whenever it is missing or was edited by hand. Each run reports
+per-stage status and timing, also written to ``timings.json``.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from regionmatch import DATA_DIR
+from regionmatch.base_scores import file_digest
+
+BUILD_CACHE_DIR = DATA_DIR / "cache" / "build"
+MANIFEST_FILE = "manifest.json"
+TIMINGS_FILE = "timings.json"
+
+
+@dataclass(frozen=True)
+class Source:
+    name: str
+    path: Path
+    read: Callable[[Path], pd.DataFrame] = pd.read_csv
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    func: Callable[..., pd.DataFrame]
+    inputs: Tuple[str, ...]
+    publish: Optional[Path] = None
+    params: Dict = field(default_factory=dict)
+    code: Tuple[Path, ...] = ()  # extra files the stage's output depends on (config, data tables read directly)
+
+
+def code_files(func):
+    """
+    Source files ``func`` depends on: its module's and, transitively, those
+    of the regionmatch modules imported into it (as modules or names).
+    """
+    files, seen = [], set()
+    stack = [inspect.getmodule(func)]
+    while stack:
+        module = stack.pop()
+        if module is None or module.__name__ in seen:
+            continue
+        seen.add(module.__name__)
+        path = getattr(module, "__file__", None)
+        if path:
+            files.append(path)
+        for value in vars(module).values():
+            dep = value if inspect.ismodule(value) else sys.modules.get(getattr(value, "__module__", None) or "")
+            if dep is not None and dep.__name__.partition(".")[0] == "regionmatch" and dep.__name__ not in seen:
+                stack.append(dep)
+    return sorted(files)
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str  # "ran", "cached" or "source"
+    seconds: float = 0.0
+    rows: Optional[int] = None
+    columns: Optional[int] = None
+
+
+def _digest(*parts) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(str(p).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def path_digest(path) -> str:
+    """SHA-256 of a file, or of a directory's files (relative names and contents)."""
+    path = Path(path)
+    if not path.is_dir():
+        return file_digest(path)
+    files = sorted(
+        p for p in path.rglob("*")
+        if p.is_file() and not any(part.startswith(".") for part in p.relative_to(path).parts)
+    )
+    return _digest("dir", *(f"{p.relative_to(path).as_posix()}:{file_digest(p)}" for p in files))
+
+
+class Pipeline:
+    def __init__(self, nodes, cache_dir=BUILD_CACHE_DIR):
+        self.nodes = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Duplicate pipeline node: {node.name}")
+            self.nodes[node.name] = node
+        self.cache_dir = Path(cache_dir)
+        self._order = self._topological_order()
+        self._manifest_lock = threading.Lock()
+
+    # ---------- graph ----------
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle in pipeline: {' -> '.join(path + [name])}")
+            if name not in self.nodes:
+                raise ValueError(f"Unknown pipeline input {name!r} (needed by {path[-1] if path else '?'})")
+            state[name] = "visiting"
+            node = self.nodes[name]
+            for dep in getattr(node, "inputs", ()):
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name, [])
+        return order
+
+    def ancestors(self, targets):
+        """``targets`` plus everything they depend on, in build order."""
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name in needed:
+                continue
+            if name not in self.nodes:
+                raise ValueError(f"Unknown pipeline stage {name!r}")
+            needed.add(name)
+            stack.extend(getattr(self.nodes[name], "inputs", ()))
+        return [n for n in self._order if n in needed]
+
+    def default_targets(self):
+        """Stages with a ``publish`` path, or every sink when nothing is published."""
+        published = [n for n in self._order if getattr(self.nodes[n], "publish", None) is not None]
+        if published:
+            return published
+        used = {dep for node in self.nodes.values() for dep in getattr(node, "inputs", ())}
+        return [n for n in self._order if n not in used]
+
+    def with_source(self, name, path) -> "Pipeline":
+        """Copy of the pipeline where stage ``name`` is read from ``path`` instead of built."""
+        nodes = [Source(name, Path(path)) if n.name == name else n for n in self.nodes.values()]
+        return Pipeline(nodes, self.cache_dir)
+
+    # ---------- keys / cache ----------
+
+    def keys(self, names=None):
+        keys = {}
+        for name in names or self._order:
+            node = self.nodes[name]
+            if isinstance(node, Source):
+                if not Path(node.path).exists():
+                    raise FileNotFoundError(f"Pipeline source {name!r} not found: {node.path}")
+                keys[name] = _digest("source", path_digest(node.path))
+            else:
+                code = [file_digest(p) for p in code_files(node.func)] + [path_digest(p) for p in node.code]
+                keys[name] = _digest(
+                    "stage", name, node.func.__qualname__, *code,
+                    json.dumps(node.params, sort_keys=True, default=str),
+                    *(keys[dep] for dep in node.inputs),
+                )
+        return keys
+
+    def _cache_path(self, name):
+        return self.cache_dir / f"{name}.parquet"
+
+    def _read_manifest(self):
+        try:
+            with open(self.cache_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_json(self, filename, payload):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / filename
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp, path)
+
+    def _is_fresh(self, name, key, manifest):
+        entry = manifest.get(name) or {}
+        return entry.get("key") == key and self._cache_path(name).exists()
+
+    def plan(self, targets=None, force=False):
+        """Stages a run would execute, in build order."""
+        names = self.ancestors(targets or self.default_targets())
+        keys = self.keys(names)
+        manifest = self._read_manifest()
+        return [
+            n for n in names
+            if isinstance(self.nodes[n], Stage) and (force or not self._is_fresh(n, keys[n], manifest))
+        ]
+
+    # ---------- run ----------
+
+    def run(self, targets=None, workers=None, force=False, log=print):
+        """
+        Bring ``targets`` (default: the published stages) up to date.
+
+        Returns ``{name: StageResult}`` for every node involved.
+        """
+        t_run = time.perf_counter()
+        names = self.ancestors(targets or self.default_targets())
+        keys = self.keys(names)
+        manifest = self._read_manifest()
+        stale = {
+            n for n in names
+            if isinstance(self.nodes[n], Stage) and (force or not self._is_fresh(n, keys[n], manifest))
+        }
+
+        frames = {}
+        frames_lock = threading.Lock()
+        results = {n: StageResult(n, "source" if isinstance(self.nodes[n], Source) else "cached") for n in names}
+
+        def frame(name):
+            with frames_lock:
+                if name in frames:
+                    return frames[name]
+            node = self.nodes[name]
+            t0 = time.perf_counter()
+            df = node.read(node.path) if isinstance(node, Source) else pd.read_parquet(self._cache_path(name))
+            with frames_lock:
+                frames.setdefault(name, df)
+                if isinstance(node, Source):
+                    results[name].seconds += time.perf_counter() - t0
+                    results[name].rows, results[name].columns = df.shape
+                return frames[name]
+
+        def run_stage(name):
+            stage = self.nodes[name]
+            inputs = [frame(dep) for dep in stage.inputs]
+            t0 = time.perf_counter()
+            out = stage.func(*inputs, **stage.params)
+            if not isinstance(out, pd.DataFrame):
+                raise TypeError(f"Stage {name!r} returned {type(out).__name__}, not a DataFrame")
+            seconds = time.perf_counter() - t0
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._cache_path(name).with_name(f"{name}.{os.getpid()}.tmp.parquet")
+            out.to_parquet(tmp, index=False)
+            os.replace(tmp, self._cache_path(name))
+            with frames_lock:
+                frames[name] = out
+            with self._manifest_lock:
+                manifest[name] = {"key": keys[name], "rows": len(out), "built_at": time.time()}
+                self._write_json(MANIFEST_FILE, manifest)
+            return seconds, out.shape
+
+        pending = {}
+        done = set(n for n in names if n not in stale)
+        with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+            try:
+                while len(done) < len(names):
+                    for name in names:
+                        if name in done or name in pending.values():
+                            continue
+                        if all(dep in done for dep in self.nodes[name].inputs):
+                            log(f"▶ {name}")
+                            pending[pool.submit(run_stage, name)] = name
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        name = pending.pop(fut)
+                        seconds, shape = fut.result()
+                        res = results[name]
+                        res.status, res.seconds = "ran", seconds
+                        res.rows, res.columns = shape
+                        done.add(name)
+                        log(f"✓ {name} {shape[0]}×{shape[1]} in {seconds:.2f} s")
+            except BaseException:
+                for f in pending:
+                    f.cancel()
+                raise
+
+        for name in names:
+            self._publish(name, frame, manifest)
+
+        total = time.perf_counter() - t_run
+        self._write_json(TIMINGS_FILE, {
+            "total_seconds": total,
+            "stages": {n: vars(r) for n, r in results.items()},
+        })
+        log(format_results(results, total))
+        return results
+
+    def _publish(self, name, frame, manifest):
+        stage = self.nodes[name]
+        if not isinstance(stage, Stage) or stage.publish is None:
+            return
+        path = Path(stage.publish)
+        entry = manifest.setdefault(name, {})
+        if path.exists() and entry.get("published_key") == entry.get("key") \
+                and entry.get("published_digest") == file_digest(path):
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        frame(name).to_csv(tmp, index=False)
+        os.replace(tmp, path)
+        with self._manifest_lock:
+            entry.update(published_key=entry.get("key"), published_digest=file_digest(path))
+            self._write_json(MANIFEST_FILE, manifest)
+
+
+def format_results(results, total=None) -> str:
+    lines = [f"{'stage':<22} {'status':<7} {'seconds':>8}  shape"]
+    for r in results.values():
+        shape = f"{r.rows}×{r.columns}" if r.rows is not None else "-"
+        lines.append(f"{r.name:<22} {r.status:<7} {r.seconds:>8.3f}  {shape}")
+    if total is not None:
+        ran = sum(r.status == "ran" for r in results.values())
+        lines.append(f"{ran} stage(s) ran, total {total:.2f} s")
+    return "\n".join(lines)
@@ -0,0 +1,241 @@
+"""
+Postcode -> LAD lookup and per-LAD incorporation features.
+
+The lookup is built from a local ONS postcode directory: the ONSPD or NSPL
+CSV, or any CSV with a postcode column and a LAD code column. Postcodes are
+normalised to upper case with no spaces (at most 7 ASCII characters), packed
+big-endian into a uint64 and kept as a sorted array with an int16 LAD index
+alongside, so mapping millions of company postcodes is a single integer
+``np.searchsorted``. A postcode that is not in
+the directory (too new, or mistyped in its last letters) falls back to the
+most common LAD of its sector, i.e. everything but the last two characters.
+
+Parsing the 2.7M-row directory is the slow part, so the arrays are cached in
+``data/cache/postcode_lad.npz``, keyed on the SHA-256 of the directory file.
+"""
+
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from regionmatch import DATA_DIR
+from regionmatch.base_scores import file_digest
+
+ONSPD_PATH = DATA_DIR / "raw" / "ONSPD.csv"
+POSTCODE_LOOKUP_PATH = DATA_DIR / "cache" / "postcode_lad.npz"
+
+POSTCODE_COLUMNS = ("pcds", "pcd", "pcd7", "pcd8", "postcode", "postal_code")
+LAD_COLUMNS = ("oslaua", "laua", "lad_code", "ladcd")
+_LAD_YEAR_COLUMN = re.compile(r"^lad\d{2}cd$")
+
+POSTCODE_DTYPE = "S7"
+
+INCORPORATION_COLUMNS = [
+    "incorporations_total",
+    "incorporations_12m",
+    "incorporations_prev_12m",
+    "incorporation_growth",
+]
+
+
+def normalise_postcodes(values) -> np.ndarray:
+    """Upper-case, strip everything but letters and digits; invalid or missing -> b''."""
+    s = pd.Series(values, dtype="string").str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
+    s = s.where(s.str.len().between(5, 7), "").fillna("")
+    return s.to_numpy(dtype=object).astype(POSTCODE_DTYPE)
+
+
+def sector_keys(packed: np.ndarray) -> np.ndarray:
+    """Packed sector of each packed postcode (drop the unit's two trailing letters)."""
+    chars = packed.astype(">u8").view(np.uint8).reshape(-1, 8).copy()
+    length = (chars != 0).sum(axis=1)
+    chars[np.arange(8) >= (length - 2)[:, None]] = 0
+    return chars.view(">u8").ravel().astype(np.uint64)
+
+
+def pack_keys(fixed: np.ndarray) -> np.ndarray:
+    """Pack fixed-width byte strings (<= 8 bytes) into uint64s that sort like the strings."""
+    width = fixed.dtype.itemsize
+    chars = np.zeros((len(fixed), 8), dtype=np.uint8)
+    chars[:, :width] = np.ascontiguousarray(fixed).view(np.uint8).reshape(-1, width)
+    return chars.view(">u8").ravel().astype(np.uint64)
+
+
+def _pick_column(columns, candidates, pattern=None, what="column"):
+    lower = {c.lower(): c for c in columns}
+    for name in candidates:
+        if name in lower:
+            return lower[name]
+    if pattern is not None:
+        matches = sorted((c for c in lower if pattern.match(c)), reverse=True)
+        if matches:
+            return lower[matches[0]]
+    raise ValueError(f"No {what} found (expected one of {', '.join(candidates)})")
+
+
+def _sorted_lookup(keys: np.ndarray, values: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """values[i] where keys[i] == query (uint64 keys sorted, 0 = empty), -1 where absent."""
+    if len(keys) == 0:
+        return np.full(len(queries), -1, dtype=np.int32)
+    pos = np.searchsorted(keys, queries)
+    pos_c = np.minimum(pos, len(keys) - 1)
+    found = (keys[pos_c] == queries) & (queries != 0)
+    return np.where(found, values[pos_c], -1).astype(np.int32)
+
+
+class PostcodeLookup:
+    """
+    Sorted packed postcodes -> LAD index, plus sector -> majority LAD.
+
+    ``postcodes`` / ``sectors`` are uint64 keys from pack_keys(); ``lad_idx`` /
+    ``sector_lad`` index ``lad_codes``.
+    """
+
+    def __init__(self, postcodes, lad_idx, lad_codes, sectors, sector_lad):
+        self.postcodes = postcodes
+        self.lad_idx = lad_idx
+        self.lad_codes = np.asarray(lad_codes, dtype=object)
+        self.sectors = sectors
+        self.sector_lad = sector_lad
+
+    def __len__(self):
+        return len(self.postcodes)
+
+    @classmethod
+    def from_frame(cls, postcodes, lad_codes) -> "PostcodeLookup":
+        pcs = normalise_postcodes(postcodes)
+        lads = pd.Series(lad_codes, dtype="string").str.strip()
+        keep = (pcs != b"") & lads.notna().to_numpy() & (lads != "").fillna(False).to_numpy()
+        pcs = pack_keys(pcs[keep])
+        codes, uniques = pd.factorize(lads[keep].to_numpy(dtype=object), sort=True)
+        codes = codes.astype(np.int16)
+
+        order = np.argsort(pcs, kind="stable")
+        pcs, codes = pcs[order], codes[order]
+        first = np.ones(len(pcs), dtype=bool)
+        first[1:] = pcs[1:] != pcs[:-1]
+        pcs, codes = pcs[first], codes[first]
+
+        # Majority LAD per sector, for postcodes missing from the directory
+        sec = pd.DataFrame({"sector": sector_keys(pcs), "lad": codes})
+        majority = (
+            sec.value_counts(["sector", "lad"], sort=False)
+            .reset_index(name="n")
+            .sort_values(["sector", "n", "lad"], ascending=[True, False, True], kind="stable")
+            .drop_duplicates("sector")
+        )
+        return cls(
+            pcs,
+            codes,
+            np.asarray(uniques, dtype=object),
+            majority["sector"].to_numpy(dtype=np.uint64),
+            majority["lad"].to_numpy(dtype=np.int16),
+        )
+
+    @classmethod
+    def from_directory(cls, path) -> "PostcodeLookup":
+        """Build from an ONS postcode directory CSV (only two columns are parsed)."""
+        header = pd.read_csv(path, nrows=0).columns
+        pc_col = _pick_column(header, POSTCODE_COLUMNS, what="postcode column")
+        lad_col = _pick_column(header, LAD_COLUMNS, _LAD_YEAR_COLUMN, what="LAD code column")
+        df = pd.read_csv(path, usecols=[pc_col, lad_col], dtype=str, keep_default_na=False)
+        return cls.from_frame(df[pc_col].to_numpy(), df[lad_col].to_numpy())
+
+    @classmethod
+    def load(cls, path=ONSPD_PATH, cache_path=POSTCODE_LOOKUP_PATH) -> "PostcodeLookup":
+        """The lookup for ``path``, from the npz cache when it was built from the same file."""
+        key = file_digest(path)
+        cache_path = Path(cache_path)
+        try:
+            with np.load(cache_path, allow_pickle=False) as npz:
+                if str(npz["key"]) == key:
+                    return cls(
+                        npz["postcodes"], npz["lad_idx"], npz["lad_codes"].astype(object),
+                        npz["sectors"], npz["sector_lad"],
+                    )
+        except (OSError, KeyError, ValueError):
+            pass
+        lookup = cls.from_directory(path)
+        lookup.save(cache_path, key)
+        return lookup
+
+    def save(self, cache_path, key) -> None:
+        cache_path = Path(cache_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp.npz")
+        try:
+            np.savez(
+                tmp, key=np.array(key), postcodes=self.postcodes, lad_idx=self.lad_idx,
+                lad_codes=self.lad_codes.astype(str), sectors=self.sectors, sector_lad=self.sector_lad,
+            )
+            os.replace(tmp, cache_path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def lookup(self, postcodes, sector_fallback=True):
+        """
+        LAD index (into ``lad_codes``) for each postcode, -1 when unknown.
+
+        Returns ``(idx, how)`` where ``how`` is 1 for an exact match, 2 for a
+        sector fallback and 0 for no match.
+        """
+        pcs = pack_keys(normalise_postcodes(postcodes))
+        idx = _sorted_lookup(self.postcodes, self.lad_idx, pcs)
+        how = (idx >= 0).astype(np.int8)
+        if sector_fallback:
+            missing = np.flatnonzero(idx < 0)
+            if len(missing):
+                by_sector = _sorted_lookup(self.sectors, self.sector_lad, sector_keys(pcs[missing]))
+                idx[missing] = by_sector
+                how[missing[by_sector >= 0]] = 2
+        return idx, how
+
+    def lad_codes_for(self, postcodes, sector_fallback=True) -> np.ndarray:
+        idx, _ = self.lookup(postcodes, sector_fallback)
+        codes = np.append(self.lad_codes, None)
+        return codes[idx]  # -1 picks the trailing None
+
+
+def incorporation_features(lad_idx, dates, lad_codes, as_of=None) -> pd.DataFrame:
+    """
+    Per-LAD incorporation counts and 12-month growth.
+
+    ``lad_idx`` indexes ``lad_codes`` (-1 = unmapped, ignored), ``dates`` are
+    incorporation dates. ``incorporations_12m`` counts the 365 days up to
+    ``as_of`` (default: latest date), ``incorporations_prev_12m`` the 365
+    before that, and growth is their relative change (NaN without a prior
+    year). Every LAD in ``lad_codes`` gets a row, so absent LADs count 0.
+    """
+    lad_idx = np.asarray(lad_idx)
+    # parse each distinct date once: a year of incorporations has ~365 of them
+    codes, uniques = pd.factorize(np.asarray(dates, dtype=object))
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce").to_numpy(dtype="datetime64[D]")
+    dates = np.append(parsed, np.datetime64("NaT", "D"))[codes]
+    n = len(lad_codes)
+    ok = lad_idx >= 0
+    valid_dates = ~np.isnat(dates)
+    if as_of is None:
+        as_of = dates[valid_dates].max() if valid_dates.any() else np.datetime64("NaT")
+    as_of = np.datetime64(as_of, "D")
+
+    age = (as_of - dates).astype("timedelta64[D]").astype(np.float64)
+    age[~valid_dates] = np.nan
+    recent = ok & (age >= 0) & (age < 365)
+    prev = ok & (age >= 365) & (age < 730)
+
+    total = np.bincount(lad_idx[ok], minlength=n)
+    recent_n = np.bincount(lad_idx[recent], minlength=n)
+    prev_n = np.bincount(lad_idx[prev], minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(prev_n > 0, (recent_n - prev_n) / prev_n, np.nan)
+
+    return pd.DataFrame({
+        "lad_code": np.asarray(lad_codes, dtype=object),
+        "incorporations_total": total,
+        "incorporations_12m": recent_n,
+        "incorporations_prev_12m": prev_n,
+        "incorporation_growth": growth,
+    })
@@ -0,0 +1,220 @@
+"""
+Versioned model registry.
+
+    models/registry/
+        CURRENT                       "v0003"
+        v0003/
+            manifest.json             parent, created, source, model, feature_hash, metrics, files
+            location_model.joblib
+            model_features.joblib
+            linear_scorer.json/.npy   NumPy export (linear models only)
+            location_model_stats.npz  incremental-update statistics (when published with them)
+            base_scores.npz           derived, written on first use
+            score_tensor.npz          derived, scripts/build/build_score_tensor.py
+
+The training scripts publish a new version instead of overwriting files in
+place. The files go to a staging directory that is renamed into place as a
+whole, then ``CURRENT`` is replaced atomically (temp file + ``os.replace``).
+A reader following ``CURRENT`` therefore sees either the old version or all
+of the new one. Published versions are never modified; rolling back is
+pointing ``CURRENT`` at an older one (``scripts/train/model_registry.py``).
+
+Derived caches (base scores, score tensor) live inside their version's
+directory, so switching versions never serves another version's scores.
+Without a ``CURRENT`` the legacy files directly in ``models/`` are used; they
+have the same names.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from regionmatch import MODELS_DIR
+from regionmatch.base_scores import file_digest
+from regionmatch.linear import LinearScorer, load_model
+
+REGISTRY_DIR = MODELS_DIR / "registry"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+MODEL_FILE = "location_model.joblib"
+FEATURES_FILE = "model_features.joblib"
+SCORER_FILE = "linear_scorer.json"
+STATS_FILE = "location_model_stats.npz"
+BASE_SCORES_FILE = "base_scores.npz"
+SCORE_TENSOR_FILE = "score_tensor.npz"
+
+_VERSION_RE = re.compile(r"^v(\d+)$")
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    """One published version (``version`` is None for the legacy files in models/)."""
+
+    version: Optional[str]
+    directory: Path
+
+    @property
+    def model_path(self) -> Path:
+        return self.directory / MODEL_FILE
+
+    @property
+    def features_path(self) -> Path:
+        return self.directory / FEATURES_FILE
+
+    @property
+    def scorer_path(self) -> Path:
+        return self.directory / SCORER_FILE
+
+    @property
+    def stats_path(self) -> Path:
+        return self.directory / STATS_FILE
+
+    @property
+    def base_scores_path(self) -> Path:
+        return self.directory / BASE_SCORES_FILE
+
+    @property
+    def score_tensor_path(self) -> Path:
+        return self.directory / SCORE_TENSOR_FILE
+
+    @property
+    def label(self) -> str:
+        return self.version or "legacy"
+
+    def manifest(self) -> dict:
+        """The version's manifest ({} for the legacy files)."""
+        try:
+            return json.loads((self.directory / MANIFEST_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+
+
+def feature_hash(features) -> str:
+    return hashlib.sha256(json.dumps([str(f) for f in features]).encode("utf-8")).hexdigest()
+
+
+def versions(registry_dir=REGISTRY_DIR):
+    """Published version names, oldest first."""
+    try:
+        names = [p.name for p in Path(registry_dir).iterdir() if p.is_dir() and _VERSION_RE.match(p.name)]
+    except FileNotFoundError:
+        return []
+    return sorted(names, key=lambda name: int(_VERSION_RE.match(name).group(1)))
+
+
+def get(version, registry_dir=REGISTRY_DIR) -> ModelVersion:
+    if version is None:
+        return ModelVersion(None, MODELS_DIR)
+    directory = Path(registry_dir) / version
+    if not _VERSION_RE.match(str(version)) or not directory.is_dir():
+        raise KeyError(f"No model version {version!r} in {registry_dir}")
+    return ModelVersion(version, directory)
+
+
+def current_version(registry_dir=REGISTRY_DIR) -> Optional[str]:
+    try:
+        return (Path(registry_dir) / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current(registry_dir=REGISTRY_DIR) -> ModelVersion:
+    """The version ``CURRENT`` points at, or the legacy files when there is none."""
+    return get(current_version(registry_dir), registry_dir)
+
+
+def set_current(version, registry_dir=REGISTRY_DIR) -> None:
+    """Point ``CURRENT`` at a published version in one atomic rename."""
+    get(version, registry_dir)
+    pointer = Path(registry_dir) / CURRENT_FILE
+    tmp = pointer.with_name(f"{CURRENT_FILE}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, pointer)
+
+
+def load_version(model_version: ModelVersion):
+    """
+    ``(model, feature_list, artifact_paths)`` as :func:`regionmatch.linear.load_model`
+    returns them, after checking the feature list against the manifest.
+    """
+    model, features, files = load_model(
+        model_version.model_path, model_version.features_path, model_version.scorer_path
+    )
+    expected = model_version.manifest().get("feature_hash")
+    if expected is not None and feature_hash(features) != expected:
+        raise ValueError(f"Model version {model_version.label}: feature list does not match its manifest")
+    return model, features, files
+
+
+def publish(
+    pipeline,
+    features,
+    metrics=None,
+    stats=None,
+    source=None,
+    parent=None,
+    activate=True,
+    registry_dir=REGISTRY_DIR,
+) -> ModelVersion:
+    """
+    Publish a fitted pipeline and its feature list as the next version.
+
+    ``stats`` (a :class:`regionmatch.incremental.SufficientStats`) is saved
+    with it for incremental updates; ``parent`` is the version it was derived
+    from. ``activate`` makes it current.
+    """
+    import joblib
+
+    registry_dir = Path(registry_dir)
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    staging = registry_dir / f".staging-{os.getpid()}-{uuid.uuid4().hex}"
+    staging.mkdir()
+    try:
+        joblib.dump(pipeline, staging / MODEL_FILE)
+        joblib.dump(list(features), staging / FEATURES_FILE)
+        try:
+            LinearScorer.from_pipeline(pipeline, list(features)).save(staging / SCORER_FILE, source=staging / MODEL_FILE)
+        except TypeError:
+            pass  # not a linear model: the app scores with the pipeline
+        if stats is not None:
+            stats.save(staging / STATS_FILE)
+
+        model = pipeline.steps[-1][1] if hasattr(pipeline, "steps") else pipeline
+        manifest = {
+            "parent": parent,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "source": source,
+            "model": type(model).__name__,
+            "n_features": len(features),
+            "feature_hash": feature_hash(features),
+            "metrics": metrics or {},
+            "files": {p.name: file_digest(p) for p in sorted(staging.iterdir())},
+        }
+        (staging / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2, default=float), encoding="utf-8")
+
+        # Claim the next free number; a concurrent publisher that got there first makes the rename fail.
+        while True:
+            taken = versions(registry_dir)
+            number = int(_VERSION_RE.match(taken[-1]).group(1)) + 1 if taken else 1
+            try:
+                os.rename(staging, registry_dir / f"v{number:04d}")
+                break
+            except OSError:
+                if not (registry_dir / f"v{number:04d}").exists():
+                    raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    version = get(f"v{number:04d}", registry_dir)
+    if activate:
+        set_current(version.version, registry_dir)
+    return version
@@ -0,0 +1,123 @@
+"""
+Ridge regularisation path from a single SVD.
+
+After the pipeline's imputer and scaler, the design matrix Z is centred
+(Ridge fits an intercept) and decomposed once: Z = U diag(s) V^T. For any
+alpha the coefficients, fitted values and hat-matrix diagonal are then
+closed-form with shrinkage factors d = s^2 / (s^2 + alpha)::
+
+    coef(alpha) = V diag(s / (s^2 + alpha)) U^T y
+    yhat        = mean(y) + U diag(d) U^T y
+    h_ii        = 1/n + sum_j U_ij^2 d_j
+
+which gives the exact leave-one-out residuals (y - yhat) / (1 - h_ii) and
+the generalised CV error mean(((y - yhat) / (1 - tr(H)/n))^2) for a whole
+grid of alphas as a few (n x rank) x (rank x n_alphas) products. As with
+sklearn's RidgeCV, the imputer and scaler are fitted once on all rows
+rather than per left-out row.
+
+The winner is exported as the usual imputer -> scaler -> Ridge Pipeline,
+with the Ridge holding the path's coefficients rather than a refit: near
+the bottom of the grid the problem is close to OLS and ill-conditioned, so
+an iterative or Cholesky refit can differ from the SVD solution in the last
+digits without either being wrong.
+
+ALPHAS stops at 1e-4. On the shipped training table LOO picks that lower
+edge, but the error curve is flat below about 1e-3 (the smallest s^2 there
+is about 0.5, so 1e-4 shrinks no direction by more than 0.02%): the chosen
+model is effectively OLS on the scaled features, and a smaller alpha would
+not change it.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+ALPHAS = np.logspace(-4, 4, 161)
+CRITERIA = ("loo", "gcv")
+
+
+class RidgePath:
+    """Closed-form Ridge fits and CV errors for any alpha, from one SVD of ``Z``."""
+
+    def __init__(self, Z, y):
+        Z = np.asarray(Z, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.n = len(y)
+        self.x_mean = Z.mean(axis=0)
+        self.y_mean = y.mean()
+        self.y = y
+        U, s, Vt = np.linalg.svd(Z - self.x_mean, full_matrices=False)
+        keep = s > s.max(initial=0.0) * max(Z.shape) * np.finfo(np.float64).eps  # directions with s = 0 never move
+        self.U, self.s, self.Vt = U[:, keep], s[keep], Vt[keep]
+        self.Uty = self.U.T @ (y - self.y_mean)
+        self._U2 = self.U ** 2
+
+    def _shrink(self, alphas):
+        s2 = self.s ** 2
+        return s2 / (s2 + np.asarray(alphas, dtype=np.float64)[:, None])  # (n_alphas, rank)
+
+    def coef(self, alphas) -> np.ndarray:
+        """(n_alphas, n_features) coefficients on the scaled features."""
+        alphas = np.atleast_1d(alphas).astype(np.float64)
+        factors = self.s / (self.s ** 2 + alphas[:, None])
+        return (factors * self.Uty) @ self.Vt
+
+    def errors(self, alphas) -> pd.DataFrame:
+        """Leave-one-out and generalised CV mean squared error for every alpha."""
+        alphas = np.atleast_1d(alphas).astype(np.float64)
+        d = self._shrink(alphas)
+        resid = self.y[:, None] - self.y_mean - self.U @ (d * self.Uty).T    # (n, n_alphas)
+        h = 1.0 / self.n + self._U2 @ d.T
+        dof = 1.0 + d.sum(axis=1)
+        return pd.DataFrame({
+            "alpha": alphas,
+            "loo_mse": np.mean((resid / (1 - h)) ** 2, axis=0),
+            "gcv_mse": np.mean(resid ** 2, axis=0) / (1 - dof / self.n) ** 2,
+            "train_mse": np.mean(resid ** 2, axis=0),
+            "dof": dof,
+        })
+
+    def select(self, alphas=ALPHAS, criterion="loo"):
+        """``(best_alpha, table)`` minimising the ``criterion`` ("loo" or "gcv") error."""
+        if criterion not in CRITERIA:
+            raise ValueError(f"criterion must be one of {CRITERIA}, not {criterion!r}")
+        table = self.errors(alphas)
+        best = float(table.loc[table[f"{criterion}_mse"].idxmin(), "alpha"])
+        return best, table
+
+
+def fit_ridge_path(X, y, alphas=ALPHAS, criterion="loo", log=print):
+    """
+    Pick alpha on the Ridge path and return ``(pipeline, best_alpha, table)``.
+
+    ``pipeline`` is an imputer -> scaler -> Ridge(alpha=best) Pipeline fitted
+    on all of ``X`` / ``y``, the same format retrain_location_model.py saves.
+    The Ridge's ``coef_`` / ``intercept_`` are the closed-form path solution.
+    """
+    t0 = time.perf_counter()
+    imputer = SimpleImputer(strategy="median")
+    scaler = StandardScaler()
+    Z = scaler.fit_transform(imputer.fit_transform(X))
+    path = RidgePath(Z, y)
+    best, table = path.select(alphas, criterion)
+    t1 = time.perf_counter()
+
+    model = Ridge(alpha=best, solver="svd", random_state=42)
+    model.coef_ = path.coef(best)[0]
+    model.intercept_ = float(path.y_mean - path.x_mean @ model.coef_)
+    model.n_features_in_ = Z.shape[1]
+    model.n_iter_ = None
+    model.solver_ = "svd"
+    log(f"  Ridge path: SVD rank {len(path.s)}, {len(table)} alphas scored in {1e3 * (t1 - t0):.1f} ms; "
+        f"best alpha {best:.4g} by {criterion.upper()}")
+    if best == table["alpha"].min():
+        log("  Note: best alpha is the smallest in the grid; the fit is effectively OLS on the scaled features")
+    elif best == table["alpha"].max():
+        log("  Note: best alpha is at the top of the grid; widen the alphas to be sure of the optimum")
+    return Pipeline([("imputer", imputer), ("scaler", scaler), ("model", model)]), best, table
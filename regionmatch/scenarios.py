@@ -0,0 +1,198 @@
+"""
+All-scenarios score tensor.
+
+The ranking only depends on (city, industry, urgency): employees never moves
+scores. With 45 cities x 6 industries x 3 urgency levels there are 810
+combinations, so the whole pipeline (industry boost, urgency factor, std
+rescaling, radius filter, renormalisation, top-N) is evaluated for all of them
+at once with NumPy broadcasting and stored as one small array. A page
+interaction is then an index lookup; the random 99-99.5 cap is still applied by
+the caller because it is deliberately not deterministic.
+
+Build it with ``python scripts/build/build_score_tensor.py``.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from regionmatch import MODELS_DIR
+from regionmatch.constants import (
+    CITY_RADIUS_KM,
+    IN_CITY_RADIUS_KM,
+    INDUSTRIES,
+    INDUSTRY_COL_MAP,
+    INDUSTRY_WEIGHT,
+    TOP_N,
+    UK_CITIES,
+    URGENCY,
+    URGENCY_FACTOR_MAP,
+)
+from regionmatch.geo import clamp_to_uk
+from regionmatch.spatial import CentroidIndex
+
+SCORE_TENSOR_PATH = MODELS_DIR / "score_tensor.npz"
+
+# Bump when the ranking maths changes so stale tensors are rebuilt.
+TENSOR_VERSION = 1
+
+
+def tensor_key(scores_key: str) -> str:
+    return f"{scores_key}:v{TENSOR_VERSION}"
+
+
+def _minmax(values: np.ndarray) -> np.ndarray:
+    lo = np.nanmin(values)
+    hi = np.nanmax(values)
+    if not hi > lo:
+        return np.zeros(len(values), dtype=float)
+    return (values - lo) / (hi - lo)
+
+
+def global_scores(base: np.ndarray, df: pd.DataFrame) -> np.ndarray:
+    """0-100 scores over all LADs, shape (n_industries, n_urgency, n_lads)."""
+    base = np.asarray(base, dtype=float)
+    boosts = np.zeros((len(INDUSTRIES), len(base)), dtype=float)
+    for i, industry in enumerate(INDUSTRIES):
+        col = INDUSTRY_COL_MAP.get(industry)
+        if col and col in df.columns:
+            boosts[i] = _minmax(pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float))
+
+    factors = np.array([URGENCY_FACTOR_MAP[u] for u in URGENCY], dtype=float)
+    adj = factors[None, :, None] * INDUSTRY_WEIGHT * boosts[:, None, :]
+
+    base_std = float(np.std(base)) + 1e-9
+    adj_std = np.std(adj, axis=-1, keepdims=True) + 1e-9
+    final = 0.50 * base + 0.50 * adj * (base_std / adj_std)
+
+    lo = np.nanmin(final, axis=-1, keepdims=True)
+    hi = np.nanmax(final, axis=-1, keepdims=True)
+    return 100 * (final - lo) / (hi - lo + 1e-9)
+
+
+def candidate_masks(df: pd.DataFrame, cities=UK_CITIES, index=None) -> np.ndarray:
+    """Boolean (n_cities, n_lads): LAD is in the 10-50 km ring around the city."""
+    if not {"lad_lat", "lad_lng"}.issubset(df.columns):
+        return np.ones((len(cities), len(df)), dtype=bool)
+
+    if index is None:
+        index = CentroidIndex.from_frame(df)
+    centres = np.array([clamp_to_uk(c_lng, c_lat) for _, c_lng, c_lat in cities], dtype=float)
+    return index.annulus_masks(centres[:, 1], centres[:, 0], IN_CITY_RADIUS_KM, CITY_RADIUS_KM)
+
+
+def build_scenario_tensor(base: np.ndarray, df: pd.DataFrame, top_n: int = TOP_N, index=None):
+    """
+    Rank every (city, industry, urgency) combination.
+
+    Returns ``(top_idx, top_score)`` with shape (cities, industries, urgency,
+    top_n). ``top_idx`` holds positional row indices into ``df`` and is -1
+    where a city has fewer than ``top_n`` candidates.
+    """
+    scores = global_scores(base, df)                           # (I, U, N)
+    mask = candidate_masks(df, index=index)[:, None, None, :]  # (C, 1, 1, N)
+    local = np.where(mask, scores[None], np.nan)               # (C, I, U, N)
+
+    # Re-normalise within each city's candidate set (when it is not constant)
+    with np.errstate(all="ignore"):
+        lo = np.nanmin(local, axis=-1, keepdims=True)
+        hi = np.nanmax(local, axis=-1, keepdims=True)
+    spread = hi > lo
+    local = np.where(spread, 100 * (local - lo) / (hi - lo + 1e-9), local)
+
+    # Descending sort; non-candidates sort after every candidate
+    sort_key = np.where(mask, np.nan_to_num(local, nan=-1e300), -np.inf)
+    order = np.argsort(-sort_key, axis=-1, kind="stable")[..., :top_n]
+    valid = np.take_along_axis(np.broadcast_to(mask, local.shape), order, axis=-1)
+
+    top_idx = np.where(valid, order, -1).astype(np.int32)
+    top_score = np.where(valid, np.take_along_axis(local, order, axis=-1), np.nan)
+    return top_idx, top_score
+
+
+def save_scenario_tensor(path, key: str, top_idx: np.ndarray, top_score: np.ndarray) -> None:
+    path = Path(path)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez_compressed(
+        tmp,
+        key=np.array(key),
+        cities=np.array([c[0] for c in UK_CITIES]),
+        industries=np.array(INDUSTRIES),
+        urgency=np.array(URGENCY),
+        top_idx=top_idx,
+        top_score=top_score.astype(np.float32),
+    )
+    os.replace(tmp, path)
+
+
+class ScenarioTensor:
+    """Precomputed top-N per (city, industry, urgency)."""
+
+    def __init__(self, cities, industries, urgency, top_idx, top_score):
+        self.cities = list(cities)
+        self.industries = list(industries)
+        self.urgency = list(urgency)
+        self._city_pos = {c: i for i, c in enumerate(self.cities)}
+        self._industry_pos = {c: i for i, c in enumerate(self.industries)}
+        self._urgency_pos = {c: i for i, c in enumerate(self.urgency)}
+        self.top_idx = top_idx
+        self.top_score = top_score
+
+    @classmethod
+    def build(cls, base: np.ndarray, df: pd.DataFrame, top_n: int = TOP_N, index=None):
+        """Compute the tensor in memory (no file) for every UK_CITIES combination."""
+        top_idx, top_score = build_scenario_tensor(base, df, top_n=top_n, index=index)
+        return cls([c[0] for c in UK_CITIES], INDUSTRIES, URGENCY, top_idx, top_score)
+
+    @classmethod
+    def load(cls, path, key: str):
+        """Load the tensor, or return None if it is missing or was built for other inputs."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                if str(npz["key"]) != key:
+                    return None
+                return cls(
+                    npz["cities"].tolist(),
+                    npz["industries"].tolist(),
+                    npz["urgency"].tolist(),
+                    npz["top_idx"],
+                    npz["top_score"].astype(float),
+                )
+        except Exception:
+            return None
+
+    def lookup(self, city, industry, urgency):
+        """
+        ``(row_positions, scores)`` for a combination, or None when the tensor
+        does not cover it and the caller has to score live.
+        """
+        try:
+            pos = (self._city_pos[city], self._industry_pos[industry], self._urgency_pos[urgency])
+        except KeyError:
+            return None
+        idx = self.top_idx[pos]
+        keep = idx >= 0
+        return idx[keep], self.top_score[pos][keep]
+
+    def lookup_many(self, cities, industries, urgency):
+        """
+        Vectorised :meth:`lookup` for arrays of inputs.
+
+        Returns ``(row_positions, scores, covered)``: (n, top_n) arrays padded
+        with -1 / NaN, and a boolean (n,) that is False where the tensor does
+        not know the city, industry or urgency.
+        """
+        c = pd.Index(self.cities).get_indexer(np.asarray(cities, dtype=object))
+        i = pd.Index(self.industries).get_indexer(np.asarray(industries, dtype=object))
+        u = pd.Index(self.urgency).get_indexer(np.asarray(urgency, dtype=object))
+        covered = (c >= 0) & (i >= 0) & (u >= 0)
+        idx = np.full((len(c), self.top_idx.shape[-1]), -1, dtype=self.top_idx.dtype)
+        scores = np.full(idx.shape, np.nan)
+        idx[covered] = self.top_idx[c[covered], i[covered], u[covered]]
+        scores[covered] = self.top_score[c[covered], i[covered], u[covered]]
+        return idx, scores, covered
@@ -0,0 +1,212 @@
+"""
+Headless ranking: the recommendation pipeline without Streamlit.
+
+    from regionmatch.scoring import Profile, rank
+    top = rank(Profile("Technology", "<3 months"), "Leeds")
+
+``rank`` returns the top areas for a business profile around a city as a
+DataFrame (``lad_code``, ``lad_name``, ``score``), exactly as the app shows
+them: the per-LAD model score plus an industry boost scaled by urgency,
+rescaled to the base score's spread, normalised to 0-100, restricted to the
+10-50 km ring around the city, renormalised within that ring, top-N, and the
+best score capped at a random value in 99-99.5.
+
+:class:`Ranker` holds the loaded dataset, base scores, spatial index and (when
+current) the precomputed score tensor, so repeated calls only pay for the
+ranking itself. The module-level :func:`rank` uses one shared default ranker,
+which is rebuilt when the model registry's current version changes.
+"""
+
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from regionmatch.base_scores import base_scores_key, get_base_scores, prepare_features
+from regionmatch.constants import (
+    CITY_RADIUS_KM,
+    DEFAULT_URGENCY_FACTOR,
+    IN_CITY_RADIUS_KM,
+    INDUSTRY_COL_MAP,
+    INDUSTRY_WEIGHT,
+    TOP_N,
+    UK_CITIES,
+    URGENCY_FACTOR_MAP,
+)
+from regionmatch.dataset import load_dataset, resolve_dataset_path
+from regionmatch.geo import clamp_to_uk
+from regionmatch.registry import REGISTRY_DIR, current, current_version, load_version
+from regionmatch.scenarios import ScenarioTensor, tensor_key
+from regionmatch.spatial import CentroidIndex
+
+SCORE_CAP_RANGE = (99.0, 99.5)
+
+_CITY_CENTRES = {name: (lat, lng) for name, lng, lat in UK_CITIES}
+
+
+@dataclass(frozen=True)
+class Profile:
+    """What the user tells us about the business. Employees does not move the ranking."""
+
+    industry: str
+    urgency: str
+    employees: int = 25
+
+
+def city_centre(city):
+    """``(lat, lng)`` for a city name from UK_CITIES or an explicit ``(lat, lng)`` pair, clamped to the UK."""
+    if isinstance(city, str):
+        try:
+            lat, lng = _CITY_CENTRES[city]
+        except KeyError:
+            raise ValueError(f"Unknown city {city!r}") from None
+    else:
+        lat, lng = city
+    lng, lat = clamp_to_uk(float(lng), float(lat))
+    return lat, lng
+
+
+def minmax_series(s):
+    s = pd.to_numeric(s, errors="coerce")
+    if s.nunique(dropna=True) <= 1:
+        return pd.Series(np.zeros(len(s)), index=s.index)
+    return (s - s.min()) / (s.max() - s.min())
+
+
+def apply_score_cap(top: pd.DataFrame, rng=None) -> pd.DataFrame:
+    """Scale scores so the best one lands on a random value in 99-99.5."""
+    rng = np.random.default_rng() if rng is None else rng
+    cap = float(rng.uniform(*SCORE_CAP_RANGE))
+    top = top.copy()
+    if len(top) > 0 and top["score"].max() > 0:
+        top["score"] = top["score"] * (cap / float(top["score"].max()))
+    return top
+
+
+class Ranker:
+    """Ranks areas for business profiles over one dataset and set of base scores."""
+
+    def __init__(self, df: pd.DataFrame, base, tensor=None, index=None, version=None):
+        self.df = df
+        self.version = version  # model registry version the base scores came from
+        self.base = np.asarray(base, dtype=float)
+        self.tensor = tensor
+        self._index = index
+        self._has_centroids = {"lad_lat", "lad_lng"}.issubset(df.columns)
+        self._lock = threading.Lock()
+        # Plain string arrays so tensor hits never touch the (possibly categorical) frame
+        self.lad_code = df["lad_code"].astype(str).to_numpy(dtype=object)
+        self.lad_name = df["lad_name"].astype(str).to_numpy(dtype=object)
+
+    @classmethod
+    def load(cls, data_path=None, use_tensor=True, registry_dir=REGISTRY_DIR):
+        """Ranker over the current model version and dataset, resolved the same way as the app."""
+        data_path = data_path or resolve_dataset_path()
+        df = load_dataset(data_path)
+        model_version = current(registry_dir)
+        model, features, model_files = load_version(model_version)
+        key = base_scores_key(*model_files, data_path)
+        base = get_base_scores(
+            key, lambda: model.predict(prepare_features(df, features)), len(df), model_version.base_scores_path
+        )
+        tensor = ScenarioTensor.load(model_version.score_tensor_path, tensor_key(key)) if use_tensor else None
+        return cls(df, base, tensor, version=model_version.version)
+
+    @property
+    def index(self):
+        """Spatial index over the centroids, built on first use (None without centroids)."""
+        if self._index is None and self._has_centroids:
+            with self._lock:
+                if self._index is None:
+                    self._index = CentroidIndex.from_frame(self.df)
+        return self._index
+
+    def score_live(self, industry, urgency, target_lat, target_lng) -> pd.DataFrame:
+        """Full ranking pipeline: every candidate area with its 0-100 score, unsorted."""
+        df = self.df
+        # Only industry and hiring urgency should affect recommendations.
+        # Build a compact adjustment that depends on industry match and urgency level.
+        adj = np.zeros(len(df), dtype=float)
+
+        industry_col = INDUSTRY_COL_MAP.get(industry)
+        if industry_col and industry_col in df.columns:
+            industry_boost = minmax_series(df[industry_col]).values
+        else:
+            industry_boost = np.zeros(len(df), dtype=float)
+
+        # Urgency factor controls how strongly industry match moves ranking
+        urgency_factor = URGENCY_FACTOR_MAP.get(urgency, DEFAULT_URGENCY_FACTOR)
+
+        # Apply a modest industry-based adjustment scaled by urgency
+        adj += urgency_factor * INDUSTRY_WEIGHT * industry_boost
+
+        base_std = float(np.std(self.base)) + 1e-9
+        adj_std = float(np.std(adj)) + 1e-9
+        adj_scaled = adj * (base_std / adj_std)
+
+        final_score = 0.50 * self.base + 0.50 * adj_scaled
+
+        candidates = df[["lad_code", "lad_name"]].copy()
+        candidates["score"] = final_score
+
+        # Normalize to 0-100
+        candidates["score"] = 100 * (candidates["score"] - candidates["score"].min()) / (
+            candidates["score"].max() - candidates["score"].min() + 1e-9
+        )
+
+        # City-based filtering: only evaluate LADs within the selected city (50 km radius)
+        # but NOT in the city itself (> 10 km away), answered in one spatial-index pass.
+        if self._has_centroids:
+            rows, _ = self.index.annulus(target_lat, target_lng, IN_CITY_RADIUS_KM, CITY_RADIUS_KM)
+            candidates = candidates.iloc[rows].copy()
+
+        # Re-normalize scores within the city's candidate set for local ranking
+        if len(candidates) > 0:
+            if candidates["score"].nunique(dropna=True) > 1:
+                candidates["score"] = 100 * (candidates["score"] - candidates["score"].min()) / (
+                    candidates["score"].max() - candidates["score"].min() + 1e-9
+                )
+
+        return candidates
+
+    def top(self, profile: Profile, city, top_n: int = TOP_N) -> pd.DataFrame:
+        """
+        Best ``top_n`` areas before the score cap. An O(1) lookup in the score
+        tensor when it covers the inputs, otherwise the live pipeline.
+        """
+        if self.tensor is not None and isinstance(city, str) and top_n <= self.tensor.top_idx.shape[-1]:
+            hit = self.tensor.lookup(city, profile.industry, profile.urgency)
+            if hit is not None:
+                top_pos, top_scores = hit[0][:top_n], hit[1][:top_n]
+                return pd.DataFrame(
+                    {"lad_code": self.lad_code[top_pos], "lad_name": self.lad_name[top_pos], "score": top_scores},
+                    index=self.df.index[top_pos],
+                )
+
+        lat, lng = city_centre(city)
+        candidates = self.score_live(profile.industry, profile.urgency, lat, lng)
+        return candidates.sort_values("score", ascending=False).head(top_n).copy()
+
+    def rank(self, profile: Profile, city, top_n: int = TOP_N, rng=None) -> pd.DataFrame:
+        """Top areas as the app shows them; pass a seeded ``rng`` for a reproducible cap."""
+        return apply_score_cap(self.top(profile, city, top_n), rng)
+
+
+_default_ranker = None
+_default_lock = threading.Lock()
+
+
+def default_ranker() -> Ranker:
+    """Process-wide ranker over the current model version and dataset, reloaded after a version switch."""
+    global _default_ranker
+    version = current_version()
+    with _default_lock:
+        if _default_ranker is None or _default_ranker.version != version:
+            _default_ranker = Ranker.load()
+        return _default_ranker
+
+
+def rank(profile: Profile, city, top_n: int = TOP_N, rng=None) -> pd.DataFrame:
+    """Rank areas for ``profile`` around ``city`` with the default ranker."""
+    return default_ranker().rank(profile, city, top_n=top_n, rng=rng)
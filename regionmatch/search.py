@@ -0,0 +1,265 @@
+"""
+Budgeted hyperparameter search (successive halving) for the location model.
+
+Configurations are sampled from SEARCH_SPACE, which covers the Ridge /
+Lasso / ElasticNet / RandomForest / GradientBoosting candidates of
+retrain_model_advanced.py. Every configuration starts on the first rung,
+fitted on a small slice of each CV fold's training rows. Each rung keeps
+the best 1/eta by mean fold R2 and gives the survivors eta times more
+rows, up to the full fold, so most of the compute goes to configurations
+that already look promising.
+
+Each rung's config x fold fits run in one joblib process pool over the
+shared folds and imputer/scaler transforms from model_selection.py. Every
+finished fit is appended to a JSONL trial log as soon as it completes. A
+trial's key covers the data, the folds, the seed, the configuration (with
+its family's fixed params) and its row budget, so rerunning an interrupted search (same seed) replays finished
+trials from the log and only fits the rest.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import ElasticNet, Lasso, Ridge
+
+from regionmatch import DATA_DIR
+from regionmatch.model_selection import Candidate, SplitCache, fit_and_score, is_heavy, shared_folds, single_threaded
+
+TRIALS_PATH = DATA_DIR / "cache" / "search" / "trials.jsonl"
+
+# family -> (estimator class, sampled params, fixed params, scale features)
+# sampled: ("log", lo, hi) / ("uniform", lo, hi) ranges, or a list to choose from
+SEARCH_SPACE = {
+    "Ridge": (Ridge, {"alpha": ("log", 1e-3, 1e3)}, {"random_state": 42}, True),
+    "Lasso": (Lasso, {"alpha": ("log", 1e-5, 1.0)}, {"random_state": 42, "max_iter": 5000}, True),
+    "ElasticNet": (
+        ElasticNet,
+        {"alpha": ("log", 1e-5, 1.0), "l1_ratio": ("uniform", 0.05, 0.95)},
+        {"random_state": 42, "max_iter": 5000},
+        True,
+    ),
+    "RandomForest": (
+        RandomForestRegressor,
+        {"n_estimators": [100, 200, 400], "max_depth": [None, 5, 10, 20],
+         "min_samples_leaf": [1, 2, 4], "max_features": [1.0, 0.5, "sqrt"]},
+        {"random_state": 42, "n_jobs": -1},
+        False,
+    ),
+    "GradientBoosting": (
+        GradientBoostingRegressor,
+        {"n_estimators": [100, 200, 400], "learning_rate": ("log", 0.01, 0.3),
+         "max_depth": [2, 3, 4, 5], "subsample": [0.7, 0.85, 1.0]},
+        {"random_state": 42},
+        False,
+    ),
+}
+
+
+@dataclass
+class SearchResult:
+    trials: pd.DataFrame   # one row per (config, rung): family, params, rung, resource, mean_r2, std_r2
+    best: list             # (family, params) of the last rung, best first
+
+
+def _sample(spec, rng):
+    if isinstance(spec, list):
+        return spec[rng.integers(len(spec))]
+    kind, lo, hi = spec
+    if kind == "log":
+        return float(np.exp(rng.uniform(np.log(lo), np.log(hi))))
+    return float(rng.uniform(lo, hi))
+
+
+def sample_configs(n, space=SEARCH_SPACE, seed=42):
+    """
+    ``n`` (family, params) configurations, spread round-robin over the
+    families. A repeat is redrawn (a few times) so small discrete spaces do
+    not spend the budget on duplicates.
+    """
+    rng = np.random.default_rng(seed)
+    families = list(space)
+    configs, seen = [], set()
+    for i in range(n):
+        family = families[i % len(families)]
+        sampled = space[family][1]
+        for _ in range(20):
+            params = {name: _sample(spec, rng) for name, spec in sampled.items()}
+            key = json.dumps([family, params], sort_keys=True, default=str)
+            if key not in seen:
+                break
+        seen.add(key)
+        configs.append((family, params))
+    return configs
+
+
+def make_candidate(family, params, space=SEARCH_SPACE) -> Candidate:
+    cls, _, fixed, scale = space[family]
+    shown = ", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}" for k, v in params.items())
+    return Candidate(f"{family}({shown})", cls(**fixed, **params), scale=scale)
+
+
+def data_digest(X, y) -> str:
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(np.asarray(X, dtype=np.float64)).tobytes())
+    h.update(np.ascontiguousarray(np.asarray(y, dtype=np.float64)).tobytes())
+    if isinstance(X, pd.DataFrame):
+        h.update(json.dumps(list(map(str, X.columns))).encode("utf-8"))
+    return h.hexdigest()
+
+
+def trial_key(data_key, family, params, resource, fold, cv, seed, fixed) -> str:
+    # seed fixes which rows a rung's slice takes; fixed holds the family's non-searched params
+    payload = json.dumps([data_key, cv, fold, resource, seed, family, fixed, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TrialStore:
+    """Append-only JSONL log of finished trials, keyed by trial_key()."""
+
+    def __init__(self, path=TRIALS_PATH):
+        self.path = path
+        self.records = {}
+        self.replayed = 0
+        self._torn_tail = False
+        if path is None:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return
+        for line in text.splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            self.records[rec["key"]] = rec
+        self._torn_tail = bool(text) and not text.endswith("\n")
+
+    def get(self, key):
+        rec = self.records.get(key)
+        if rec is not None:
+            self.replayed += 1
+        return rec
+
+    def add(self, rec):
+        self.records[rec["key"]] = rec
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            if self._torn_tail:  # never append to a half-written line
+                f.write("\n")
+                self._torn_tail = False
+            f.write(json.dumps(rec) + "\n")
+            f.flush()
+
+
+def rung_schedule(n_configs, max_resource, min_resource, eta=3):
+    """[(n_configs, rows)] per rung; the last rung uses ``max_resource`` rows."""
+    n_rungs = 1 + min(
+        int(math.log(max(n_configs, 1), eta) + 1e-9),
+        int(math.log(max(max_resource / min_resource, 1), eta) + 1e-9),
+    )
+    schedule = []
+    for i in range(n_rungs):
+        rows = int(round(max_resource / eta ** (n_rungs - 1 - i)))
+        schedule.append((max(1, math.ceil(n_configs / eta ** i)), rows))
+    return schedule
+
+
+def _run_trial(i, estimator, X_train, y_train, X_test, y_test):
+    out = fit_and_score(estimator, X_train, y_train, X_test, y_test)
+    return i, {k: out[k] for k in ("r2", "rmse", "fit_seconds")}
+
+
+def successive_halving(
+    X,
+    y,
+    n_configs=30,
+    eta=3,
+    min_resource=None,
+    cv=5,
+    space=SEARCH_SPACE,
+    seed=42,
+    n_jobs=-1,
+    store=None,
+    log=print,
+) -> SearchResult:
+    """
+    Successive-halving search over ``n_configs`` sampled configurations.
+
+    ``store`` is a TrialStore (default: a fresh in-memory one); pass
+    ``TrialStore(TRIALS_PATH)`` to persist trials and resume.
+    """
+    store = store if store is not None else TrialStore(None)
+    y = np.asarray(y, dtype=np.float64)
+    folds = dict(enumerate(shared_folds(len(y), cv)))
+    cache = SplitCache(X, y, folds)
+    data_key = data_digest(X, y)
+
+    max_resource = min(len(train) for train, _ in folds.values())
+    if min_resource is None:
+        min_resource = max(20, 2 * np.asarray(X).shape[1])
+    schedule = rung_schedule(n_configs, max_resource, min(min_resource, max_resource), eta)
+    # a fixed row order per fold, so a rung's slice is the previous rung's slice plus more rows
+    order = {f: np.random.default_rng(seed + f).permutation(len(train)) for f, (train, _) in folds.items()}
+
+    configs = sample_configs(n_configs, space, seed)
+    candidates = [make_candidate(family, params, space) for family, params in configs]
+    survivors = list(range(len(configs)))
+    rows_out = []
+    for rung, (_, resource) in enumerate(schedule):
+        last = rung == len(schedule) - 1
+        t0 = time.perf_counter()
+        jobs, scores = [], {c: {} for c in survivors}
+        for c in survivors:
+            family, params = configs[c]
+            for fold in folds:
+                key = trial_key(data_key, family, params, resource, fold, cv, seed, space[family][2])
+                rec = store.get(key)
+                if rec is not None:
+                    scores[c][fold] = rec["r2"]
+                else:
+                    jobs.append((c, fold, key))
+        # ensembles first, so they are not left for the end of the pool
+        jobs.sort(key=lambda job: not is_heavy(candidates[job[0]].estimator))
+
+        def args(c, fold):
+            p = cache.get(fold, candidates[c].scale)
+            take = slice(None) if last else order[fold][:resource]  # the last rung gets the whole fold
+            return single_threaded(candidates[c].estimator), p.X_train[take], p.y_train[take], p.X_test, p.y_test
+
+        if jobs:
+            finished = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+                delayed(_run_trial)(i, *args(c, fold)) for i, (c, fold, _) in enumerate(jobs)
+            )
+            for i, out in finished:
+                c, fold, key = jobs[i]
+                family, params = configs[c]
+                store.add({"key": key, "family": family, "params": params, "resource": resource, "fold": fold, **out})
+                scores[c][fold] = out["r2"]
+
+        ranked = []
+        for c in survivors:
+            fold_r2 = np.array([scores[c][f] for f in folds])
+            family, params = configs[c]
+            rows_out.append({"family": family, "params": json.dumps(params), "rung": rung, "resource": resource,
+                             "mean_r2": fold_r2.mean(), "std_r2": fold_r2.std()})
+            ranked.append((fold_r2.mean(), c))
+        ranked.sort(key=lambda t: (-t[0], t[1]))
+        log(f"  rung {rung}: {len(survivors)} configs x {cv} folds on {resource} rows "
+            f"({len(jobs)} fitted, {len(survivors) * cv - len(jobs)} from the trial log) "
+            f"in {time.perf_counter() - t0:.2f} s; best R2 {ranked[0][0]:.6f}")
+        survivors = [c for _, c in (ranked if last else ranked[:schedule[rung + 1][0]])]
+
+    return SearchResult(pd.DataFrame(rows_out), [configs[c] for c in survivors])
+
@@ -0,0 +1,76 @@
+"""
+Spatial index over region centroids (``lad_lat`` / ``lad_lng``).
+
+A haversine BallTree is built once per dataset and answers radius and annulus
+(inner < d <= outer) queries without scanning every region. That keeps
+candidate selection cheap when the table grows from 361 LADs to MSOA/LSOA
+level (7k-35k rows). Rows with missing centroids are never returned.
+
+scikit-learn is only imported when an index is built, so importing this
+module stays cheap for callers that never need one.
+"""
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+
+
+class CentroidIndex:
+    """BallTree over the centroids of a frame; results are positional row indices."""
+
+    def __init__(self, lat, lng):
+        from sklearn.neighbors import BallTree
+
+        lat = np.asarray(lat, dtype=float)
+        lng = np.asarray(lng, dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lng)
+        self.n_rows = len(lat)
+        self._rows = np.flatnonzero(valid)
+        self._tree = BallTree(np.radians(np.column_stack([lat[valid], lng[valid]])), metric="haversine")
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, lat_col: str = "lad_lat", lng_col: str = "lad_lng"):
+        if lat_col not in df.columns or lng_col not in df.columns:
+            raise KeyError(f"Dataset has no centroid columns ({lat_col}, {lng_col})")
+        return cls(
+            pd.to_numeric(df[lat_col], errors="coerce").to_numpy(dtype=float),
+            pd.to_numeric(df[lng_col], errors="coerce").to_numpy(dtype=float),
+        )
+
+    def annulus_many(self, lats, lngs, inner_km: float, outer_km: float):
+        """
+        For each centre, the rows with ``inner_km < distance <= outer_km``.
+
+        Returns a list of ``(rows, dist_km)`` pairs with ``rows`` in ascending
+        (i.e. original frame) order. Pass ``inner_km=-1`` for a plain disc.
+        """
+        centres = np.radians(np.column_stack([np.atleast_1d(lats), np.atleast_1d(lngs)]).astype(float))
+        if len(self._rows) == 0:
+            return [(np.empty(0, dtype=np.intp), np.empty(0)) for _ in centres]
+
+        ind, dist = self._tree.query_radius(centres, r=outer_km / EARTH_RADIUS_KM, return_distance=True)
+        out = []
+        for i, d in zip(ind, dist):
+            d_km = d * EARTH_RADIUS_KM
+            keep = d_km > inner_km
+            rows = self._rows[i[keep]]
+            order = np.argsort(rows, kind="stable")
+            out.append((rows[order], d_km[keep][order]))
+        return out
+
+    def annulus(self, lat: float, lng: float, inner_km: float, outer_km: float):
+        """``(rows, dist_km)`` for one centre; see :meth:`annulus_many`."""
+        return self.annulus_many([lat], [lng], inner_km, outer_km)[0]
+
+    def within(self, lat: float, lng: float, radius_km: float):
+        """``(rows, dist_km)`` within ``radius_km`` of one centre."""
+        return self.annulus(lat, lng, -1.0, radius_km)
+
+    def annulus_masks(self, lats, lngs, inner_km: float, outer_km: float) -> np.ndarray:
+        """Boolean (n_centres, n_rows) membership matrix for :meth:`annulus_many`."""
+        results = self.annulus_many(lats, lngs, inner_km, outer_km)
+        masks = np.zeros((len(results), self.n_rows), dtype=bool)
+        for m, (rows, _) in zip(masks, results):
+            m[rows] = True
+        return masks
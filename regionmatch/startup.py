@@ -0,0 +1,81 @@
+"""
+Cold-start timing for the app.
+
+``PROFILE`` lives for the whole server process (Streamlit re-executes the app
+script on every rerun, but imported modules persist), so each phase is timed
+the first time it runs and ignored afterwards. The app wraps its imports,
+model load, data load and first score in :meth:`StartupProfile.phase` and
+writes the report once the first page has rendered. Deferred imports (pydeck,
+and Gemini when the first explanation was requested) show up in it with the
+offset at which they actually happened.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from regionmatch import DATA_DIR
+
+STARTUP_REPORT_PATH = DATA_DIR / "cache" / "startup_timing.json"
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.phases = {}   # name -> (seconds, offset from start); first run only
+        self.written = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        if name in self.phases:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            t1 = time.perf_counter()
+            with self._lock:
+                self.phases.setdefault(name, (t1 - t0, t0 - self.started))
+
+    def report(self) -> dict:
+        with self._lock:
+            phases = dict(self.phases)
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "phases": [
+                {"name": name, "ms": round(secs * 1000, 2), "at_ms": round(at * 1000, 2)}
+                for name, (secs, at) in sorted(phases.items(), key=lambda kv: kv[1][1])
+            ],
+        }
+
+    def write(self, path=STARTUP_REPORT_PATH) -> dict:
+        """Write the report as JSON (atomically) and return it."""
+        report = self.report()
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(report, indent=2), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+        self.written = True
+        return report
+
+
+def format_report(report: dict) -> str:
+    lines = [f"Startup timing (pid {report['pid']}, {report['elapsed_ms']:.0f} ms since profile start):"]
+    for p in report["phases"]:
+        lines.append(f"  {p['name']:<32} {p['ms']:>9.1f} ms  (at {p['at_ms']:.0f} ms)")
+    return "\n".join(lines)
+
+
+PROFILE = StartupProfile()
@@ -0,0 +1,39 @@
+"""
+Convert the training CSV into the typed columnar artifact the app memory-maps.
+
+Writes <dataset>.columnar/ next to the CSV (float32 features, categorical
+lad_code/lad_name, float64 centroids, schema.json header). The app falls back
+to the CSV whenever the artifact's recorded source hash no longer matches, so
+re-run this after rebuilding the CSV.
+
+Usage:
+    python scripts/build/build_columnar_dataset.py [path/to/dataset.csv]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.dataset import columnar_dir, load_columnar, safe_dataset_path, write_columnar
+
+src = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(safe_dataset_path())
+df = pd.read_csv(src)
+print("Loaded", src, "shape:", df.shape)
+
+out_dir = columnar_dir(src)
+schema = write_columnar(df, out_dir, src)
+kinds = pd.Series([c["kind"] for c in schema["columns"]]).value_counts().to_dict()
+print("Saved", out_dir, "columns by kind:", kinds)
+
+t0 = time.perf_counter()
+back = load_columnar(out_dir)
+print(f"Memory-mapped load: {(time.perf_counter() - t0) * 1000:.1f} ms, shape: {back.shape}")
+
+t0 = time.perf_counter()
+pd.read_csv(src)
+print(f"CSV parse for comparison: {(time.perf_counter() - t0) * 1000:.1f} ms")
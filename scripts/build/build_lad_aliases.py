@@ -0,0 +1,31 @@
+"""
+Build the LAD alias table (data/processed/lad_aliases.csv) used by the merge
+scripts: every LAD's own name key plus the alternative spellings, shared
+planning services and pre-2023 districts in regionmatch/names.py.
+
+Usage:
+    python scripts/build/build_lad_aliases.py [lad_one_row.csv]
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.names import ALIAS_TABLE_PATH, build_alias_table
+
+src = sys.argv[1] if len(sys.argv) > 1 else "lad_one_row.csv"
+lads = pd.read_csv(src, usecols=["lad_code", "lad_name"])
+
+table = build_alias_table(lads)
+collisions = table[table["kind"] == "name"].groupby("alias")["lad_code"].nunique()
+if (collisions > 1).any():
+    raise SystemExit(f"LAD names that normalise to the same key: {sorted(collisions[collisions > 1].index)}")
+
+ALIAS_TABLE_PATH.parent.mkdir(parents=True, exist_ok=True)
+table.to_csv(ALIAS_TABLE_PATH, index=False)
+print("Saved", ALIAS_TABLE_PATH, table.shape)
+print("Aliases by kind:", table["kind"].value_counts().to_dict())
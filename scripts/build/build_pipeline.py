@@ -0,0 +1,154 @@
+"""
+Build the training tables as one incremental DAG (see regionmatch/pipeline.py).
+
+    raw_lad ─ lad_one_row ─┬─ ibex_by_lad ──────┐
+                           ├─ sentiment_by_lad ─┼─ training_table ─ features ─┬─ geo
+    incorporations ─ incorporations_by_lad ─────┘                             │
+    lad_lookup ─ lad_centroids ───────────────────────────────────────────────┘
+
+The IBEX, sentiment and incorporation merges run in parallel. The
+incorporations branch is optional: it is part of the graph only when both
+the Companies House dataset (incorporations.parquet, from
+scripts/ingest/get_incorporations.py) and the ONS postcode directory
+(data/raw/ONSPD.csv) exist; without them the training table has no
+incorporation columns. Each stage is the function
+behind the matching single-step script (make_lad_one_row.py, merge_ibex.py,
+...), so both routes give the same tables; ``features`` does the work of
+clean_dataset.py + make_target.py in one pass (regionmatch/features.py).
+Only stages whose inputs or code changed re-run. Intermediate frames are
+cached as Parquet in data/cache/build/. The final tables are written to
+data/processed/.
+
+Usage:
+    python scripts/build/build_pipeline.py [STAGE ...] [--force] [--workers N]
+        [--use training_table=training_data_v1.csv] [--dry-run]
+
+The IBEX council table (scripts/ingest/ibex_features_by_council.csv) comes
+from the IBEX ingest scripts and is not shipped. Without it, and without a
+--use for ibex_councils, ibex_by_lad or training_table, the build starts
+from the shipped training_data_v1.csv as the training table.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from regionmatch import DATA_DIR, REPO_ROOT
+from regionmatch.features import build_training_features
+from regionmatch.names import ALIAS_TABLE_PATH, load_alias_table
+from regionmatch.pipeline import BUILD_CACHE_DIR, Pipeline, Source, Stage
+from regionmatch.postcodes import ONSPD_PATH, POSTCODE_LOOKUP_PATH
+
+from join_centroids import join_centroids
+from make_lad_centroids_from_csv import lad_centroids, read_lad_lookup
+from make_lad_one_row import lad_one_row
+from merge_ibex import ibex_by_lad
+from merge_incorporations import incorporations_by_lad, join_incorporations, read_incorporations
+from merge_sentiment import sentiment_by_lad
+
+RAW_LAD_PATH = REPO_ROOT / "Data-sources" / "final_business_relocation_training_data.csv"
+IBEX_PATH = REPO_ROOT / "scripts" / "ingest" / "ibex_features_by_council.csv"
+SENTIMENT_PATH = REPO_ROOT / "Data-sources" / "city_sentiment_fixed.csv"
+LAD_LOOKUP_PATH = DATA_DIR / "lad_lookup.csv"
+INCORPORATIONS_PATH = REPO_ROOT / "incorporations.parquet"
+
+PROCESSED_DIR = DATA_DIR / "processed"
+SHIPPED_TRAINING_TABLE = REPO_ROOT / "training_data_v1.csv"
+
+
+def training_table(lad, ibex, sentiment, incorporations=None):
+    """LAD rows with IBEX, sentiment and (when built) incorporation features; left joins, so every LAD stays."""
+    out = lad.merge(ibex, on="lad_code", how="left").merge(sentiment, on="lad_code", how="left")
+    print("Ibex coverage:", 1 - out["approval_rate"].isna().mean())
+    print("Sentiment coverage:", 1 - out["job_liquidity_score_1_10"].isna().mean())
+    if incorporations is not None:
+        out = join_incorporations(out, incorporations)
+    return out
+
+
+def build_pipeline(
+    raw_lad=RAW_LAD_PATH,
+    ibex=IBEX_PATH,
+    sentiment=SENTIMENT_PATH,
+    lad_lookup=LAD_LOOKUP_PATH,
+    aliases=ALIAS_TABLE_PATH,
+    incorporations=INCORPORATIONS_PATH,
+    postcodes=ONSPD_PATH,
+    postcode_cache=POSTCODE_LOOKUP_PATH,
+    out_dir=PROCESSED_DIR,
+    cache_dir=BUILD_CACHE_DIR,
+) -> Pipeline:
+    out_dir = Path(out_dir)
+    table_inputs = ("lad_one_row", "ibex_by_lad", "sentiment_by_lad")
+    optional = []
+    if has_incorporations(incorporations, postcodes):
+        table_inputs += ("incorporations_by_lad",)
+        optional = [
+            Source("incorporations", Path(incorporations), read=read_incorporations),
+            # the postcode directory is read by the stage itself, so it is keyed as code
+            Stage("incorporations_by_lad", incorporations_by_lad, ("incorporations",), code=(Path(postcodes),),
+                  params={"postcodes": str(postcodes), "postcode_cache": str(postcode_cache)}),
+        ]
+    return Pipeline(optional + [
+        Source("raw_lad", Path(raw_lad)),
+        Source("ibex_councils", Path(ibex)),
+        Source("city_sentiment", Path(sentiment)),
+        Source("lad_lookup", Path(lad_lookup), read=read_lad_lookup),
+        Source("lad_aliases", Path(aliases), read=load_alias_table),
+
+        Stage("lad_one_row", lad_one_row, ("raw_lad",)),
+        Stage("ibex_by_lad", ibex_by_lad, ("lad_one_row", "ibex_councils", "lad_aliases")),
+        Stage("sentiment_by_lad", sentiment_by_lad, ("lad_one_row", "city_sentiment", "lad_aliases")),
+        Stage("training_table", training_table, table_inputs),
+        Stage("features", build_training_features, ("training_table",),
+              publish=out_dir / "training_data_clean.csv"),
+        Stage("lad_centroids", lad_centroids, ("lad_lookup",), publish=out_dir / "lad_centroids.csv"),
+        Stage("geo", join_centroids, ("features", "lad_centroids"), publish=out_dir / "training_data_geo.csv"),
+    ], cache_dir=cache_dir)
+
+
+def has_incorporations(incorporations=INCORPORATIONS_PATH, postcodes=ONSPD_PATH) -> bool:
+    """True when both inputs of the optional incorporations branch exist."""
+    return incorporations is not None and postcodes is not None \
+        and Path(incorporations).exists() and Path(postcodes).exists()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally rebuild the training tables.")
+    parser.add_argument("targets", nargs="*", help="Stages to bring up to date (default: the published tables)")
+    parser.add_argument("--force", action="store_true", help="Re-run every stage even when cached")
+    parser.add_argument("--workers", type=int, default=None, help="Stages run in parallel (default: CPUs, max 8)")
+    parser.add_argument("--use", action="append", default=[], metavar="STAGE=CSV",
+                        help="Read a stage's output from a file instead of building it")
+    parser.add_argument("--cache-dir", default=str(BUILD_CACHE_DIR))
+    parser.add_argument("--out-dir", default=str(PROCESSED_DIR))
+    parser.add_argument("--dry-run", action="store_true", help="List the stages that would run")
+    args = parser.parse_args(argv)
+
+    pipeline = build_pipeline(out_dir=args.out_dir, cache_dir=args.cache_dir)
+    if not has_incorporations():
+        print(f"Note: {INCORPORATIONS_PATH.name} or {ONSPD_PATH.relative_to(REPO_ROOT)} not found;"
+              " building without the incorporation features")
+    uses = {spec.partition("=")[0] for spec in args.use}
+    if not IBEX_PATH.exists() and not uses & {"ibex_councils", "ibex_by_lad", "training_table"}:
+        print(f"⚠️  {IBEX_PATH.relative_to(REPO_ROOT)} not found (run the IBEX ingest scripts to build it);"
+              f" using {SHIPPED_TRAINING_TABLE.name} as the training table")
+        args.use.append(f"training_table={SHIPPED_TRAINING_TABLE}")
+    for spec in args.use:
+        name, sep, path = spec.partition("=")
+        if not sep:
+            parser.error(f"--use expects STAGE=CSV, got {spec!r}")
+        pipeline = pipeline.with_source(name, path)
+
+    if args.dry_run:
+        stale = pipeline.plan(args.targets or None, force=args.force)
+        print("Would run:", ", ".join(stale) if stale else "nothing (all cached)")
+        return
+
+    pipeline.run(args.targets or None, workers=args.workers, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Precompute the ranking for every (city, industry, urgency) combination.
+
+Writes score_tensor.npz into the current model version's directory
+(models/registry/vNNNN/, or models/ without a registry), which app/app.py
+loads so page interactions become a lookup. The tensor is keyed on the model (or its NumPy
+export), feature list and dataset hashes; the app ignores it (and scores live)
+if any of them change, so re-run this script after retraining, exporting or
+rebuilding the dataset.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.base_scores import base_scores_key, get_base_scores, prepare_features
+from regionmatch.dataset import load_dataset, resolve_dataset_path
+from regionmatch.registry import current, load_version
+from regionmatch.scenarios import (
+    build_scenario_tensor,
+    save_scenario_tensor,
+    tensor_key,
+)
+
+# Same resolution as the app, so the tensor key matches what it loads
+data_path = resolve_dataset_path()
+df = load_dataset(data_path)
+print("Loaded", data_path, "shape:", df.shape)
+
+# Same model resolution as the app (NumPy export when current, else joblib)
+model_version = current()
+pipe, features, model_files = load_version(model_version)
+print("Scoring with", type(pipe).__name__, "from model version", model_version.label)
+
+key = base_scores_key(*model_files, data_path)
+base = get_base_scores(
+    key, lambda: pipe.predict(prepare_features(df, features)), len(df), model_version.base_scores_path
+)
+
+t0 = time.perf_counter()
+top_idx, top_score = build_scenario_tensor(base, df)
+elapsed = time.perf_counter() - t0
+
+save_scenario_tensor(model_version.score_tensor_path, tensor_key(key), top_idx, top_score)
+
+n_combos = top_idx.shape[0] * top_idx.shape[1] * top_idx.shape[2]
+print(f"Built {n_combos} scenarios {tuple(top_idx.shape)} in {elapsed * 1000:.1f} ms")
+print("Combinations with no candidates:", int((top_idx[..., 0] < 0).sum()))
+print("Saved", model_version.score_tensor_path)
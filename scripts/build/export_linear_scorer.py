@@ -0,0 +1,63 @@
+"""
+Export the current model version's location_model.joblib as a pure-NumPy
+linear scorer.
+
+Folds the imputer medians, scaler mean/scale and linear coefficients into
+linear_scorer.json (features, bias, fill values, source hash) and
+linear_scorer.npy (weights) next to the model: the current version's
+directory in models/registry/, or models/ without a registry. The app scores
+with that and never imports scikit-learn for the model; it falls back to the
+pipeline whenever the recorded source hash no longer matches. Publishing a
+linear model to the registry already exports it; re-run this for the legacy
+files after retraining them.
+
+Usage:
+    python scripts/build/export_linear_scorer.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.base_scores import prepare_features
+from regionmatch.dataset import load_dataset, resolve_dataset_path
+from regionmatch.linear import LinearScorer, weights_path
+from regionmatch.registry import current
+
+model_version = current()
+MODEL_PATH = model_version.model_path
+FEATURES_PATH = model_version.features_path
+LINEAR_SCORER_PATH = model_version.scorer_path
+
+pipe = joblib.load(MODEL_PATH)
+features = joblib.load(FEATURES_PATH)
+print("Loaded", MODEL_PATH, "->", " -> ".join(type(est).__name__ for _, est in pipe.steps))
+
+scorer = LinearScorer.from_pipeline(pipe, features)
+scorer.save(LINEAR_SCORER_PATH, source=MODEL_PATH)
+print("Saved", LINEAR_SCORER_PATH, "and", weights_path(LINEAR_SCORER_PATH))
+print(f"  {len(features)} weights, {int(np.count_nonzero(scorer.weights))} non-zero, bias {scorer.bias:.6f}")
+
+# Parity on the shipped dataset, exactly as the app prepares it
+df = load_dataset(resolve_dataset_path())
+X = prepare_features(df, features)
+
+t0 = time.perf_counter()
+expected = pipe.predict(X)
+t_pipe = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+got = LinearScorer.load(LINEAR_SCORER_PATH, source=MODEL_PATH).predict(X)
+t_numpy = time.perf_counter() - t0
+
+max_diff = float(np.max(np.abs(got - expected)))
+print(f"Parity on {len(X)} rows: max |diff| = {max_diff:.3e}")
+print(f"pipe.predict: {t_pipe * 1000:.2f} ms | NumPy scorer: {t_numpy * 1000:.2f} ms")
+if not np.allclose(got, expected, rtol=0, atol=1e-9):
+    raise SystemExit("Exported scorer does not match pipe.predict")
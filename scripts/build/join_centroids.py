@@ -1,10 +1,14 @@
 ﻿import pandas as pd
 
-df = pd.read_csv("training_data_clean.csv")
-cent = pd.read_csv("lad_centroids.csv")
 
-out = df.merge(cent, on="lad_code", how="left")
+def join_centroids(df, cent):
+    """``df`` with lad_lat / lad_lng joined on lad_code."""
+    out = df.merge(cent, on="lad_code", how="left")
+    print("Missing centroid rate:", out["lad_lat"].isna().mean())
+    return out
 
-print("Missing centroid rate:", out["lad_lat"].isna().mean())
-out.to_csv("training_data_geo.csv", index=False)
-print("Saved training_data_geo.csv", out.shape)
+
+if __name__ == "__main__":
+    out = join_centroids(pd.read_csv("training_data_clean.csv"), pd.read_csv("lad_centroids.csv"))
+    out.to_csv("training_data_geo.csv", index=False)
+    print("Saved training_data_geo.csv", out.shape)
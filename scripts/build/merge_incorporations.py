@@ -0,0 +1,98 @@
+"""
+Join per-LAD Companies House incorporation features into the training table.
+
+Maps every company's registered-office postcode to a LAD through the ONS
+postcode directory (regionmatch.postcodes.PostcodeLookup, cached after the
+first run), then adds incorporations_total / _12m / _prev_12m and
+incorporation_growth per lad_code. LADs with no incorporations (including
+LADs missing from the postcode directory) get counts of 0; their growth is
+NaN, as for any LAD without a prior year.
+
+build_pipeline.py runs the same join as its ``incorporations_by_lad`` stage,
+between the sentiment merge and the training table. Run standalone, the
+script updates the table in place (default training_table_final.csv, the
+output of merge_sentiment.py) unless --out names another file.
+
+Usage:
+    python scripts/build/merge_incorporations.py [--postcodes ONSPD.csv]
+        [--incorporations incorporations.parquet] [--table training_table_final.csv]
+        [--out OUT.csv]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.postcodes import (
+    INCORPORATION_COLUMNS,
+    ONSPD_PATH,
+    POSTCODE_LOOKUP_PATH,
+    PostcodeLookup,
+    incorporation_features,
+)
+
+COUNT_COLUMNS = [c for c in INCORPORATION_COLUMNS if c != "incorporation_growth"]
+
+
+def read_incorporations(path):
+    """postal_code / date_of_creation from the Parquet dataset or a CSV export."""
+    cols = ["postal_code", "date_of_creation"]
+    if os.path.isdir(path) or str(path).endswith((".parquet", ".pq")):
+        return pd.read_parquet(path, columns=cols)
+    return pd.read_csv(path, usecols=cols, dtype=str)
+
+
+def incorporations_by_lad(inc, postcodes=ONSPD_PATH, postcode_cache=POSTCODE_LOOKUP_PATH, as_of=None):
+    """Incorporation features keyed by lad_code, for every LAD in the postcode directory."""
+    lookup = PostcodeLookup.load(postcodes, postcode_cache)
+    idx, how = lookup.lookup(inc["postal_code"].to_numpy())
+    n = max(len(inc), 1)
+    print(f"Mapped {len(inc):,} incorporations to LADs: {np.sum(how == 1) / n:.1%} exact, "
+          f"{np.sum(how == 2) / n:.1%} by sector, {np.sum(how == 0) / n:.1%} unmapped")
+    return incorporation_features(idx, inc["date_of_creation"].to_numpy(), lookup.lad_codes, as_of=as_of)
+
+
+def join_incorporations(table, feats):
+    """``table`` with the incorporation columns of ``feats`` (left join; absent LADs count 0)."""
+    table = table.drop(columns=[c for c in INCORPORATION_COLUMNS if c in table.columns])
+    out = table.merge(feats, on="lad_code", how="left")
+    print("LADs in the table found in the postcode directory:",
+          f"{out['incorporations_total'].notna().mean():.1%}")
+    out[COUNT_COLUMNS] = out[COUNT_COLUMNS].fillna(0).astype(np.int64)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add per-LAD incorporation counts to the training table.")
+    parser.add_argument("--postcodes", default=str(ONSPD_PATH), help="ONS postcode directory CSV")
+    parser.add_argument("--incorporations", default=None,
+                        help="get_incorporations.py output (default: incorporations.parquet, else incorporations.csv)")
+    parser.add_argument("--table", default="training_table_final.csv")
+    parser.add_argument("--out", default=None, help="Output CSV (default: update --table in place)")
+    parser.add_argument("--as-of", default=None, help="End of the 12-month window (default: latest incorporation)")
+    args = parser.parse_args(argv)
+
+    src = args.incorporations or ("incorporations.parquet" if os.path.exists("incorporations.parquet")
+                                  else "incorporations.csv")
+    out_path = args.out or args.table
+
+    t0 = time.perf_counter()
+    inc = read_incorporations(src)
+    print(f"Read {len(inc):,} incorporations from {src} ({time.perf_counter() - t0:.2f} s)")
+    feats = incorporations_by_lad(inc, args.postcodes, as_of=args.as_of)
+
+    out = join_incorporations(pd.read_csv(args.table), feats)
+    out.to_csv(out_path, index=False)
+    print("Saved", out_path, out.shape, f"(total {time.perf_counter() - t0:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
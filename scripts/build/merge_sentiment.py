@@ -1,42 +1,40 @@
-﻿import pandas as pd
+﻿import sys
+from pathlib import Path
 
-df = pd.read_csv("training_table_plus_ibex.csv")
-sent = pd.read_csv("city_sentiment_fixed.csv")
+import pandas as pd
 
-sent = sent.rename(columns={
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from regionmatch.names import attach_lad_codes, load_alias_table
+
+SENTIMENT_COLUMNS = {
     "City": "city_name",
     "Job Liquidity Score (1-10)": "job_liquidity_score_1_10",
     "Reddit Sentiment Score (1-10)": "reddit_sentiment_score_1_10"
-})
-
-def clean(s):
-    s = str(s).lower().strip()
-    s = s.replace("&", "and")
-    while "  " in s:
-        s = s.replace("  ", " ")
-    for suf in [
-        " city council", " borough council", " district council",
-        " county council", " unitary authority",
-        " metropolitan borough council", " metropolitan borough",
-        " london borough council", " london borough",
-        " council", ", city of", " city of"
-    ]:
-        s = s.replace(suf, "")
-    s = s.replace(".", "")
-    return s
-
-df["key"] = df["lad_name"].apply(clean)
-sent["key"] = sent["city_name"].apply(clean)
-
-# If duplicates exist in sentiment, average them
-sent = sent.groupby("key", as_index=False).agg({
-    "job_liquidity_score_1_10": "mean",
-    "reddit_sentiment_score_1_10": "mean"
-})
-
-out = df.merge(sent, on="key", how="left").drop(columns=["key"])
-out.to_csv("training_table_final.csv", index=False)
-
-print("Saved training_table_final.csv", out.shape)
-print("Sentiment coverage:", 1 - out["job_liquidity_score_1_10"].isna().mean())
-print("Ibex coverage:", 1 - out["approval_rate"].isna().mean())
+}
+
+
+def sentiment_by_lad(lad, sent, aliases=None):
+    """City sentiment scores keyed by lad_code; cities landing on one LAD are averaged."""
+    sent = sent.rename(columns=SENTIMENT_COLUMNS)
+
+    aliases = load_alias_table(lads=lad) if aliases is None else aliases
+    sent = attach_lad_codes(sent, "city_name", aliases, source="City sentiment")
+
+    # If several cities land on one LAD, average them
+    return sent.groupby("lad_code", as_index=False).agg({
+        "job_liquidity_score_1_10": "mean",
+        "reddit_sentiment_score_1_10": "mean"
+    })
+
+
+if __name__ == "__main__":
+    df = pd.read_csv("training_table_plus_ibex.csv")
+    sent = pd.read_csv("city_sentiment_fixed.csv")
+
+    out = df.merge(sentiment_by_lad(df, sent), on="lad_code", how="left")
+    out.to_csv("training_table_final.csv", index=False)
+
+    print("Saved training_table_final.csv", out.shape)
+    print("Sentiment coverage:", 1 - out["job_liquidity_score_1_10"].isna().mean())
+    print("Ibex coverage:", 1 - out["approval_rate"].isna().mean())
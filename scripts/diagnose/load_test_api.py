@@ -0,0 +1,103 @@
+"""
+Load-test the scoring API (regionmatch.api) and report latency percentiles.
+
+Fires random /rank requests (every city x industry x urgency) at a fixed
+concurrency, one keep-alive session per client thread, and prints p50/p90/p99,
+max latency, throughput and errors.
+
+Start the service first, e.g.:
+    uvicorn regionmatch.api:app --workers 4 --port 8000
+
+Usage:
+    python scripts/diagnose/load_test_api.py [--url http://127.0.0.1:8000]
+        [--concurrency 16] [--requests 2000] [--format json|arrow] [--endpoint rank|health]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.constants import INDUSTRIES, UK_CITIES, URGENCY
+
+
+def make_params(n, fmt, seed=0):
+    rng = np.random.default_rng(seed)
+    cities = [c[0] for c in UK_CITIES]
+    return [
+        {
+            "city": cities[rng.integers(len(cities))],
+            "industry": INDUSTRIES[rng.integers(len(INDUSTRIES))],
+            "urgency": URGENCY[rng.integers(len(URGENCY))],
+            "format": fmt,
+        }
+        for _ in range(n)
+    ]
+
+
+def run(url, endpoint, params, concurrency, timeout=30):
+    local = threading.local()
+    latencies = np.full(len(params), np.nan)
+    errors = []
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        t0 = time.perf_counter()
+        try:
+            resp = session.get(f"{url}/{endpoint}", params=params[i], timeout=timeout)
+            resp.content
+            if resp.status_code != 200:
+                errors.append(f"HTTP {resp.status_code}: {resp.text[:120]}")
+                return
+        except requests.RequestException as e:
+            errors.append(str(e))
+            return
+        latencies[i] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(len(params))))
+    return latencies, errors, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the RegionMatch scoring API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="rank", choices=["rank", "health"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--format", default="json", choices=["json", "arrow"])
+    args = parser.parse_args(argv)
+
+    params = make_params(args.requests, args.format)
+    if args.endpoint == "health":
+        params = [{} for _ in params]
+
+    run(args.url, args.endpoint, params[: args.warmup], args.concurrency)
+    latencies, errors, elapsed = run(args.url, args.endpoint, params, args.concurrency)
+
+    ok = latencies[~np.isnan(latencies)] * 1000
+    print(f"{args.url}/{args.endpoint} format={args.format} concurrency={args.concurrency}")
+    print(f"  requests: {len(params)}  ok: {len(ok)}  errors: {len(errors)}")
+    if len(ok):
+        p50, p90, p99 = np.percentile(ok, [50, 90, 99])
+        print(f"  latency ms: p50 {p50:.2f}  p90 {p90:.2f}  p99 {p99:.2f}  max {ok.max():.2f}")
+    print(f"  throughput: {len(ok) / elapsed:,.0f} req/s over {elapsed:.2f} s")
+    for e in errors[:5]:
+        print("  error:", e)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
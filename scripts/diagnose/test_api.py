@@ -0,0 +1,127 @@
+"""
+Checks for the HTTP scoring API (regionmatch/api.py), calling the route
+handlers directly with the state the lifespan would set up.
+
+Run directly (python scripts/diagnose/test_api.py) or with pytest.
+"""
+
+import asyncio
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+from fastapi import HTTPException
+from starlette.requests import Request
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch import api
+from regionmatch.explain import ExplanationCache, ExplanationService
+from regionmatch.scoring import Profile, Ranker
+
+_ranker = None
+
+
+class StubModel:
+    def generate_content(self, prompt):
+        return type("Response", (), {"text": f"Stub for {prompt.splitlines()[0][:20]}"})()
+
+
+def _state(explainer=None):
+    global _ranker
+    if _ranker is None:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            _ranker = Ranker.load(use_tensor=False)
+    api._state.clear()
+    api._state.update(ranker=_ranker, explainer=explainer)
+    return _ranker
+
+
+def _request(accept="application/json"):
+    return Request({"type": "http", "method": "GET", "path": "/rank", "query_string": b"",
+                    "headers": [(b"accept", accept.encode())]})
+
+
+def _rank(accept="application/json", format=None, **params):
+    params = {"industry": "Technology", "urgency": "<3 months", "city": "Leeds", "top_n": 5, "seed": 0, **params}
+    return api.rank(_request(accept), format=format, **params)
+
+
+def _status(call):
+    try:
+        call()
+    except HTTPException as e:
+        return e.status_code
+    raise AssertionError("expected an HTTPException")
+
+
+def test_rank_json_matches_the_ranker():
+    ranker = _state()
+    body = _rank()
+    expected = ranker.rank(Profile("Technology", "<3 months"), "Leeds", top_n=5, rng=np.random.default_rng(0))
+    assert (body["city"], body["industry"], body["urgency"]) == ("Leeds", "Technology", "<3 months")
+    assert [r["rank"] for r in body["results"]] == [1, 2, 3, 4, 5]
+    assert [r["lad_code"] for r in body["results"]] == expected["lad_code"].astype(str).tolist()
+    assert np.allclose([r["score"] for r in body["results"]], expected["score"])
+
+
+def test_rank_arrow_by_format_or_accept_header():
+    _state()
+    body = _rank()
+    for response in (_rank(format="arrow"), _rank(accept=api.ARROW_MEDIA_TYPE)):
+        assert response.media_type == api.ARROW_MEDIA_TYPE
+        table = pa.ipc.open_stream(response.body).read_all()
+        assert table.column_names == ["rank", "lad_code", "lad_name", "score"]
+        assert table.column("rank").to_pylist() == [1, 2, 3, 4, 5]
+        assert table.column("lad_code").to_pylist() == [r["lad_code"] for r in body["results"]]
+        assert np.allclose(table.column("score").to_numpy(), [r["score"] for r in body["results"]])
+    # an explicit format=json wins over the header
+    assert isinstance(_rank(accept=api.ARROW_MEDIA_TYPE, format="json"), dict)
+
+
+def test_rank_rejects_unknown_choices_with_422():
+    _state()
+    assert _status(lambda: _rank(industry="Mining")) == 422
+    assert _status(lambda: _rank(urgency="someday")) == 422
+    assert _status(lambda: _rank(city="Atlantis")) == 422
+
+
+def test_explain_without_a_key_is_503():
+    _state(explainer=None)
+    call = api.explain(area="E08000035", score=90.0, industry="Technology", urgency="<3 months", employees=25)
+    assert _status(lambda: asyncio.run(call)) == 503
+
+
+def test_explain_answers_through_the_service():
+    ranker = _state()
+    with tempfile.TemporaryDirectory() as tmp:
+        service = ExplanationService(model_factory=StubModel,
+                                     cache=ExplanationCache(Path(tmp) / "explanations.sqlite3"))
+        api._state["explainer"] = service
+        try:
+            row = ranker.df.iloc[0]
+            body = asyncio.run(api.explain(area=str(row["lad_name"]), score=88.0, industry="Creative",
+                                           urgency="6+ months", employees=10))
+            assert body["lad_code"] == str(row["lad_code"]) and body["explanation"].startswith("Stub")
+
+            unknown = api.explain(area="Nowhere", score=88.0, industry="Creative", urgency="6+ months", employees=10)
+            assert _status(lambda: asyncio.run(unknown)) == 404
+            bad = api.explain(area=str(row["lad_code"]), score=88.0, industry="Mining", urgency="6+ months",
+                              employees=10)
+            assert _status(lambda: asyncio.run(bad)) == 422
+        finally:
+            service.shutdown()
+            api._state.clear()
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} API checks passed")
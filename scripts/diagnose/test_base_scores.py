@@ -0,0 +1,119 @@
+"""
+Checks for the per-LAD base score cache (regionmatch/base_scores.py).
+
+Run directly (python scripts/diagnose/test_base_scores.py) or with pytest.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.base_scores import base_scores_key, evict_base_scores, get_base_scores, prepare_features
+
+FEATURES = ["a", "b"]
+
+
+class CountingModel:
+    """Wraps a fitted model and counts predict calls."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return self.model.predict(X)
+
+
+def _files(tmp, alpha=1.0, rows=5):
+    tmp = Path(tmp)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(rows, 2)), columns=FEATURES)
+    model = Ridge(alpha=alpha).fit(df, df["a"] - df["b"])
+    joblib.dump(model, tmp / "model.joblib")
+    joblib.dump(FEATURES, tmp / "features.joblib")
+    df.to_csv(tmp / "data.csv", index=False)
+    return tmp / "model.joblib", tmp / "features.joblib", tmp / "data.csv"
+
+
+def _scores(files, cache_path):
+    model_path, features_path, data_path = files
+    df = pd.read_csv(data_path)
+    model = CountingModel(joblib.load(model_path))
+    key = base_scores_key(model_path, features_path, data_path)
+    scores = get_base_scores(key, lambda: model.predict(prepare_features(df, FEATURES)), len(df), cache_path)
+    return scores, model.calls, key
+
+
+def test_hits_return_the_stored_scores_without_predict():
+    with tempfile.TemporaryDirectory() as tmp:
+        files, cache = _files(tmp), Path(tmp) / "base_scores.npz"
+        evict_base_scores()
+        first, calls, key = _scores(files, cache)
+        assert calls == 1 and cache.exists() and not first.flags.writeable
+
+        again, calls, _ = _scores(files, cache)  # same process
+        assert calls == 0 and again is first
+
+        evict_base_scores()  # a fresh process: only the artifact is left
+        fresh, calls, _ = _scores(files, cache)
+        assert calls == 0 and fresh is not first and np.array_equal(fresh, first)
+        with np.load(cache) as npz:
+            assert str(npz["key"]) == key
+
+
+def test_changed_model_or_dataset_recomputes():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = Path(tmp) / "base_scores.npz"
+        evict_base_scores()
+        before, _, old_key = _scores(_files(tmp), cache)
+
+        model_path, features_path, data_path = _files(tmp, alpha=100.0)  # retrained model, same data
+        after, calls, new_key = _scores((model_path, features_path, data_path), cache)
+        assert calls == 1 and new_key != old_key and not np.allclose(after, before)
+        with np.load(cache) as npz:
+            assert str(npz["key"]) == new_key
+
+        df = pd.read_csv(data_path)
+        pd.concat([df, df.iloc[:1] * 3]).to_csv(data_path, index=False)  # an extra row
+        evict_base_scores()
+        grown, calls, _ = _scores((model_path, features_path, data_path), cache)
+        assert calls == 1 and len(grown) == len(df) + 1
+
+
+def test_corrupt_or_foreign_artifact_recomputes():
+    with tempfile.TemporaryDirectory() as tmp:
+        files, cache = _files(tmp), Path(tmp) / "base_scores.npz"
+        evict_base_scores()
+        expected, _, key = _scores(files, cache)
+
+        broken = [
+            lambda: cache.write_bytes(b"not an npz file"),
+            lambda: np.savez(cache, key=np.array("another model"), scores=expected),
+            lambda: np.savez(cache, key=np.array(key), scores=expected[:-1]),  # wrong row count
+            lambda: np.savez(cache, key=np.array(key), scores=np.array([{"x": 1}], dtype=object)),
+            lambda: np.savez(cache, something_else=expected),
+        ]
+        for corrupt in broken:
+            corrupt()
+            evict_base_scores()
+            scores, calls, _ = _scores(files, cache)
+            assert calls == 1 and np.array_equal(scores, expected)
+            with np.load(cache) as npz:  # and the artifact is repaired
+                assert str(npz["key"]) == key and np.array_equal(npz["scores"], expected)
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} base score cache checks passed")
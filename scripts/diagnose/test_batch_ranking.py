@@ -0,0 +1,80 @@
+"""
+Checks for the batch ranking CLI (regionmatch.batch) against the headless ranker.
+
+Run directly (python scripts/diagnose/test_batch_ranking.py) or with pytest.
+"""
+
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.batch import rank_file
+from regionmatch.constants import INDUSTRIES, UK_CITIES, URGENCY
+from regionmatch.scoring import Profile, Ranker
+
+
+def _profiles(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "company_id": [f"C{i}" for i in range(n)],
+        "industry": rng.choice(INDUSTRIES, n),
+        "employees": rng.integers(1, 500, n),
+        "urgency": rng.choice(URGENCY, n),
+        "city": rng.choice([c[0] for c in UK_CITIES], n),
+    })
+    path = Path(tempfile.mkdtemp()) / "profiles.csv"
+    df.to_csv(path, index=False)
+    return df, path
+
+
+def test_uncapped_batch_matches_live_ranking():
+    profiles, src = _profiles()
+    dst = src.with_name("rankings.csv")
+    summary = rank_file(src, dst, top_n=7, chunksize=64, workers=1, cap=False, log=io.StringIO())
+    assert summary["profiles"] == len(profiles)
+
+    out = pd.read_csv(dst)
+    live = Ranker.load(use_tensor=False)
+    for i in [0, 63, 64, 257, len(profiles) - 1]:
+        row = profiles.iloc[i]
+        expected = live.top(Profile(row.industry, row.urgency), row.city, top_n=7)
+        got = out[out["profile"] == i]
+        assert list(got["rank"]) == list(range(1, len(expected) + 1))
+        assert list(got["lad_code"]) == list(expected["lad_code"])
+        assert np.allclose(got["score"], expected["score"], atol=1e-3)
+
+
+def test_capped_parquet_output_with_ids_and_skipped_rows():
+    profiles, src = _profiles(n=200)
+    profiles.loc[3, "city"] = "Atlantis"
+    profiles.loc[9, "urgency"] = "yesterday"
+    profiles.to_csv(src, index=False)
+    dst = src.with_name("rankings.parquet")
+
+    summary = rank_file(src, dst, chunksize=50, workers=1, seed=7, id_column="company_id", log=io.StringIO())
+    assert summary["skipped"] == [3, 9]
+
+    out = pd.read_parquet(dst)
+    assert list(out.columns) == ["profile", "company_id", "rank", "lad_code", "lad_name", "score"]
+    assert not out["profile"].isin([3, 9]).any()
+    assert out.groupby("profile")["score"].max().between(99.0, 99.5).all()
+    assert (out["company_id"] == "C" + out["profile"].astype(str)).all()
+
+    again = src.with_name("again.parquet")
+    rank_file(src, again, chunksize=50, workers=1, seed=7, id_column="company_id", log=io.StringIO())
+    assert pd.read_parquet(again).equals(out)
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} batch ranking checks passed")
@@ -0,0 +1,218 @@
+"""
+Checks for the incremental build pipeline (regionmatch/pipeline.py and
+scripts/build/build_pipeline.py).
+
+Run directly (python scripts/diagnose/test_build_pipeline.py) or with pytest.
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "build"))
+
+from regionmatch.pipeline import TIMINGS_FILE, Pipeline, Source, Stage, code_files
+
+from build_pipeline import build_pipeline
+from merge_ibex import ibex_by_lad
+
+TRAINING_V1 = REPO_ROOT / "training_data_v1.csv"
+PROCESSED = REPO_ROOT / "data" / "processed"
+
+_barrier = threading.Barrier(2, timeout=5)
+
+
+def _double(df):
+    return df.assign(x=df["x"] * 2)
+
+
+def _total(df):
+    return df.assign(total=df["x_a"] + df["x_b"])
+
+
+def _scaled_total(df):
+    return df.assign(total=(df["x_a"] + df["x_b"]) / 2)
+
+
+def _join(a, b):
+    return a.merge(b, on="k", suffixes=("_a", "_b"))
+
+
+def _meet_then_double(df):
+    # both branches must be inside their stage at the same time to get past this
+    _barrier.wait()
+    return _double(df)
+
+
+def _write(path, df):
+    df.to_csv(path, index=False)
+    return path
+
+
+def _toy(tmp, branch=_double):
+    tmp = Path(tmp)
+    a = _write(tmp / "a.csv", pd.DataFrame({"k": [1, 2, 3], "x": [1.0, 2.0, 3.0]}))
+    b = _write(tmp / "b.csv", pd.DataFrame({"k": [1, 2, 3], "x": [10.0, 20.0, 30.0]}))
+    return Pipeline([
+        Source("a", a),
+        Source("b", b),
+        Stage("a2", branch, ("a",)),
+        Stage("b2", branch, ("b",)),
+        Stage("joined", _join, ("a2", "b2")),
+        Stage("final", _total, ("joined",), publish=tmp / "out" / "final.csv"),
+    ], cache_dir=tmp / "cache")
+
+
+def _ran(results):
+    return sorted(n for n, r in results.items() if r.status == "ran")
+
+
+def test_reproduces_the_processed_tables():
+    tmp = Path(tempfile.mkdtemp())
+    pipeline = build_pipeline(out_dir=tmp / "out", cache_dir=tmp / "cache").with_source("training_table", TRAINING_V1)
+    results = pipeline.run(log=lambda msg: None)
+    assert _ran(results) == ["features", "geo", "lad_centroids"]
+    for name in ["training_data_clean.csv", "training_data_geo.csv", "lad_centroids.csv"]:
+        assert_frame_equal(pd.read_csv(tmp / "out" / name), pd.read_csv(PROCESSED / name))
+
+
+def test_full_graph_builds_the_training_table():
+    tmp = Path(tempfile.mkdtemp())
+    v1 = pd.read_csv(TRAINING_V1)
+    ibex_cols = ["council_id", "apps_total", "apps_decided", "approval_rate", "median_decision_days", "commercial_apps"]
+    ibex = _write(tmp / "ibex.csv", v1[["lad_name"] + ibex_cols].rename(columns={"lad_name": "council_name"}))
+
+    pipeline = build_pipeline(ibex=ibex, incorporations=None, out_dir=tmp / "out", cache_dir=tmp / "cache")
+    results = pipeline.run(log=lambda msg: None)
+    assert all(r.status == "ran" for n, r in results.items() if isinstance(pipeline.nodes[n], Stage))
+    table = pd.read_parquet(tmp / "cache" / "training_table.parquet")
+    assert list(table.columns) == list(v1.columns)
+    assert table["lad_code"].tolist() == v1["lad_code"].tolist()
+    assert (tmp / "out" / "training_data_geo.csv").exists()
+
+
+def test_incorporations_reach_the_features_table():
+    tmp = Path(tempfile.mkdtemp())
+    v1 = pd.read_csv(TRAINING_V1)
+    ibex_cols = ["council_id", "apps_total", "apps_decided", "approval_rate", "median_decision_days", "commercial_apps"]
+    ibex = _write(tmp / "ibex.csv", v1[["lad_name"] + ibex_cols].rename(columns={"lad_name": "council_name"}))
+    a, b = v1["lad_code"].iloc[0], v1["lad_code"].iloc[1]
+    onspd = _write(tmp / "ONSPD.csv", pd.DataFrame({"pcds": ["AB1 2CD", "AB1 2CE", "ZZ9 9ZZ"], "oslaua": [a, a, b]}))
+    dataset = tmp / "incorporations.parquet"  # a get_incorporations.py dataset directory
+    dataset.mkdir()
+    pd.DataFrame({
+        "postal_code": ["AB1 2CD", "AB12CE", "ZZ9 9ZZ", "QQ1 1QQ"],
+        "date_of_creation": ["2024-06-01", "2023-03-01", "2024-05-01", "2024-06-01"],
+    }).to_parquet(dataset / "part-2023-01-01_2024-06-30.parquet", index=False)
+
+    pipeline = build_pipeline(ibex=ibex, incorporations=dataset, postcodes=onspd,
+                              postcode_cache=tmp / "postcode_lad.npz", out_dir=tmp / "out", cache_dir=tmp / "cache")
+    pipeline.run(log=lambda msg: None)
+    for name in ["training_data_clean.csv", "training_data_geo.csv"]:
+        out = pd.read_csv(tmp / "out" / name).set_index("lad_code")
+        assert out.loc[a, "incorporations_total"] == 2 and out.loc[a, "incorporations_12m"] == 1
+        assert out.loc[b, "incorporations_total"] == 1
+        others = out.drop(index=[a, b])
+        assert (others["incorporations_total"] == 0).all()  # not in the directory: 0, not NaN
+        assert "incorporation_growth" in out.columns
+
+    # a new part file changes the dataset's key: only its branch and what follows re-run
+    pd.DataFrame({"postal_code": ["ZZ9 9ZZ"], "date_of_creation": ["2024-06-30"]}).to_parquet(
+        dataset / "part-2024-06-30_2024-06-30.parquet", index=False)
+    (dataset / ".part-2024-07-01_2024-07-31.parquet.123.tmp").write_bytes(b"half written")
+    assert pipeline.plan() == ["incorporations_by_lad", "training_table", "features", "geo"]
+
+
+def test_unchanged_inputs_skip_everything():
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = _toy(tmp)
+        first = pipeline.run(log=lambda msg: None)
+        assert _ran(first) == ["a2", "b2", "final", "joined"]
+        published = pd.read_csv(Path(tmp) / "out" / "final.csv")
+        assert published["total"].tolist() == [22.0, 44.0, 66.0]
+
+        again = _toy(tmp).run(log=lambda msg: None)
+        assert _ran(again) == []
+        assert _toy(tmp).plan() == []
+
+        # a hand-edited published file is rewritten from the cache without re-running
+        (Path(tmp) / "out" / "final.csv").write_text("k\n9\n")
+        repaired = _toy(tmp).run(log=lambda msg: None)
+        assert _ran(repaired) == []
+        assert_frame_equal(pd.read_csv(Path(tmp) / "out" / "final.csv"), published)
+
+
+def test_changed_input_reruns_only_downstream():
+    with tempfile.TemporaryDirectory() as tmp:
+        _toy(tmp).run(log=lambda msg: None)
+        pipeline = _toy(tmp)  # rewrites both sources with the same bytes
+        _write(Path(tmp) / "b.csv", pd.DataFrame({"k": [1, 2, 3], "x": [10.0, 20.0, 31.0]}))
+        assert pipeline.plan() == ["b2", "joined", "final"]
+        results = pipeline.run(log=lambda msg: None)
+        assert _ran(results) == ["b2", "final", "joined"]
+        assert results["a2"].status == "cached"
+        assert pd.read_csv(Path(tmp) / "out" / "final.csv")["total"].tolist() == [22.0, 44.0, 68.0]
+
+        # a different stage function (i.e. edited code) re-runs that stage too
+        changed = Pipeline([
+            n if n.name != "final" else Stage("final", _scaled_total, ("joined",), publish=n.publish)
+            for n in pipeline.nodes.values()
+        ], cache_dir=pipeline.cache_dir)
+        assert changed.plan() == ["final"]
+        assert changed.plan(force=True) == ["a2", "b2", "joined", "final"]
+
+
+def test_stage_keys_cover_imported_code():
+    # ibex_by_lad lives in scripts/build but matches names with regionmatch/names.py
+    assert str(REPO_ROOT / "regionmatch" / "names.py") in code_files(ibex_by_lad)
+    assert str(REPO_ROOT / "scripts" / "build" / "merge_ibex.py") in code_files(ibex_by_lad)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        helper = Path(tmp) / "helper.txt"
+        helper.write_text("v1", encoding="utf-8")
+        pipeline = _toy(tmp)
+        pipeline = Pipeline([
+            n if n.name != "final" else Stage("final", _total, ("joined",), publish=n.publish, code=(helper,))
+            for n in pipeline.nodes.values()
+        ], cache_dir=pipeline.cache_dir)
+        pipeline.run(log=lambda msg: None)
+        assert pipeline.plan() == []
+        helper.write_text("v2 (edited)", encoding="utf-8")
+        assert pipeline.plan() == ["final"]
+
+
+def test_independent_stages_run_in_parallel():
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = _toy(tmp, branch=_meet_then_double)
+        t0 = time.perf_counter()
+        results = pipeline.run(workers=2, log=lambda msg: None)
+        assert _ran(results) == ["a2", "b2", "final", "joined"]
+        assert time.perf_counter() - t0 < 5
+
+
+def test_reports_timing_per_stage():
+    with tempfile.TemporaryDirectory() as tmp:
+        lines = []
+        results = _toy(tmp).run(log=lines.append)
+        assert "4 stage(s) ran" in lines[-1]
+        assert all(results[n].seconds >= 0 and results[n].rows == 3 for n in ["a2", "b2", "joined", "final"])
+        with open(Path(tmp) / "cache" / TIMINGS_FILE, encoding="utf-8") as f:
+            timings = json.load(f)
+        assert set(timings["stages"]) == {"a", "b", "a2", "b2", "joined", "final"}
+        assert timings["stages"]["final"]["status"] == "ran"
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} build pipeline checks passed")
@@ -0,0 +1,91 @@
+"""
+Checks for the columnar dataset artifact (regionmatch/dataset.py).
+
+Run directly (python scripts/diagnose/test_columnar_dataset.py) or with pytest.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch import dataset
+from regionmatch.dataset import SCHEMA_FILE, columnar_dir, load_columnar, load_dataset, write_columnar
+
+
+def _frame():
+    return pd.DataFrame({
+        "lad_code": ["E06000001", "E06000002", None, "W06000015"],
+        "lad_name": ["Hartlepool", "Middlesbrough", "Unknown", "Cardiff"],
+        "approval_rate": [0.81, np.nan, 0.5, 0.92],
+        "apps_total": [120, 45, 0, 3000],
+        "lad_lat": [54.6863185, 54.5447216, np.nan, 51.4815810],
+        "lad_lng": [-1.2129380, -1.2226910, np.nan, -3.1790900],
+    })
+
+
+def _write_csv(path, df):
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_round_trip_keeps_floats_categories_and_missing_values():
+    with tempfile.TemporaryDirectory() as tmp:
+        df = _frame()
+        csv_path = _write_csv(Path(tmp) / "table.csv", df)
+        schema = write_columnar(df, columnar_dir(csv_path), csv_path)
+        kinds = {c["name"]: c["kind"] for c in schema["columns"]}
+        assert kinds == {"lad_code": "category", "lad_name": "category", "approval_rate": "float32",
+                         "apps_total": "float32", "lad_lat": "float64", "lad_lng": "float64"}
+
+        for mmap in (True, False):
+            out = load_columnar(columnar_dir(csv_path), mmap=mmap)
+            assert list(out.columns) == list(df.columns) and len(out) == len(df)
+            assert isinstance(out["lad_code"].dtype, pd.CategoricalDtype)
+            assert out["lad_code"].isna().tolist() == [False, False, True, False]
+            assert out["lad_code"].dropna().astype(str).tolist() == df["lad_code"].dropna().tolist()
+            assert out["lad_name"].astype(str).tolist() == df["lad_name"].tolist()
+            assert out["approval_rate"].dtype == np.float32
+            assert np.allclose(out["approval_rate"], df["approval_rate"], rtol=1e-6, equal_nan=True)
+            assert np.array_equal(out["apps_total"], df["apps_total"].astype(np.float32))
+            # centroids keep full precision
+            assert np.array_equal(out[["lad_lat", "lad_lng"]].to_numpy(), df[["lad_lat", "lad_lng"]].to_numpy(),
+                                  equal_nan=True)
+
+
+def test_stale_artifact_falls_back_to_the_csv():
+    candidates = dataset.DATASET_CANDIDATES
+    with tempfile.TemporaryDirectory() as tmp:
+        df = _frame()
+        csv_path = _write_csv(Path(tmp) / "table.csv", df)
+        write_columnar(df, columnar_dir(csv_path), csv_path)
+        dataset.DATASET_CANDIDATES = [csv_path]
+        try:
+            current = dataset.resolve_dataset_path()
+            assert current == str(columnar_dir(csv_path) / SCHEMA_FILE)
+            assert len(load_dataset(current)) == len(df)
+
+            # the CSV changed after the artifact was built: its source sha no longer matches
+            _write_csv(csv_path, df.assign(apps_total=df["apps_total"] + 1))
+            stale = dataset.resolve_dataset_path()
+            assert stale == str(csv_path)
+            assert load_dataset(stale)["apps_total"].tolist() == (df["apps_total"] + 1).tolist()
+
+            # without the CSV, the artifact is all there is
+            csv_path.unlink()
+            assert dataset.resolve_dataset_path() == current
+        finally:
+            dataset.DATASET_CANDIDATES = candidates
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} columnar dataset checks passed")
@@ -0,0 +1,231 @@
+"""
+Checks for regionmatch.explain using a local stub instead of Gemini.
+
+Run directly (python scripts/diagnose/test_explanation_service.py) or with pytest.
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.explain import ExplanationCache, ExplanationService, explanation_key
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel; counts calls and can be held open."""
+
+    def __init__(self, text="Stub explanation.", release=None):
+        self.text = text
+        self.release = release
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+        if self.release is not None:
+            self.release.wait(timeout=5)
+        return StubResponse(self.text)
+
+
+def _service(model, prefetch_workers=2, **cache_kwargs):
+    tmp = tempfile.mkdtemp()
+    cache = ExplanationCache(Path(tmp) / "explanations.sqlite3", **cache_kwargs)
+    return ExplanationService(
+        model_factory=lambda: model, cache=cache, max_workers=4, prefetch_workers=prefetch_workers
+    )
+
+
+def _jobs(n):
+    return [(explanation_key(f"E0600000{i}", 90, "Technology", 25, "<3 months"), f"prompt {i}") for i in range(n)]
+
+
+def test_key_buckets_score_and_employees():
+    a = explanation_key("E06000001", 99.2, "Technology", 12, "<3 months")
+    b = explanation_key("E06000001", 98.7, "Technology", 40, "<3 months")
+    c = explanation_key("E06000001", 99.2, "Technology", 60, "<3 months")
+    assert a == b
+    assert a != c
+
+
+def test_second_request_is_served_from_cache():
+    model = StubModel()
+    svc = _service(model)
+    key = explanation_key("E06000001", 99, "Technology", 25, "<3 months")
+
+    assert svc.submit(key, "prompt").result(timeout=5) == "Stub explanation."
+    fut = svc.submit(key, "prompt")
+    assert fut.done()
+    assert fut.result() == "Stub explanation."
+    assert model.calls == 1
+    svc.shutdown()
+
+
+def test_cache_survives_a_new_service():
+    model = StubModel()
+    svc = _service(model)
+    key = explanation_key("E06000001", 99, "Technology", 25, "<3 months")
+    svc.submit(key, "prompt").result(timeout=5)
+
+    other = ExplanationService(model_factory=lambda: model, cache=ExplanationCache(svc.cache.path))
+    assert other.submit(key, "prompt").result(timeout=5) == "Stub explanation."
+    assert model.calls == 1
+    svc.shutdown()
+    other.shutdown()
+
+
+def test_concurrent_identical_requests_are_coalesced():
+    release = threading.Event()
+    model = StubModel(release=release)
+    svc = _service(model)
+    key = explanation_key("E06000001", 99, "Technology", 25, "<3 months")
+
+    futures = [svc.submit(key, "prompt") for _ in range(8)]
+    assert all(f is futures[0] for f in futures)
+    release.set()
+    assert futures[0].result(timeout=5) == "Stub explanation."
+    assert model.calls == 1
+    svc.shutdown()
+
+
+def test_submit_does_not_block_the_caller():
+    release = threading.Event()
+    svc = _service(StubModel(release=release))
+    key = explanation_key("E06000001", 99, "Technology", 25, "<3 months")
+
+    t0 = time.perf_counter()
+    fut = svc.submit(key, "prompt")
+    assert time.perf_counter() - t0 < 0.5
+    assert not fut.done()
+    release.set()
+    fut.result(timeout=5)
+    svc.shutdown()
+
+
+def test_errors_are_not_cached():
+    class FailingModel:
+        def generate_content(self, prompt):
+            raise RuntimeError("quota exceeded")
+
+    svc = _service(FailingModel())
+    key = explanation_key("E06000001", 99, "Technology", 25, "<3 months")
+    try:
+        svc.submit(key, "prompt").result(timeout=5)
+        raise AssertionError("expected the model error to propagate")
+    except RuntimeError:
+        pass
+    assert svc.cache.get(key) is None
+    svc.shutdown()
+
+
+def test_ttl_expiry():
+    svc = _service(StubModel(), ttl_seconds=0.2)
+    svc.cache.set("k", "v")
+    assert svc.cache.get("k") == "v"
+    time.sleep(0.3)
+    assert svc.cache.get("k") is None
+    svc.shutdown()
+
+
+def test_lru_eviction_keeps_recently_read_entries():
+    svc = _service(StubModel(), max_entries=2)
+    cache = svc.cache
+    cache.set("a", "1")
+    time.sleep(0.01)
+    cache.set("b", "2")
+    time.sleep(0.01)
+    cache.get("a")          # "a" is now more recent than "b"
+    time.sleep(0.01)
+    cache.set("c", "3")
+    assert len(cache) == 2
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+    svc.shutdown()
+
+
+def test_prefetch_fills_the_cache_for_every_area():
+    model = StubModel()
+    svc = _service(model)
+    jobs = _jobs(5)
+
+    for fut in svc.prefetch("session-a", jobs):
+        fut.result(timeout=5)
+    assert model.calls == 5
+    for key, prompt in jobs:
+        assert svc.submit(key, prompt).done()
+    assert model.calls == 5
+    svc.shutdown()
+
+
+def test_new_prefetch_cancels_the_sessions_queued_jobs():
+    release = threading.Event()
+    model = StubModel(release=release)
+    svc = _service(model, prefetch_workers=1)
+
+    old = svc.prefetch("session-a", _jobs(5))
+    time.sleep(0.1)  # first job is now running, the other four are queued
+    new = svc.prefetch("session-a", [(explanation_key("W06000015", 80, "Creative", 5, "6+ months"), "p")])
+    assert sum(f.cancelled() for f in old) == 4
+    release.set()
+    assert new[0].result(timeout=5) == "Stub explanation."
+    assert model.calls == 2
+    svc.shutdown()
+
+
+def test_cancel_keeps_jobs_other_sessions_still_need():
+    release = threading.Event()
+    model = StubModel(release=release)
+    svc = _service(model, prefetch_workers=1)
+    jobs = _jobs(3)
+
+    a = svc.prefetch("session-a", jobs)
+    b = svc.prefetch("session-b", jobs[1:])
+    interactive = svc.submit(*jobs[0])
+    time.sleep(0.1)
+    svc.cancel_session("session-a")
+    release.set()
+
+    assert interactive is a[0]
+    assert interactive.result(timeout=5) == "Stub explanation."
+    assert all(f.result(timeout=5) == "Stub explanation." for f in b)
+    assert model.calls == 3
+    svc.shutdown()
+
+
+def test_interactive_request_jumps_a_queued_prefetch():
+    release = threading.Event()
+    model = StubModel(release=release)
+    svc = _service(model, prefetch_workers=1)
+    jobs = _jobs(3)
+
+    queued = svc.prefetch("session-a", jobs)
+    time.sleep(0.1)  # the first prefetch holds the only prefetch worker
+    model.release = None  # later calls answer at once
+    interactive = svc.submit(*jobs[2])
+    assert interactive is queued[2]
+    assert interactive.result(timeout=2) == "Stub explanation."
+    assert not queued[0].done()
+
+    release.set()
+    assert all(f.result(timeout=5) == "Stub explanation." for f in queued)
+    assert model.calls == 3
+    svc.shutdown()
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} explanation service checks passed")
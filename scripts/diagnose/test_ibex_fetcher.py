@@ -0,0 +1,359 @@
+"""
+Checks for the concurrent, resumable IBEX fetcher and the shared IbexClient
+against a local stub server.
+
+The stub mimics POST /applications: each council has a fixed number of
+applications served in pages of PAGE_SIZE, over HTTP/1.1 keep-alive. Run directly
+(python scripts/diagnose/test_ibex_fetcher.py) or with pytest.
+"""
+
+import csv
+import json
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "ingest"))
+
+import ibex_batch_from_json as ibex
+from ibex_cache import PageCache
+
+PAGE_SIZE = 10
+
+
+def _apps(council_id):
+    """Deterministic applications; council N has 3N + 4 of them."""
+    out = []
+    for i in range(3 * council_id + 4):
+        out.append({
+            "proposal": "New shop front" if i % 3 == 0 else "Rear extension",
+            "normalised_decision": "Approved" if i % 4 else "Refused",
+            "application_date": "2024-03-01",
+            "decided_date": f"2024-03-{1 + (i % 20):02d}",
+        })
+    return out
+
+
+class StubIbex(BaseHTTPRequestHandler):
+    # class-level so the test can inspect / steer the server
+    protocol_version = "HTTP/1.1"
+    token = "test-token"
+    calls = Counter()
+    failing = set()
+    throttle_once = set()
+    connections = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["input"]
+        cid = body["council_id"][0]
+        with self.lock:
+            self.calls[cid] += 1
+            self.connections.add(self.client_address)
+            throttle = cid in self.throttle_once
+            self.throttle_once.discard(cid)
+        if self.headers.get("Authorization") != f"Bearer {self.token}":
+            return self._send(401, {"error": "bad token"})
+        if cid in self.failing:
+            return self._send(503, {"error": "unavailable"})
+        if throttle:
+            return self._send(429, {"error": "slow down"}, {"Retry-After": "0"})
+        page, size = body["page"], body["page_size"]
+        items = _apps(cid)[(page - 1) * size: page * size]
+        self._send(200, {"items": items})
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _server():
+    StubIbex.calls = Counter()
+    StubIbex.failing = set()
+    StubIbex.throttle_once = set()
+    StubIbex.connections = set()
+    StubIbex.token = "test-token"
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubIbex)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _jwt_file(token="test-token"):
+    path = Path(tempfile.mkdtemp()) / "ibex_jwt.txt"
+    path.write_text(token + "\n", encoding="utf-8")
+    return path
+
+
+def _client(host, workers=4, rate=1000, jwt_path=None, cache=None):
+    return ibex.make_client(host, workers, rate, jwt_path=jwt_path or _jwt_file(), max_retries=2, cache=cache)
+
+
+def _setup():
+    ibex.PAGE_SIZE = PAGE_SIZE
+    councils = [{"council_id": i, "council_name": f"Council {i}"} for i in range(1, 13)]
+    out = str(Path(tempfile.mkdtemp()) / "ibex_features_by_council.csv")
+    return councils, out
+
+
+def _read(out):
+    with open(out, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_concurrent_fetch_matches_sequential_features():
+    server, host = _server()
+    councils, out = _setup()
+    done, failed = ibex.fetch_councils(councils, out, workers=4, client=_client(host, 4, 1000))
+    server.shutdown()
+
+    assert (done, failed) == (12, [])
+    rows = _read(out)
+    assert [int(r["council_id"]) for r in rows] == list(range(1, 13))
+    for r in rows:
+        expected = ibex.compute_features(_apps(int(r["council_id"])))
+        assert int(r["apps_total"]) == expected["apps_total"]
+        assert float(r["approval_rate"]) == expected["approval_rate"]
+        assert float(r["median_decision_days"]) == expected["median_decision_days"]
+    # pages of 10: council N needs ceil((3N + 4 + 1) / 10) requests
+    assert StubIbex.calls[12] == 5
+
+
+def test_restart_resumes_after_failures():
+    server, host = _server()
+    councils, out = _setup()
+    StubIbex.failing = {5, 9}
+    done, failed = ibex.fetch_councils(councils, out, workers=4, client=_client(host, 4, 1000))
+    assert done == 10
+    assert sorted(cid for cid, _ in failed) == [5, 9]
+    assert len(_read(out)) == 10
+
+    StubIbex.failing = set()
+    StubIbex.calls = Counter()
+    done, failed = ibex.fetch_councils(councils, out, workers=4, client=_client(host, 4, 1000))
+    server.shutdown()
+
+    assert (done, failed) == (2, [])
+    assert set(StubIbex.calls) == {5, 9}
+    assert [int(r["council_id"]) for r in _read(out)] == list(range(1, 13))
+
+
+def test_changed_window_starts_over():
+    server, host = _server()
+    councils, out = _setup()
+    ibex.fetch_councils(councils[:3], out, workers=2, client=_client(host, 2, 1000))
+
+    old = ibex.DATE_TO
+    ibex.DATE_TO = "2024-06-30"
+    try:
+        StubIbex.calls = Counter()
+        done, _ = ibex.fetch_councils(councils[:3], out, workers=2, client=_client(host, 2, 1000))
+    finally:
+        ibex.DATE_TO = old
+        server.shutdown()
+    assert done == 3
+    assert set(StubIbex.calls) == {1, 2, 3}
+
+
+def test_checkpoint_appends_after_a_torn_line():
+    path = Path(tempfile.mkdtemp()) / "checkpoint.jsonl"
+    window = ibex.feature_window()
+    checkpoint = ibex.Checkpoint(path, window)
+    checkpoint.load()
+    checkpoint.add({"council_id": 1, "apps_total": 4})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"council_id": 2, "apps_')  # crash mid-write
+
+    checkpoint = ibex.Checkpoint(path, window)
+    assert list(checkpoint.load()) == [1]
+    checkpoint.add({"council_id": 3, "apps_total": 13})
+    assert sorted(ibex.Checkpoint(path, window).load()) == [1, 3]
+
+
+def test_throttled_requests_are_retried():
+    server, host = _server()
+    councils, out = _setup()
+    StubIbex.throttle_once = {2, 7}
+    done, failed = ibex.fetch_councils(councils, out, workers=4, client=_client(host, 4, 1000))
+    server.shutdown()
+    assert (done, failed) == (12, [])
+
+
+def test_rate_limit_is_shared_by_all_workers():
+    server, host = _server()
+    councils, out = _setup()
+    t0 = time.perf_counter()
+    ibex.fetch_councils(councils[:4], out, workers=4, client=_client(host, 4, 20))
+    elapsed = time.perf_counter() - t0
+    server.shutdown()
+    n_requests = sum(StubIbex.calls.values())
+    # one token up front, then at most 20/s across all four workers
+    assert elapsed >= (n_requests - 1) / 20 * 0.9
+
+
+def _random_apps(rng, n):
+    decisions = ["Approved", "Refused", "Granted", "Withdrawn", None, "REFUSED"]
+    proposals = ["New shop front", "Rear extension", "Change of use to café", None, "Loft conversion"]
+    out = []
+    for _ in range(n):
+        start = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        end = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00"
+        out.append({
+            "proposal": rng.choice(proposals),
+            "normalised_decision": rng.choice(decisions),
+            "application_date": rng.choice([start, start + "T09:00:00", None, "not a date"]),
+            "decided_date": rng.choice([end, end, None]),
+        })
+    return out
+
+
+def _list_features(apps):
+    """The features from one pass over the whole list, median via statistics.median."""
+    approved = refused = commercial = 0
+    days = []
+    for a in apps:
+        if any(k in str(a.get("proposal") or a.get("description") or "").lower() for k in ibex.COMMERCIAL_KEYWORDS):
+            commercial += 1
+        d = str(a.get("normalised_decision") or a.get("raw_decision") or a.get("decision") or a.get("status") or "").lower()
+        if "approved" in d or "granted" in d:
+            approved += 1
+        elif "refused" in d:
+            refused += 1
+        start, end = ibex.parse_date(a.get("application_date")), ibex.parse_date(a.get("decided_date"))
+        if start and end and end >= start:
+            days.append((end - start).days)
+    decided = approved + refused
+    return {
+        "apps_total": len(apps),
+        "apps_decided": decided,
+        "approval_rate": approved / decided if decided else None,
+        "median_decision_days": statistics.median(days) if days else None,
+        "commercial_apps": commercial,
+    }
+
+
+def test_streaming_features_match_a_pass_over_the_full_list():
+    rng = random.Random(14)
+    for n in (0, 1, 2, 3, 10, 999, 1000, 2501):
+        apps = _random_apps(rng, n)
+        agg = ibex.FeatureAggregator()
+        for i in range(0, n, 250):
+            agg.add(apps[i:i + 250])
+        assert agg.result() == ibex.compute_features(apps) == _list_features(apps), n
+
+
+def test_streaming_median_is_exact_for_even_counts():
+    apps = [
+        {"application_date": "2024-01-01", "decided_date": f"2024-01-{d:02d}"}
+        for d in (2, 3, 5, 9)
+    ]
+    agg = ibex.FeatureAggregator().add(apps[:1]).add(apps[1:])
+    # days 1, 2, 4, 8 -> (2 + 4) / 2
+    assert agg.result()["median_decision_days"] == _list_features(apps)["median_decision_days"] == 3.0
+
+
+def test_client_reuses_connections_and_reads_token_once():
+    server, host = _server()
+    councils, out = _setup()
+    client = _client(host, workers=4)
+    with client:
+        done, _ = ibex.fetch_councils(councils, out, workers=4, client=client)
+    server.shutdown()
+    assert done == 12
+    assert client.token_loads == 1
+    # 35 page requests over at most one keep-alive connection per worker
+    assert sum(StubIbex.calls.values()) == 35
+    assert len(StubIbex.connections) <= 4
+
+
+def test_client_refreshes_rotated_token_on_401():
+    server, host = _server()
+    jwt = _jwt_file("old-token")
+    client = _client(host, workers=1, jwt_path=jwt)
+    assert client.token == "old-token"
+
+    StubIbex.token = "new-token"
+    jwt.write_text("new-token", encoding="utf-8")
+    items = list(client.iter_pages(5, PAGE_SIZE, date_from="2024-01-01", date_to="2024-12-31", council_id=1))
+    server.shutdown()
+    assert sum(len(page) for page in items) == len(_apps(1))
+    assert client.token == "new-token"
+    assert client.token_loads == 2
+
+
+def test_client_stops_when_refreshed_token_is_rejected():
+    server, host = _server()
+    client = _client(host, workers=1, jwt_path=_jwt_file("expired-token"))
+    try:
+        client.applications(1, PAGE_SIZE, "2024-01-01", "2024-12-31", council_id=1)
+    except SystemExit as e:
+        assert "401" in str(e)
+    else:
+        raise AssertionError("expected SystemExit on a rejected token")
+    finally:
+        server.shutdown()
+    # the token was re-read, but it had not changed, so there is nothing to retry with
+    assert StubIbex.calls[1] == 1
+    assert client.token_loads == 2
+
+
+def test_restart_rebuilds_from_page_cache():
+    server, host = _server()
+    councils, out = _setup()
+    cache = PageCache(tempfile.mkdtemp())
+    ibex.fetch_councils(councils, out, workers=4, client=_client(host, cache=cache))
+    first = _read(out)
+    fetched = sum(StubIbex.calls.values())
+    assert cache.misses == fetched and cache.hits == 0
+
+    # lose one council's second page: only that page is fetched again
+    lost = cache.path({"host": host, "date_from": ibex.DATE_FROM, "date_to": ibex.DATE_TO, "page": 2,
+                       "page_size": PAGE_SIZE, "date_range_type": ibex.DATE_RANGE_TYPE, "council_id": [12]})
+    Path(lost).unlink()
+    StubIbex.calls = Counter()
+    ibex.fetch_councils(councils, out, workers=4, restart=True, client=_client(host, cache=cache))
+    server.shutdown()
+    assert StubIbex.calls == Counter({12: 1})
+    assert cache.hits == fetched - 1
+    assert _read(out) == first
+
+
+def test_page_cache_freshness():
+    cache = PageCache(tempfile.mkdtemp(), open_max_age=3600)
+    request = {"host": "h", "date_from": "2024-01-01", "date_to": "2024-12-31", "page": 1, "page_size": 10}
+    closed = time.mktime((2025, 3, 1, 12, 0, 0, 0, 0, -1))
+    still_open = time.mktime((2024, 12, 20, 12, 0, 0, 0, 0, -1))
+    year = 365 * 86400
+
+    # fetched after the window closed: kept however old
+    assert cache.is_fresh({"request": request, "fetched_at": closed}, now=closed + year)
+    # fetched while it was open: only for open_max_age
+    assert cache.is_fresh({"request": request, "fetched_at": still_open}, now=still_open + 60)
+    assert not cache.is_fresh({"request": request, "fetched_at": still_open}, now=still_open + 7200)
+
+    cache.put(request, [{"id": 1}, {"id": 2}])
+    assert cache.get(request) == [{"id": 1}, {"id": 2}]
+    assert cache.get({**request, "page": 2}) is None
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} IBEX fetcher/client checks passed")
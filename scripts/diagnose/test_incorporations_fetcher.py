@@ -0,0 +1,235 @@
+"""
+Checks for the parallel Companies House incorporations downloader against a
+local stub of GET advanced-search/companies.
+
+The stub serves COMPANIES_PER_DAY companies for every incorporation date and
+can throttle or fail on demand. Run directly
+(python scripts/diagnose/test_incorporations_fetcher.py) or with pytest.
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "ingest"))
+
+import get_incorporations as ch
+from rate_limit import AdaptiveTokenBucket
+
+COMPANIES_PER_DAY = 7
+AUTH = "Basic dGVzdC1rZXk6"  # base64("test-key:")
+
+
+def _companies(inc_from, inc_to):
+    out = []
+    day, end = date.fromisoformat(inc_from), date.fromisoformat(inc_to)
+    while day <= end:
+        for i in range(COMPANIES_PER_DAY):
+            out.append({
+                "company_number": f"{day:%Y%m%d}{i:02d}",
+                "company_name": f"Company {day} {i}",
+                "date_of_creation": day.isoformat(),
+                "registered_office_address": {"postal_code": f"AB{i} 1CD"},
+            })
+        day += timedelta(days=1)
+    return out
+
+
+class StubCompaniesHouse(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    calls = Counter()
+    throttle = 0        # answer this many requests with 429 before serving
+    failing = set()     # incorporated_from values that always 503
+    lock = threading.Lock()
+
+    def do_GET(self):
+        q = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        rng = (q["incorporated_from"], q["incorporated_to"])
+        with self.lock:
+            self.calls[rng] += 1
+            throttled = self.throttle > 0
+            if throttled:
+                type(self).throttle -= 1
+        if self.headers.get("Authorization") != AUTH:
+            return self._send(401, {"error": "unauthorised"})
+        if throttled:
+            return self._send(429, {"error": "rate limited"}, {"Retry-After": "0.05"})
+        if rng[0] in self.failing:
+            return self._send(503, {"error": "unavailable"})
+        hits = _companies(*rng)
+        start, size = int(q["start_index"]), int(q["size"])
+        self._send(200, {"hits": len(hits), "items": hits[start:start + size]})
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _server():
+    StubCompaniesHouse.calls = Counter()
+    StubCompaniesHouse.throttle = 0
+    StubCompaniesHouse.failing = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCompaniesHouse)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/advanced-search/companies"
+
+
+def _fetcher(base, out=None, **kwargs):
+    kwargs = {"workers": 4, "rate": 1000, "page_size": 20, "max_retries": 2, "log": lambda *a: None, **kwargs}
+    return ch.IncorporationsFetcher("test-key", out or tempfile.mkdtemp(), base, **kwargs)
+
+
+def _read(out):
+    return pd.read_parquet(out).sort_values("company_number").reset_index(drop=True)
+
+
+def test_split_window_covers_each_day_once():
+    ranges = ch.split_window("2025-01-01", "2025-12-31", 7)
+    days = set()
+    for a, b in ranges:
+        d = date.fromisoformat(a)
+        while d <= date.fromisoformat(b):
+            assert d not in days
+            days.add(d)
+            d += timedelta(days=1)
+    assert len(days) == 365 and len(ranges) == 53
+    assert ch.bisect_range(("2025-01-01", "2025-01-01")) is None
+
+
+def test_parallel_download_matches_window():
+    server, base = _server()
+    fetcher = _fetcher(base)
+    rows, failed = fetcher.run("2025-01-01", "2025-02-28", split_days=7)
+    server.shutdown()
+
+    assert failed == []
+    expected = _companies("2025-01-01", "2025-02-28")
+    assert rows == len(expected)
+    df = _read(fetcher.out_dir)
+    assert df["company_number"].tolist() == sorted(c["company_number"] for c in expected)
+    assert df["postal_code"].iloc[0] == "AB0 1CD"
+    # 49 companies per 7-day range -> 3 pages of 20
+    assert StubCompaniesHouse.calls[("2025-01-01", "2025-01-07")] == 3
+
+
+def test_large_ranges_are_bisected():
+    server, base = _server()
+    fetcher = _fetcher(base, max_range_hits=30)
+    rows, failed = fetcher.run("2025-03-01", "2025-03-31", split_days=31)
+    server.shutdown()
+
+    assert failed == [] and rows == 31 * COMPANIES_PER_DAY
+    parts = sorted(p.name for p in Path(fetcher.out_dir).glob("part-*.parquet"))
+    # every part ends up with at most 4 days (28 hits)
+    assert all((date.fromisoformat(p[16:26]) - date.fromisoformat(p[5:15])).days < 4 for p in parts)
+    assert len(_read(fetcher.out_dir)) == rows
+
+
+def test_resume_skips_ranges_finished_through_their_halves():
+    server, base = _server()
+    out = tempfile.mkdtemp()
+    StubCompaniesHouse.failing = {"2025-03-12"}  # the last quarter of the first 14-day range
+    rows, failed = _fetcher(base, out, max_range_hits=30).run("2025-03-01", "2025-03-28", split_days=14)
+    assert [rng for rng, _ in failed] == [("2025-03-12", "2025-03-14")]
+
+    StubCompaniesHouse.failing = set()
+    StubCompaniesHouse.calls = Counter()
+    lines = []
+    rows, failed = _fetcher(base, out, max_range_hits=30, log=lines.append).run(
+        "2025-03-01", "2025-03-28", split_days=14)
+    assert failed == [] and rows == 3 * COMPANIES_PER_DAY
+    # only the missing quarter is fetched, not its split ancestors from page 0
+    assert set(StubCompaniesHouse.calls) == {("2025-03-12", "2025-03-14")}
+    assert lines[0] == "Resuming: 1 of 2 ranges already downloaded, 1 (sub-)range(s) left"
+
+    StubCompaniesHouse.calls = Counter()
+    lines = []
+    rows, failed = _fetcher(base, out, max_range_hits=30, log=lines.append).run(
+        "2025-03-01", "2025-03-28", split_days=14)
+    server.shutdown()
+    assert rows == 0 and failed == [] and not StubCompaniesHouse.calls
+    assert lines == ["Resuming: 2 of 2 ranges already downloaded"]
+    assert len(_read(out)) == 28 * COMPANIES_PER_DAY
+
+
+def test_failed_ranges_resume_without_refetching_finished_ones():
+    server, base = _server()
+    out = tempfile.mkdtemp()
+    StubCompaniesHouse.failing = {"2025-01-08", "2025-01-22"}
+    rows, failed = _fetcher(base, out).run("2025-01-01", "2025-01-28", split_days=7)
+    assert sorted(rng for rng, _ in failed) == [("2025-01-08", "2025-01-14"), ("2025-01-22", "2025-01-28")]
+    assert rows == 14 * COMPANIES_PER_DAY
+    assert not list(Path(out).glob(".*.tmp"))
+
+    StubCompaniesHouse.failing = set()
+    StubCompaniesHouse.calls = Counter()
+    rows, failed = _fetcher(base, out).run("2025-01-01", "2025-01-28", split_days=7)
+    assert failed == [] and rows == 14 * COMPANIES_PER_DAY
+    assert set(StubCompaniesHouse.calls) == {("2025-01-08", "2025-01-14"), ("2025-01-22", "2025-01-28")}
+    assert len(_read(out)) == 28 * COMPANIES_PER_DAY
+
+    # a different split of the same window starts over rather than mixing overlapping parts
+    rows, _ = _fetcher(base, out).run("2025-01-01", "2025-01-28", split_days=14)
+    assert rows == 28 * COMPANIES_PER_DAY and len(_read(out)) == rows
+    assert len(list(Path(out).glob("part-*.parquet"))) == 2
+
+    # a different window starts the dataset over
+    rows, _ = _fetcher(base, out).run("2025-01-01", "2025-01-07", split_days=7)
+    server.shutdown()
+    assert rows == 7 * COMPANIES_PER_DAY and len(_read(out)) == rows
+
+
+def test_throttling_lowers_the_shared_rate():
+    server, base = _server()
+    StubCompaniesHouse.throttle = 3
+    fetcher = _fetcher(base, max_retries=5)
+    rows, failed = fetcher.run("2025-01-01", "2025-01-14", split_days=7)
+    server.shutdown()
+    assert failed == [] and rows == 14 * COMPANIES_PER_DAY
+    assert fetcher.bucket.throttle_count == 3
+    assert fetcher.bucket.rate < 1000
+
+
+def test_adaptive_bucket_backs_off_and_recovers():
+    bucket = AdaptiveTokenBucket(100, min_rate=10, recovery=0.1)
+    bucket.throttled()
+    bucket.throttled()
+    assert bucket.rate == 25
+    for _ in range(3):
+        bucket.throttled()
+    assert bucket.rate == 10
+    for _ in range(20):
+        bucket.succeeded()
+    assert bucket.rate == 100
+
+    bucket.throttled(retry_after=0.2)
+    t0 = time.perf_counter()
+    bucket.acquire()
+    assert time.perf_counter() - t0 >= 0.19
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} incorporations fetcher checks passed")
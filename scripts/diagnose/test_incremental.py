@@ -0,0 +1,140 @@
+"""
+Checks for incremental linear-model updates (regionmatch/incremental.py).
+
+Run directly (python scripts/diagnose/test_incremental.py) or with pytest.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import ElasticNet, Lasso, LinearRegression, Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.incremental import SufficientStats, batch_rows
+
+FEATURES = [f"f{i}" for i in range(5)]
+
+
+def _table(n, seed=0, start=0, missing=0.0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(loc=50.0, scale=[1, 5, 10, 0.1, 20], size=(n, len(FEATURES)))
+    y = X @ np.array([0.5, -0.2, 0.1, 3.0, 0.05]) + rng.normal(size=n)
+    X[rng.random(X.shape) < missing] = np.nan
+    df = pd.DataFrame(X, columns=FEATURES)
+    df.insert(0, "lad_code", [f"E{start + i:08d}" for i in range(n)])
+    df["target_score"] = y
+    return df
+
+
+def _pipeline(model):
+    return Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler()), ("model", model)])
+
+
+def _stats(pipe, df):
+    return SufficientStats.from_rows(pipe, df["lad_code"], df[FEATURES], df["target_score"], FEATURES)
+
+
+def _update(base, batch):
+    """Base table with the batch's LADs replaced or appended, as a full rebuild would produce it."""
+    return pd.concat([base[~base["lad_code"].isin(batch["lad_code"])], batch], ignore_index=True)
+
+
+def test_append_and_replace_match_a_full_refit():
+    base = _table(200)
+    batch = pd.concat([_table(30, seed=1, start=100), _table(20, seed=2, start=500)], ignore_index=True)  # 30 replaced
+    for model in (Ridge(alpha=1.0), LinearRegression()):
+        pipe = _pipeline(model).fit(base[FEATURES], base["target_score"])
+        stats = _stats(pipe, base)
+        assert stats.upsert(*batch_rows(pipe, FEATURES, batch)) == (20, 30)
+        updated = stats.refit(pipe)
+
+        full = _update(base, batch)
+        ref = _pipeline(clone(model)).fit(full[FEATURES], full["target_score"])
+        assert np.allclose(updated.named_steps["scaler"].scale_, ref.named_steps["scaler"].scale_, rtol=1e-12)
+        assert np.allclose(updated[-1].coef_, ref[-1].coef_, rtol=1e-9, atol=1e-12)
+        assert np.allclose(updated.predict(full[FEATURES]), ref.predict(full[FEATURES]), rtol=0, atol=1e-9)
+        assert stats.n == len(full)
+
+
+def test_missing_values_use_the_frozen_imputer():
+    base = _table(150, missing=0.1)
+    batch = _table(40, seed=3, start=120, missing=0.1)
+    pipe = _pipeline(Ridge(alpha=0.5)).fit(base[FEATURES], base["target_score"])
+    stats = _stats(pipe, base)
+    stats.upsert(*batch_rows(pipe, FEATURES, batch))
+    updated = stats.refit(pipe)
+
+    full = _update(base, batch)
+    imputer = pipe.named_steps["imputer"]
+    ref = Pipeline([("scaler", StandardScaler()), ("model", Ridge(alpha=0.5))])
+    ref.fit(imputer.transform(full[FEATURES]), full["target_score"])
+    assert np.allclose(updated.predict(full[FEATURES]), ref.predict(imputer.transform(full[FEATURES])), rtol=0, atol=1e-9)
+    assert list(updated.named_steps["imputer"].statistics_) == list(imputer.statistics_)
+
+
+def test_elastic_net_matches_a_converged_refit():
+    base, batch = _table(200), _table(50, seed=4, start=180)
+    pipe = _pipeline(ElasticNet(alpha=0.01, l1_ratio=0.5)).fit(base[FEATURES], base["target_score"])
+    stats = _stats(pipe, base)
+    stats.upsert(*batch_rows(pipe, FEATURES, batch))
+    updated = stats.refit(pipe)
+
+    full = _update(base, batch)
+    ref = _pipeline(ElasticNet(alpha=0.01, l1_ratio=0.5, tol=1e-14, max_iter=100_000))
+    ref.fit(full[FEATURES], full["target_score"])
+    assert np.allclose(updated[-1].coef_, ref[-1].coef_, rtol=0, atol=1e-8)
+    assert np.allclose(updated.predict(full[FEATURES]), ref.predict(full[FEATURES]), rtol=0, atol=1e-8)
+
+
+def test_lasso_refit_finds_the_exact_support():
+    base = _table(200)
+    pipe = _pipeline(Lasso(alpha=0.5)).fit(base[FEATURES], base["target_score"])
+    assert (pipe[-1].coef_ == 0).any()
+    updated = _stats(pipe, base).refit(pipe)  # no batch: only convergence changes
+
+    ref = _pipeline(Lasso(alpha=0.5, tol=1e-14, max_iter=100_000)).fit(base[FEATURES], base["target_score"])
+    assert list(updated[-1].coef_ == 0) == list(ref[-1].coef_ == 0)
+    assert np.allclose(updated[-1].coef_, ref[-1].coef_, rtol=0, atol=1e-10)
+    assert updated[-1].n_iter_ < 100
+
+
+def test_stats_round_trip_and_reject_bad_input():
+    base = _table(60)
+    pipe = _pipeline(Ridge()).fit(base[FEATURES], base["target_score"])
+    stats = _stats(pipe, base)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "stats.npz"
+        stats.save(path)
+        loaded = SufficientStats.load(path)
+        assert SufficientStats.load(Path(tmp) / "missing.npz") is None
+    assert loaded.keys == stats.keys and loaded.features == FEATURES
+    assert np.allclose(loaded.refit(pipe)[-1].coef_, stats.refit(pipe)[-1].coef_, rtol=0, atol=0)
+
+    keys, rows = batch_rows(pipe, FEATURES, _table(3, start=60))
+    for bad in (lambda: stats.upsert(keys * 2, np.vstack([rows, rows])),
+                lambda: stats.refit(_pipeline(Ridge()).fit(base[FEATURES] + 1, base["target_score"])),
+                lambda: _stats(Pipeline([("model", RandomForestRegressor(n_estimators=2))]).fit(
+                    base[FEATURES], base["target_score"]), base)):
+        try:
+            bad()
+        except (ValueError, TypeError):
+            continue
+        raise AssertionError("bad input was accepted")
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} incremental update checks passed")
@@ -0,0 +1,114 @@
+"""
+Parity checks for regionmatch.linear against the scikit-learn pipeline.
+
+Run directly (python scripts/diagnose/test_linear_scorer.py) or with pytest.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.base_scores import prepare_features
+from regionmatch.dataset import load_dataset, resolve_dataset_path
+from regionmatch.linear import FEATURES_PATH, MODEL_PATH, LinearScorer, load_model
+
+ATOL = 1e-9
+
+
+def _shipped():
+    pipe = joblib.load(MODEL_PATH)
+    features = joblib.load(FEATURES_PATH)
+    df = load_dataset(resolve_dataset_path())
+    return pipe, features, df
+
+
+def test_parity_on_shipped_dataset():
+    pipe, features, df = _shipped()
+    X = prepare_features(df, features)
+    got = LinearScorer.from_pipeline(pipe, features).predict(X)
+    assert np.allclose(got, pipe.predict(X), rtol=0, atol=ATOL)
+
+
+def test_parity_with_missing_values():
+    pipe, features, df = _shipped()
+    X = prepare_features(df, features)
+    rng = np.random.default_rng(0)
+    X = X.mask(rng.random(X.shape) < 0.2)
+    got = LinearScorer.from_pipeline(pipe, features).predict(X)
+    assert np.allclose(got, pipe.predict(X), rtol=0, atol=ATOL)
+
+
+def test_ridge_pipeline_with_empty_and_constant_features():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.normal(size=(200, 5)), columns=list("abcde"))
+    X["d"] = np.nan    # dropped by the imputer
+    X["e"] = 3.0       # zero variance, scale_ == 1
+    X.loc[rng.random(200) < 0.1, "a"] = np.nan
+    y = 2 * X["b"].fillna(0) - X["c"] + rng.normal(size=200)
+
+    pipe = Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler()),
+        ("model", Ridge(alpha=1.0)),
+    ])
+    pipe.fit(X, y)
+    got = LinearScorer.from_pipeline(pipe, list(X.columns)).predict(X)
+    assert np.allclose(got, pipe.predict(X), rtol=0, atol=ATOL)
+
+
+def test_scaler_without_centring_or_scaling():
+    rng = np.random.default_rng(2)
+    X = pd.DataFrame(rng.normal(loc=20.0, scale=4.0, size=(150, 3)), columns=list("abc"))
+    X.loc[rng.random(150) < 0.1, "b"] = np.nan
+    y = X["a"] - 0.5 * X["c"] + rng.normal(size=150)
+    for scaler in (StandardScaler(with_mean=False), StandardScaler(with_std=False),
+                   StandardScaler(with_mean=False, with_std=False)):
+        pipe = Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", scaler), ("model", Ridge())])
+        pipe.fit(X, y)
+        got = LinearScorer.from_pipeline(pipe, list(X.columns)).predict(X)
+        assert np.allclose(got, pipe.predict(X), rtol=0, atol=ATOL), scaler
+
+
+def test_save_and_load_round_trip():
+    pipe, features, df = _shipped()
+    X = prepare_features(df, features)
+    path = Path(tempfile.mkdtemp()) / "linear_scorer.json"
+    LinearScorer.from_pipeline(pipe, features).save(path, source=MODEL_PATH)
+
+    loaded = LinearScorer.load(path, source=MODEL_PATH)
+    assert loaded is not None
+    assert loaded.features == list(features)
+    assert np.allclose(loaded.predict(X), pipe.predict(X), rtol=0, atol=ATOL)
+
+
+def test_export_from_another_pipeline_is_ignored():
+    pipe, features, _ = _shipped()
+    tmp = Path(tempfile.mkdtemp())
+    path = tmp / "linear_scorer.json"
+    other = tmp / "other_model.joblib"
+    other.write_bytes(b"not the shipped model")
+    LinearScorer.from_pipeline(pipe, features).save(path, source=other)
+
+    assert LinearScorer.load(path, source=MODEL_PATH) is None
+    model, _, files = load_model(scorer_path=path)
+    assert isinstance(model, Pipeline)
+    assert files == (MODEL_PATH, FEATURES_PATH)
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} linear scorer checks passed")
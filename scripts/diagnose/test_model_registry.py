@@ -0,0 +1,179 @@
+"""
+Checks for the versioned model registry (regionmatch/registry.py) and the
+ranker following its CURRENT pointer.
+
+Run directly (python scripts/diagnose/test_model_registry.py) or with pytest.
+"""
+
+import copy
+import json
+import sys
+import tempfile
+import threading
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch import registry
+from regionmatch.base_scores import evict_base_scores, file_digest
+from regionmatch.incremental import SufficientStats
+from regionmatch.linear import LinearScorer
+from regionmatch.scoring import Profile, Ranker
+
+FEATURES = ["a", "b", "c"]
+
+
+def _fit(model):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(50, 3)), columns=FEATURES)
+    y = X @ np.array([1.0, -2.0, 0.5]) + 0.1 * rng.normal(size=50)
+    steps = [("imputer", SimpleImputer(strategy="median"))]
+    if not isinstance(model, RandomForestRegressor):
+        steps.append(("scaler", StandardScaler()))
+    return Pipeline(steps + [("model", model)]).fit(X, y), X, y
+
+
+def test_publish_activate_and_roll_back():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert registry.current(tmp).version is None  # legacy files until something is published
+        ridge, X, y = _fit(Ridge())
+        stats = SufficientStats.from_rows(ridge, [f"L{i}" for i in range(len(X))], X, y, FEATURES)
+        first = registry.publish(ridge, FEATURES, {"test_r2": np.float64(0.9)}, stats=stats, registry_dir=tmp)
+        assert first.version == "v0001" and registry.current_version(tmp) == "v0001"
+
+        manifest = first.manifest()
+        assert manifest["feature_hash"] == registry.feature_hash(FEATURES)
+        assert manifest["metrics"] == {"test_r2": 0.9} and manifest["model"] == "Ridge"
+        for name, digest in manifest["files"].items():
+            assert file_digest(first.directory / name) == digest
+        assert first.scorer_path.exists() and first.stats_path.exists()
+
+        forest = registry.publish(_fit(RandomForestRegressor(n_estimators=3, random_state=0))[0], FEATURES,
+                                  parent="v0001", registry_dir=tmp)
+        assert forest.version == "v0002" and registry.current(tmp) == forest
+        assert not forest.scorer_path.exists() and forest.manifest()["parent"] == "v0001"
+
+        registry.set_current("v0001", tmp)
+        assert registry.current(tmp) == first
+        try:
+            registry.set_current("v0009", tmp)
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("activated a version that does not exist")
+        assert registry.versions(tmp) == ["v0001", "v0002"] and registry.current_version(tmp) == "v0001"
+
+
+def test_loaded_version_scores_like_the_pipeline():
+    with tempfile.TemporaryDirectory() as tmp:
+        ridge, X, _ = _fit(Ridge(alpha=0.3))
+        version = registry.publish(ridge, FEATURES, registry_dir=tmp)
+        model, features, files = registry.load_version(version)
+        assert isinstance(model, LinearScorer) and features == FEATURES
+        assert files[0] == version.scorer_path
+        assert np.allclose(model.predict(X), ridge.predict(X), rtol=0, atol=1e-9)
+
+        manifest = json.loads((version.directory / registry.MANIFEST_FILE).read_text(encoding="utf-8"))
+        manifest["feature_hash"] = registry.feature_hash(FEATURES[::-1])
+        (version.directory / registry.MANIFEST_FILE).write_text(json.dumps(manifest), encoding="utf-8")
+        try:
+            registry.load_version(version)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("a feature list that does not match the manifest was accepted")
+
+
+def test_concurrent_publishes_get_distinct_versions():
+    with tempfile.TemporaryDirectory() as tmp:
+        ridge = _fit(Ridge())[0]
+        published = []
+        threads = [
+            threading.Thread(target=lambda: published.append(registry.publish(ridge, FEATURES, registry_dir=tmp)))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(v.version for v in published) == ["v0001", "v0002", "v0003", "v0004"]
+        assert registry.versions(tmp) == ["v0001", "v0002", "v0003", "v0004"]
+        assert [p.name for p in Path(tmp).iterdir() if p.name.startswith(".staging")] == []
+
+
+def test_ranker_follows_the_current_version():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        pipe = joblib.load(REPO_ROOT / "models" / "location_model.joblib")
+    features = joblib.load(REPO_ROOT / "models" / "model_features.joblib")
+    flipped = copy.deepcopy(pipe)
+    flipped.steps[-1][1].coef_ = -flipped.steps[-1][1].coef_
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old = registry.publish(pipe, features, registry_dir=tmp)
+        before = Ranker.load(use_tensor=False, registry_dir=tmp)
+        assert before.version == old.version and old.base_scores_path.exists()
+
+        new = registry.publish(flipped, features, registry_dir=tmp)
+        after = Ranker.load(use_tensor=False, registry_dir=tmp)
+        assert after.version == new.version and new.base_scores_path.exists()
+        assert not np.allclose(before.base, after.base)
+
+        # a session still holding the old version keeps ranking with it
+        evict_base_scores()
+        profile = Profile("Technology", "<3 months")
+        top_old = before.rank(profile, "Leeds", rng=np.random.default_rng(0))
+        top_new = after.rank(profile, "Leeds", rng=np.random.default_rng(0))
+        assert len(top_old) and len(top_new)
+        assert list(top_old["lad_code"]) != list(top_new["lad_code"])
+
+
+def test_api_swaps_to_the_current_version():
+    from regionmatch import api
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        pipe = joblib.load(REPO_ROOT / "models" / "location_model.joblib")
+    features = joblib.load(REPO_ROOT / "models" / "model_features.joblib")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old = registry.publish(pipe, features, registry_dir=tmp)
+        api._state["ranker"] = Ranker.load(use_tensor=False, registry_dir=tmp)
+        try:
+            first = api.current_ranker(tmp)
+            assert first.version == old.version and api.current_ranker(tmp) is first
+
+            new = registry.publish(pipe, features, registry_dir=tmp)
+            swapped = [None] * 4
+            threads = [threading.Thread(target=lambda i=i: swapped.__setitem__(i, api.current_ranker(tmp)))
+                       for i in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert all(r is swapped[0] for r in swapped)  # loaded once, shared by every request
+            assert swapped[0].version == new.version and api._state["ranker"] is swapped[0]
+
+            registry.set_current(old.version, tmp)  # rollback
+            assert api.current_ranker(tmp).version == old.version
+        finally:
+            api._state.clear()
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} model registry checks passed")
@@ -0,0 +1,94 @@
+"""
+Checks for the parallel model-selection engine (regionmatch/model_selection.py).
+
+Run directly (python scripts/diagnose/test_model_selection.py) or with pytest.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import cross_val_score, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.model_selection import HOLDOUT, Candidate, SplitCache, select_models, shared_folds
+
+
+def _data(n=120, p=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, p))
+    y = X @ rng.normal(size=p) + 0.1 * rng.normal(size=n)
+    X[rng.random((n, p)) < 0.1] = np.nan
+    return pd.DataFrame(X, columns=[f"f{i}" for i in range(p)]), pd.Series(y)
+
+
+def _candidates():
+    return [
+        Candidate("ridge", Ridge(alpha=1.0)),
+        Candidate("forest", RandomForestRegressor(n_estimators=20, max_depth=4, random_state=0, n_jobs=-1), scale=False),
+    ]
+
+
+def _quiet(msg):
+    pass
+
+
+def test_matches_pipeline_fit_and_cross_val_score():
+    X, y = _data()
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    table, pipelines = select_models(
+        _candidates(), X, y, X_train.index.to_numpy(), X_test.index.to_numpy(), n_jobs=1, log=_quiet
+    )
+    table = table.set_index("model")
+    for cand in _candidates():
+        steps = [("imputer", SimpleImputer(strategy="median"))]
+        if cand.scale:
+            steps.append(("scaler", StandardScaler()))
+        ref = Pipeline(steps + [("model", cand.estimator)])
+        cv = cross_val_score(ref, X, y, cv=5, scoring="r2")
+        assert np.isclose(table.loc[cand.name, "cv_mean"], cv.mean(), rtol=0, atol=1e-12)
+        ref.fit(X_train, y_train)
+        assert np.allclose(pipelines[cand.name].predict(X_test), ref.predict(X_test), rtol=0, atol=1e-10)
+    # the saved forest keeps its own n_jobs and the imputer knows the feature names
+    assert pipelines["forest"].named_steps["model"].n_jobs == -1
+    assert list(pipelines["ridge"].named_steps["imputer"].feature_names_in_) == list(X.columns)
+
+
+def test_preprocessing_is_fitted_once_per_fold():
+    X, y = _data()
+    splits = dict(enumerate(shared_folds(len(X), 5)))
+    splits[HOLDOUT] = (np.arange(90), np.arange(90, len(X)))
+    cache = SplitCache(X, y, splits)
+    for split in splits:
+        for scale in (True, False, True):
+            cache.get(split, scale)
+    assert cache.fits == 2 * len(splits)  # one imputer + one scaler per split
+    assert cache.get(0, True).imputer is cache.get(0, False).imputer
+
+
+def test_results_table_and_parallel_pool_agree():
+    X, y = _data(seed=1)
+    train_idx, test_idx = np.arange(96), np.arange(96, len(X))
+    serial, _ = select_models(_candidates(), X, y, train_idx, test_idx, n_jobs=1, log=_quiet)
+    pooled, _ = select_models(_candidates(), X, y, train_idx, test_idx, n_jobs=2, log=_quiet)
+    metrics = ["cv_mean", "cv_std", "test_r2", "test_rmse", "test_mae"]
+    pd.testing.assert_frame_equal(serial[["model"] + metrics], pooled[["model"] + metrics])
+    for col in ["fit_seconds", "cv_fit_seconds", "predict_us_per_row", "predict_ms_single"]:
+        assert (pooled[col] > 0).all(), col
+    assert pooled["test_r2"].is_monotonic_decreasing
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} model selection checks passed")
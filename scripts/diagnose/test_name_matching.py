@@ -0,0 +1,96 @@
+"""
+Checks for the shared LAD/council/city name normaliser and alias table.
+
+Run directly (python scripts/diagnose/test_name_matching.py) or with pytest.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.names import (
+    ALIAS_TABLE_PATH,
+    attach_lad_codes,
+    best_per_lad,
+    build_alias_table,
+    load_alias_table,
+    normalise_names,
+)
+
+LADS = REPO_ROOT / "Data-sources" / "lad_one_row.csv"
+
+
+def _lads():
+    return pd.read_csv(LADS, usecols=["lad_code", "lad_name"])
+
+
+def test_normaliser_variants_share_a_key():
+    groups = [
+        ["Bristol, City of", "Bristol,City of", "bristol city council", "  BRISTOL  "],
+        ["Stockton-on-Tees", "Stockton on Tees Borough Council", "stockton-on-tees"],
+        ["Wigan Metropolitan Borough Council", "Wigan Council", "Wigan"],
+        ["Brighton & Hove", "Brighton and Hove City Council"],
+        ["St. Helens", "St Helens Council"],
+        ["Armagh City,Banbridge and Craigavon", "Armagh City, Banbridge and Craigavon"],
+    ]
+    for names in groups:
+        keys = set(normalise_names(names))
+        assert len(keys) == 1, (names, keys)
+    assert list(normalise_names([None, float("nan")])) == ["", ""]
+
+
+def test_persisted_alias_table_is_current():
+    built = build_alias_table(_lads())
+    saved = load_alias_table()
+    pd.testing.assert_frame_equal(saved, built, check_dtype=False)
+    # every LAD is reachable by its own name
+    assert set(saved.loc[saved["kind"] == "name", "lad_code"]) == set(_lads()["lad_code"])
+    assert ALIAS_TABLE_PATH.exists()
+
+
+def test_sources_match_fully():
+    aliases = load_alias_table()
+    sent = pd.read_csv(REPO_ROOT / "Data-sources" / "city_sentiment_fixed.csv")
+    out = attach_lad_codes(sent, "City", aliases, source="City sentiment")
+    assert out["lad_code"].notna().all()
+
+    councils = pd.DataFrame(json.load(open(REPO_ROOT / "data" / "raw" / "ibex_council_ids.json", encoding="utf-8")))
+    out = attach_lad_codes(councils, "council_name", aliases, source="Ibex councils")
+    assert out["lad_code"].notna().all()
+
+
+def test_shared_services_fan_out_and_exact_names_win():
+    aliases = load_alias_table()
+    councils = pd.DataFrame({
+        "council_name": ["Adur and Worthing", "Worthing Borough Council", "Harrogate", "Nowhere"],
+        "apps_total": [10, 20, 30, 40],
+    })
+    out = attach_lad_codes(councils, "council_name", aliases)
+    assert len(out) == 5
+    best = best_per_lad(out).set_index("lad_code")["apps_total"].to_dict()
+    # Worthing has its own row, Adur only the shared one; Harrogate -> North Yorkshire
+    assert best == {"E07000223": 10, "E07000229": 20, "E06000065": 30}
+
+
+def test_vectorised_normaliser_scales():
+    import time
+
+    names = pd.Series(_lads()["lad_name"].tolist() * 300)
+    t0 = time.perf_counter()
+    keys = normalise_names(names)
+    elapsed = time.perf_counter() - t0
+    print(f"  normalised {len(names):,} names in {elapsed * 1000:.0f} ms")
+    assert keys.nunique() == _lads()["lad_name"].nunique()
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} name matching checks passed")
@@ -0,0 +1,128 @@
+"""
+Checks for the postcode -> LAD lookup and per-LAD incorporation features.
+
+Uses a synthetic ONS-style postcode directory, so no download is needed. Run
+directly (python scripts/diagnose/test_postcode_lad.py) or with pytest.
+"""
+
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.postcodes import PostcodeLookup, incorporation_features, normalise_postcodes
+
+
+def _directory(n_sectors=20_000, seed=0):
+    """ONSPD-like frame: each sector's units mostly in one LAD, a few in a neighbour."""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list(string.ascii_uppercase))
+    areas = ["AB", "B", "CF", "EH", "M", "SW", "LS", "NE"]
+    outward = [f"{a}{d}" for a in areas for d in range(1, 100)]
+    rows = []
+    for i in range(n_sectors):
+        sector = f"{outward[i % len(outward)]} {i // len(outward) % 10}"
+        lad = f"E{6000000 + (i * 7919) % 300:08d}"
+        for _ in range(rng.integers(5, 25)):
+            unit = "".join(rng.choice(letters, 2))
+            rows.append((f"{sector}{unit}", lad if rng.random() > 0.1 else f"E{6000000 + 301:08d}"))
+    df = pd.DataFrame(rows, columns=["pcds", "oslaua"]).drop_duplicates("pcds")
+    df["doterm"] = ""
+    return df
+
+
+def test_lookup_matches_dict_and_normalises_formatting():
+    d = _directory(2_000)
+    lookup = PostcodeLookup.from_frame(d["pcds"], d["oslaua"])
+    truth = dict(zip(d["pcds"].str.replace(" ", ""), d["oslaua"]))
+
+    messy = [p.lower() if i % 3 == 0 else p.replace(" ", "") if i % 3 == 1 else f"  {p} "
+             for i, p in enumerate(d["pcds"].head(500))]
+    codes = lookup.lad_codes_for(messy + ["", None, "NOT A PC"], sector_fallback=False)
+    assert list(codes[:500]) == [truth[p.replace(" ", "")] for p in d["pcds"].head(500)]
+    assert list(codes[500:]) == [None, None, None]
+
+
+def test_unknown_units_fall_back_to_sector_majority():
+    d = pd.DataFrame({
+        "pcds": ["AB1 2CD", "AB1 2CE", "AB1 2CF", "AB1 3AA", "ZZ9 9ZZ"],
+        "oslaua": ["S12000033", "S12000033", "S12000034", "S12000034", "E09000001"],
+    })
+    lookup = PostcodeLookup.from_frame(d["pcds"], d["oslaua"])
+    idx, how = lookup.lookup(["AB1 2XX", "AB1 2CF", "AB1 9XX", "QQ1 1QQ"])
+    assert list(lookup.lad_codes[idx[:2]]) == ["S12000033", "S12000034"]
+    assert list(how) == [2, 1, 0, 0]
+    assert list(idx[2:]) == [-1, -1]
+
+
+def test_directory_file_and_npz_cache_round_trip():
+    tmp = Path(tempfile.mkdtemp())
+    d = _directory(500)
+    d.to_csv(tmp / "ONSPD.csv", index=False)
+    built = PostcodeLookup.load(tmp / "ONSPD.csv", tmp / "postcode_lad.npz")
+    assert (tmp / "postcode_lad.npz").exists()
+    cached = PostcodeLookup.load(tmp / "ONSPD.csv", tmp / "postcode_lad.npz")
+    sample = d["pcds"].sample(300, random_state=1).to_numpy()
+    assert list(cached.lad_codes_for(sample)) == list(built.lad_codes_for(sample))
+    assert len(cached) == len(d)
+
+
+def test_features_match_groupby():
+    rng = np.random.default_rng(3)
+    lad_codes = np.array([f"E0{i:07d}" for i in range(40)], dtype=object)
+    n = 20_000
+    idx = rng.integers(-1, 40, n)
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 900, n), unit="D")
+    dates = dates.strftime("%Y-%m-%d").to_numpy(dtype=object)
+    dates[::97] = None
+
+    feats = incorporation_features(idx, dates, lad_codes, as_of="2025-06-01").set_index("lad_code")
+
+    df = pd.DataFrame({"lad": idx, "date": pd.to_datetime(dates)})
+    df = df[df["lad"] >= 0]
+    age = (pd.Timestamp("2025-06-01") - df["date"]).dt.days
+    recent = df[(age >= 0) & (age < 365)].groupby("lad").size()
+    prev = df[(age >= 365) & (age < 730)].groupby("lad").size()
+    for i, code in enumerate(lad_codes):
+        r, p = recent.get(i, 0), prev.get(i, 0)
+        row = feats.loc[code]
+        assert row["incorporations_total"] == (df["lad"] == i).sum()
+        assert (row["incorporations_12m"], row["incorporations_prev_12m"]) == (r, p)
+        assert np.isclose(row["incorporation_growth"], (r - p) / p) if p else np.isnan(row["incorporation_growth"])
+
+
+def test_million_postcodes_in_seconds():
+    d = _directory(60_000)
+    lookup = PostcodeLookup.from_frame(d["pcds"], d["oslaua"])
+    rng = np.random.default_rng(5)
+    pcs = d["pcds"].to_numpy()[rng.integers(0, len(d), 1_000_000)]
+    dates = np.where(rng.random(1_000_000) < 0.5, "2024-03-01", "2025-02-01").astype(object)
+
+    t0 = time.perf_counter()
+    idx, how = lookup.lookup(pcs)
+    feats = incorporation_features(idx, dates, lookup.lad_codes)
+    elapsed = time.perf_counter() - t0
+    print(f"  1M postcodes -> {len(feats)} LADs in {elapsed:.2f} s")
+    assert (how == 1).all()
+    assert feats["incorporations_total"].sum() == 1_000_000
+    assert elapsed < 10
+
+
+def test_normalise_rejects_non_postcodes():
+    out = normalise_postcodes(["ec1a 1bb", "EC1A-1BB", "1", "ABCDEFGHIJ", float("nan")])
+    assert list(out) == [b"EC1A1BB", b"EC1A1BB", b"", b"", b""]
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} postcode -> LAD checks passed")
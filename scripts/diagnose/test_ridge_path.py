@@ -0,0 +1,107 @@
+"""
+Checks for the closed-form Ridge alpha path (regionmatch/ridge_path.py).
+
+Run directly (python scripts/diagnose/test_ridge_path.py) or with pytest.
+"""
+
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.ridge_path import ALPHAS, RidgePath, fit_ridge_path
+
+
+def _data(n=60, p=8, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, p))
+    X[:, -1] = X[:, 0] + X[:, 1]  # rank-deficient, as one-hot / derived columns make it
+    y = X[:, :3] @ rng.normal(size=3) + 0.5 * rng.normal(size=n)
+    X[rng.random((n, p)) < 0.1] = np.nan
+    return pd.DataFrame(X, columns=[f"f{i}" for i in range(p)]), pd.Series(y)
+
+
+def _scaled(X):
+    return StandardScaler().fit_transform(SimpleImputer(strategy="median").fit_transform(X))
+
+
+def test_path_coefficients_match_sklearn_ridge():
+    X, y = _data()
+    Z = _scaled(X)
+    path = RidgePath(Z, y)
+    alphas = [1e-3, 0.1, 1.0, 30.0, 1e3]
+    for alpha, coef in zip(alphas, path.coef(alphas)):
+        ref = Ridge(alpha=alpha, solver="svd").fit(Z, y)
+        assert np.allclose(coef, ref.coef_, rtol=1e-8, atol=1e-10), alpha
+
+
+def test_loo_and_gcv_match_brute_force():
+    X, y = _data(n=40)
+    Z, y = _scaled(X), y.to_numpy()
+    alphas = [0.01, 1.0, 100.0]
+    table = RidgePath(Z, y).errors(alphas)
+    for i, alpha in enumerate(alphas):
+        loo = []
+        for k in range(len(y)):
+            keep = np.arange(len(y)) != k
+            model = Ridge(alpha=alpha, solver="svd").fit(Z[keep], y[keep])
+            loo.append((y[k] - model.predict(Z[k:k + 1])[0]) ** 2)
+        assert np.isclose(table.loc[i, "loo_mse"], np.mean(loo), rtol=1e-8)
+
+        full = Ridge(alpha=alpha, solver="svd").fit(Z, y)
+        resid = y - full.predict(Z)
+        # tr(H) by definition: derivative of fitted values w.r.t. y
+        Zc = Z - Z.mean(axis=0)
+        dof = 1 + np.trace(Zc @ np.linalg.solve(Zc.T @ Zc + alpha * np.eye(Zc.shape[1]), Zc.T))
+        assert np.isclose(table.loc[i, "dof"], dof, rtol=1e-8)
+        assert np.isclose(table.loc[i, "gcv_mse"], np.mean(resid ** 2) / (1 - dof / len(y)) ** 2, rtol=1e-8)
+
+
+def test_exported_pipeline_is_the_app_format():
+    X, y = _data()
+    pipeline, alpha, table = fit_ridge_path(X, y, np.logspace(-3, 3, 25), log=lambda msg: None)
+    assert [name for name, _ in pipeline.steps] == ["imputer", "scaler", "model"]
+    assert alpha == table.loc[table["loo_mse"].idxmin(), "alpha"]
+
+    ref = Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler()),
+        ("model", Ridge(alpha=alpha, random_state=42)),
+    ]).fit(X, y)
+    assert np.allclose(pipeline.predict(X), ref.predict(X), rtol=0, atol=1e-9)
+    assert list(pipeline.named_steps["imputer"].feature_names_in_) == list(X.columns)
+
+    gcv, gcv_alpha, _ = fit_ridge_path(X, y, np.logspace(-3, 3, 25), criterion="gcv", log=lambda msg: None)
+    assert gcv.named_steps["model"].alpha == gcv_alpha
+
+
+def test_grid_edge_on_the_shipped_table_is_near_ols():
+    features = joblib.load(REPO_ROOT / "models" / "model_features.joblib")
+    df = pd.read_csv(REPO_ROOT / "data" / "processed" / "training_data_geo.csv")
+    df = df[df["target_score"].notna()]
+    X, y = df[features], df["target_score"]
+    lines = []
+    pipeline, alpha, table = fit_ridge_path(X, y, log=lines.append)  # must not raise on the ill-conditioned end
+    assert alpha == ALPHAS[0] and "effectively OLS" in lines[-1]
+    assert table["loo_mse"].iloc[:21].max() - table["loo_mse"].iloc[0] < 1e-4  # flat below 1e-3
+
+    Z = _scaled(X)
+    ols = LinearRegression().fit(Z, y)
+    assert np.allclose(pipeline.predict(X), ols.predict(Z), rtol=0, atol=1e-3)
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} ridge path checks passed")
@@ -0,0 +1,88 @@
+"""
+Checks for the headless ranking API in regionmatch.scoring.
+
+Run directly (python scripts/diagnose/test_scoring.py) or with pytest.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.constants import INDUSTRIES, TOP_N, UK_CITIES, URGENCY
+from regionmatch.scoring import Profile, Ranker, default_ranker, rank
+
+_live = None
+
+
+def _live_ranker():
+    global _live
+    if _live is None:
+        ranker = default_ranker()
+        _live = Ranker(ranker.df, ranker.base)
+    return _live
+
+
+def test_rank_returns_capped_top_n():
+    top = rank(Profile("Technology", "<3 months"), "Leeds")
+    assert list(top.columns) == ["lad_code", "lad_name", "score"]
+    assert len(top) == TOP_N
+    assert 99.0 <= top["score"].max() <= 99.5
+    assert top["score"].is_monotonic_decreasing
+
+
+def test_seeded_rng_is_reproducible():
+    profile = Profile("Creative", "6+ months")
+    a = rank(profile, "Bristol", rng=np.random.default_rng(3))
+    b = rank(profile, "Bristol", rng=np.random.default_rng(3))
+    assert a.equals(b)
+
+
+def test_employees_does_not_move_the_ranking():
+    a = _live_ranker().top(Profile("Innovation", "3-6 months", employees=5), "Manchester")
+    b = _live_ranker().top(Profile("Innovation", "3-6 months", employees=5000), "Manchester")
+    assert a.equals(b)
+
+
+def test_tensor_matches_live_pipeline():
+    ranker = default_ranker()
+    if ranker.tensor is None:
+        print("  (score tensor missing or stale; skipped)")
+        return
+    live = _live_ranker()
+    for city, _, _ in UK_CITIES:
+        for industry in INDUSTRIES:
+            for urgency in URGENCY:
+                profile = Profile(industry, urgency)
+                a = ranker.top(profile, city)
+                b = live.top(profile, city)
+                assert list(a["lad_code"]) == list(b["lad_code"]), (city, industry, urgency)
+                assert np.allclose(a["score"], b["score"], atol=1e-3)
+
+
+def test_explicit_coordinates_and_unknown_city():
+    leeds = _live_ranker().top(Profile("Technology", "<3 months"), (53.8008, -1.5491))
+    assert list(leeds["lad_code"]) == list(_live_ranker().top(Profile("Technology", "<3 months"), "Leeds")["lad_code"])
+    try:
+        rank(Profile("Technology", "<3 months"), "Atlantis")
+        raise AssertionError("expected ValueError for an unknown city")
+    except ValueError:
+        pass
+
+
+def test_import_does_not_pull_in_streamlit():
+    code = "import sys; import regionmatch.scoring; print('streamlit' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} scoring checks passed")
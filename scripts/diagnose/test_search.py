@@ -0,0 +1,101 @@
+"""
+Checks for the successive-halving hyperparameter search (regionmatch/search.py).
+
+Run directly (python scripts/diagnose/test_search.py) or with pytest.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.search import TrialStore, rung_schedule, sample_configs, successive_halving, trial_key
+
+SPACE = {
+    "Ridge": (Ridge, {"alpha": ("log", 1e-3, 1e3)}, {}, True),
+    "RandomForest": (RandomForestRegressor, {"n_estimators": [5, 10], "max_depth": [2, 4]}, {"random_state": 0}, False),
+}
+
+
+def _data(n=150, p=5, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, p))
+    y = X @ rng.normal(size=p) + 0.1 * rng.normal(size=n)
+    return pd.DataFrame(X, columns=[f"f{i}" for i in range(p)]), pd.Series(y)
+
+
+def _search(store=None, n_jobs=1, seed=7):
+    X, y = _data()
+    return successive_halving(X, y, n_configs=9, eta=3, min_resource=12, space=SPACE, seed=seed,
+                              n_jobs=n_jobs, store=store, log=lambda msg: None)
+
+
+def test_rung_schedule():
+    assert rung_schedule(27, 270, 30, eta=3) == [(27, 30), (9, 90), (3, 270)]
+    # the row budget caps the number of rungs
+    assert rung_schedule(27, 100, 60, eta=3) == [(27, 100)]
+    assert rung_schedule(30, 288, 56, eta=3) == [(30, 96), (10, 288)]
+
+
+def test_only_promising_configs_get_the_full_budget():
+    result = _search()
+    rungs = result.trials.groupby("rung").agg(n=("params", "size"), rows=("resource", "first"))
+    assert rungs["n"].tolist() == [9, 3, 1]
+    assert rungs["rows"].tolist() == [13, 40, 120]
+    # survivors of each rung are that rung's best
+    first = result.trials[result.trials["rung"] == 0].sort_values("mean_r2", ascending=False)
+    second = result.trials[result.trials["rung"] == 1]
+    assert set(second["params"]) == set(first["params"].head(3))
+    assert len(result.best) == 1 and result.best[0][0] in SPACE
+    assert len({json.dumps(p, sort_keys=True) for _, p in sample_configs(9, SPACE, seed=7)}) == 9
+
+
+def test_interrupted_search_resumes_from_the_trial_log():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "trials.jsonl"
+        full = _search(TrialStore(path))
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == (9 + 3 + 1) * 5
+
+        # keep 20 finished trials plus half a line, as a kill mid-write would leave
+        path.write_text("\n".join(lines[:20]) + "\n" + lines[20][: len(lines[20]) // 2], encoding="utf-8")
+        store = TrialStore(path)
+        resumed = _search(store)
+        assert store.replayed == 20
+        assert resumed.best == full.best
+        pd.testing.assert_frame_equal(resumed.trials, full.trials)
+
+        again = TrialStore(path)
+        _search(again)
+        assert again.replayed == len(lines)
+
+
+def test_trial_key_covers_seed_and_fixed_params():
+    base = ("data", "RandomForest", {"max_depth": 2}, 30, 0, 5)
+    key = trial_key(*base, 7, {"random_state": 0})
+    assert trial_key(*base, 7, {"random_state": 0}) == key
+    assert trial_key(*base, 8, {"random_state": 0}) != key
+    assert trial_key(*base, 7, {"random_state": 1}) != key
+
+
+def test_parallel_pool_matches_serial():
+    serial = _search(n_jobs=1)
+    pooled = _search(n_jobs=2)
+    assert pooled.best == serial.best
+    pd.testing.assert_frame_equal(pooled.trials, serial.trials)
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} search checks passed")
@@ -0,0 +1,95 @@
+"""
+Checks for the single-pass feature + target build (regionmatch/features.py).
+
+Run directly (python scripts/diagnose/test_training_features.py) or with pytest.
+"""
+
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.features import RESET_ID_COLUMNS, build_training_features, minmax_columns, target_score
+
+TRAINING_V1 = REPO_ROOT / "training_data_v1.csv"
+PROCESSED_CLEAN = REPO_ROOT / "data" / "processed" / "training_data_clean.csv"
+
+
+def _quiet(msg):
+    pass
+
+
+def test_matches_clean_then_make_target_byte_for_byte():
+    # data/processed/training_data_clean.csv was written by clean_dataset.py + make_target.py
+    out = build_training_features(pd.read_csv(TRAINING_V1), log=_quiet)
+    buf = io.StringIO()
+    out.to_csv(buf, index=False)
+    assert buf.getvalue() == PROCESSED_CLEAN.read_text(encoding="utf-8")
+
+
+def test_coerces_fills_and_keeps_dtypes():
+    df = pd.DataFrame({
+        "lad_code": ["A", "B", "C", "D"],
+        "council_id": [1, None, 3, 4],
+        "earnings_median": [1, 1, 1, 1],
+        "apps_total": [10, 20, 30, 40],
+        "approval_rate": ["0.5", "n/a", "0.9", "0.7"],
+        "median_decision_days": [50.0, np.nan, 70.0, 90.0],
+    })
+    out = build_training_features(df, log=_quiet)
+    assert list(out.columns) == ["lad_code", "council_id", "apps_total", "approval_rate",
+                                 "median_decision_days", "target_score"]
+    assert out["apps_total"].dtype == np.int64
+    assert out["approval_rate"].tolist() == [0.5, 0.7, 0.9, 0.7]
+    assert out["median_decision_days"].tolist() == [50.0, 70.0, 70.0, 90.0]
+    assert out["council_id"].isna().sum() == 1  # identifiers pass through untouched
+    # approval 0.30 and speed 0.25 renormalised to the two components present
+    w_a, w_s = 0.30 / 0.55, 0.25 / 0.55
+    expected = 100 * (w_a * np.array([0, 0.5, 1, 0.5]) + w_s * (1 - np.array([0, 0.5, 0.5, 1])))
+    assert np.allclose(out["target_score"], expected.round(4))
+
+
+def test_reset_variant_drops_sparse_and_constant_columns():
+    df = pd.DataFrame({
+        "lad_code": list("ABCD"),
+        "lad_lat": [51.0, 52.0, np.nan, 53.0],
+        "sparse_extra": [1.0, np.nan, np.nan, np.nan],
+        "approval_rate": [0.5, np.nan, np.nan, np.nan],  # protected
+        "constant": [7, 7, 7, 7],
+        "scaling_index": [1.0, 2.0, 3.0, 4.0],
+    })
+    out = build_training_features(df, id_columns=RESET_ID_COLUMNS, max_missing=0.45, drop_constant=True, log=_quiet)
+    # approval_rate survives the sparse filter, then is constant after the median fill
+    assert list(out.columns) == ["lad_code", "lad_lat", "scaling_index", "target_score"]
+    assert out["lad_lat"].isna().sum() == 1
+    assert out["target_score"].tolist() == [0.0, 33.3333, 66.6667, 100.0]
+
+
+def test_minmax_and_target_helpers():
+    block = np.array([[1.0, 5.0, np.nan], [3.0, 5.0, np.nan], [2.0, 5.0, np.nan]])
+    assert minmax_columns(block).tolist() == [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.5, 0.0, 0.0]]
+
+    num = pd.DataFrame({"business_density": [1.0, 2.0, 3.0], "tech_density": [3.0, 1.0, 2.0]})
+    score, present = target_score(num)
+    assert present == ["ecosystem"]
+    assert score.tolist() == [100.0, 50.0, 100.0]  # max of the normalised signals
+
+    try:
+        target_score(pd.DataFrame({"other": [1.0, 2.0]}))
+    except SystemExit:
+        pass
+    else:
+        raise AssertionError("expected SystemExit without any component column")
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print("✓", name)
+    print(f"\nAll {len(tests)} training feature checks passed")
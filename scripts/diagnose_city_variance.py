@@ -1,10 +1,14 @@
+import sys
 import joblib
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from math import isfinite
 
-repo=Path(r'c:\Users\ayush\RegionMatch')
+repo=Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo))
+from regionmatch.spatial import CentroidIndex
+
 feat=joblib.load(repo / 'models' / 'model_features.joblib')
 path=None
 candidates=[repo / 'data' / 'processed' / 'training_data_geo.csv', repo / 'training_data_geo.csv', repo / 'data' / 'processed' / 'training_data_clean.csv', repo / 'training_data_v1.csv']
@@ -22,20 +26,8 @@ for c in X.columns:
 X=X.fillna(X.median(numeric_only=True)).fillna(0)
 base=pipe.predict(X)
 
-# helper haversine
 import numpy as _np
 
-def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    lat1 = _np.radians(_np.asarray(lat1, dtype=float))
-    lon1 = _np.radians(_np.asarray(lon1, dtype=float))
-    lat2 = _np.radians(float(lat2))
-    lon2 = _np.radians(float(lon2))
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = _np.sin(dlat/2)**2 + _np.cos(lat1)*_np.cos(lat2)*_np.sin(dlon/2)**2
-    return 2 * R * _np.arcsin(_np.sqrt(a))
-
 # cities list (subset used by app)
 UK_CITIES = [
     ("London", -0.1276, 51.5072),
@@ -46,17 +38,17 @@ UK_CITIES = [
 ]
 
 print('City, n_candidates_within_50km, base_std_within, base_min, base_max, industry_boost_std (core_tech)')
+index = CentroidIndex.from_frame(DF) if {'lad_lat', 'lad_lng'}.issubset(DF.columns) else None
 for (city, lng, lat) in UK_CITIES:
     if 'lad_lat' not in DF.columns or 'lad_lng' not in DF.columns:
         print(city, 'NO CENTROIDS')
         continue
-    dist = haversine_km(DF['lad_lat'].fillna(lat).values, DF['lad_lng'].fillna(lng).values, lat, lng)
-    mask = dist <= 50.0
-    if mask.sum() == 0:
+    rows, _ = index.within(lat, lng, 50.0)
+    if len(rows) == 0:
         print(city, 0)
         continue
-    base_sub = base[mask]
-    core_tech = pd.to_numeric(DF.loc[mask, 'core_tech_density'], errors='coerce').fillna(0).values
-    print(city, int(mask.sum()), round(float(base_sub.std()),6), round(float(base_sub.min()),6), round(float(base_sub.max()),6), round(float(_np.std(core_tech)),6))
+    base_sub = base[rows]
+    core_tech = pd.to_numeric(DF['core_tech_density'].iloc[rows], errors='coerce').fillna(0).values
+    print(city, len(rows), round(float(base_sub.std()),6), round(float(base_sub.min()),6), round(float(base_sub.max()),6), round(float(_np.std(core_tech)),6))
 
 print('\nSummary global base std:', float(base.std()))
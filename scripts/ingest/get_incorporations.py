@@ -1,85 +1,331 @@
+"""
+Download Companies House incorporations for INC_FROM..INC_TO into a Parquet
+dataset (one file per date sub-range).
+
+The window is split into SPLIT_DAYS sub-ranges that are paged through in
+parallel (pages within a range stay sequential). A range whose hit count is
+above MAX_RANGE_HITS is split in half again, so no range needs deep
+start_index paging. Every request goes through one AdaptiveTokenBucket: a
+429 halves the request rate and pauses all workers for Retry-After (or a
+backoff when there is none), and successes win the rate back gradually.
+
+Each range is streamed page by page into a temporary Parquet file. The file is
+renamed to part-<from>_<to>.parquet only once the range is complete, so
+finished parts are what a crash leaves behind and the next run skips them.
+A range with finished parts strictly inside it was split, so the next run
+only fetches the halves (recursively) that have no part yet.
+The dataset records its window in _window.json; a different INC_FROM /
+INC_TO / SPLIT_DAYS clears it and starts over. Read it back with
+pd.read_parquet("incorporations.parquet").
+
+Usage:
+    CH_API_KEY=... python scripts/ingest/get_incorporations.py [--workers 4] [--rate 2] [--restart]
+"""
+
+import argparse
+import json
 import os
+import threading
 import time
-import csv
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
 import requests
-from datetime import date
+from requests.adapters import HTTPAdapter
+
+from rate_limit import AdaptiveTokenBucket
 
-API_KEY = os.environ["CH_API_KEY"]
 BASE = "https://api.company-information.service.gov.uk/advanced-search/companies"
 
 # CHANGE THESE IF YOU WANT A DIFFERENT WINDOW
 INC_FROM = "2025-01-01"
 INC_TO   = "2025-12-31"
 
-OUT_FILE = "incorporations.csv"
-
-
-def fetch_all():
-    start_index = 0
-    size = 5000   # max allowed
-    total_hits = None
-    written = 0
-
-    with open(OUT_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "company_number",
-                "company_name",
-                "date_of_creation",
-                "postal_code"
-            ]
-        )
-        writer.writeheader()
-
-        while True:
-            params = {
-                "incorporated_from": INC_FROM,
-                "incorporated_to": INC_TO,
-                "size": size,
-                "start_index": start_index,
-            }
-
-            r = requests.get(BASE, params=params, auth=(API_KEY, ""), timeout=60)
-
-            if r.status_code == 429:
-                print("Rate limited… sleeping")
-                time.sleep(2)
+OUT_DIR = "incorporations.parquet"
+
+PAGE_SIZE = 5000          # max allowed
+SPLIT_DAYS = 7
+MAX_RANGE_HITS = 10_000   # ranges with more hits are split in half
+
+# ====== CONCURRENCY ======
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 2.0   # starting (and maximum) rate; 429s lower it
+MAX_RETRIES = 8
+# =========================
+
+SCHEMA = pa.schema([
+    ("company_number", pa.string()),
+    ("company_name", pa.string()),
+    ("date_of_creation", pa.string()),
+    ("postal_code", pa.string()),
+])
+
+
+def split_window(inc_from, inc_to, days=SPLIT_DAYS):
+    """Consecutive, non-overlapping (from, to) ISO date ranges of ``days`` days covering the window."""
+    start, end = date.fromisoformat(inc_from), date.fromisoformat(inc_to)
+    ranges = []
+    while start <= end:
+        stop = min(end, start + timedelta(days=days - 1))
+        ranges.append((start.isoformat(), stop.isoformat()))
+        start = stop + timedelta(days=1)
+    return ranges
+
+
+def bisect_range(rng):
+    start, end = date.fromisoformat(rng[0]), date.fromisoformat(rng[1])
+    if start >= end:
+        return None
+    mid = start + (end - start) // 2
+    return (rng[0], mid.isoformat()), ((mid + timedelta(days=1)).isoformat(), rng[1])
+
+
+def to_row(item):
+    addr = item.get("registered_office_address") or {}
+    return {
+        "company_number": item.get("company_number"),
+        "company_name": item.get("company_name"),
+        "date_of_creation": item.get("date_of_creation"),
+        "postal_code": addr.get("postal_code"),
+    }
+
+
+class RangeSplit(Exception):
+    """A sub-range has too many hits to page through; fetch its halves instead."""
+
+    def __init__(self, halves):
+        super().__init__(f"split into {halves}")
+        self.halves = halves
+
+
+class IncorporationsFetcher:
+    def __init__(
+        self,
+        api_key,
+        out_dir=OUT_DIR,
+        base=BASE,
+        workers=MAX_WORKERS,
+        rate=REQUESTS_PER_SECOND,
+        page_size=PAGE_SIZE,
+        max_range_hits=MAX_RANGE_HITS,
+        max_retries=MAX_RETRIES,
+        log=print,
+    ):
+        self.out_dir = out_dir
+        self.base = base
+        self.workers = workers
+        self.page_size = page_size
+        self.max_range_hits = max_range_hits
+        self.max_retries = max_retries
+        self.bucket = AdaptiveTokenBucket(rate)
+        self.log = log
+        self.session = requests.Session()
+        self.session.auth = (api_key, "")
+        self.session.mount(base, HTTPAdapter(pool_maxsize=workers))
+        self.requests_sent = 0
+        self._lock = threading.Lock()
+
+    # ---------- HTTP ----------
+
+    def get_page(self, rng, start_index):
+        params = {
+            "incorporated_from": rng[0],
+            "incorporated_to": rng[1],
+            "size": self.page_size,
+            "start_index": start_index,
+        }
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self._lock:
+                self.requests_sent += 1
+            try:
+                r = self.session.get(self.base, params=params, timeout=60)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(min(30.0, 0.5 * 2 ** attempt))
+                continue
+
+            if r.status_code == 429 or r.status_code >= 500:
+                if attempt == self.max_retries:
+                    r.raise_for_status()
+                try:
+                    retry_after = float(r.headers.get("Retry-After", ""))
+                except ValueError:
+                    retry_after = min(30.0, 0.5 * 2 ** attempt)
+                if r.status_code == 429:
+                    self.bucket.throttled(retry_after)
+                else:
+                    time.sleep(retry_after)
                 continue
+            if r.status_code in (401, 403):
+                raise SystemExit(f"Auth error {r.status_code}: check CH_API_KEY")
 
             r.raise_for_status()
-            data = r.json()
+            self.bucket.succeeded()
+            return r.json()
+
+    # ---------- dataset ----------
+
+    def part_path(self, rng):
+        return os.path.join(self.out_dir, f"part-{rng[0]}_{rng[1]}.parquet")
+
+    def finished_parts(self):
+        """``(from, to)`` of every finished part in the dataset directory."""
+        parts = set()
+        for name in os.listdir(self.out_dir):
+            if name.startswith("part-") and name.endswith(".parquet"):
+                start, _, end = name[len("part-"):-len(".parquet")].partition("_")
+                parts.add((start, end))
+        return parts
+
+    def remaining(self, rng, finished):
+        """
+        Sub-ranges of ``rng`` still to fetch given the ``finished`` parts: none
+        when its part exists, the remainders of its halves when an earlier run
+        split it (some finished part lies inside it), else ``rng`` itself.
+        """
+        if rng in finished:
+            return []
+        halves = bisect_range(rng)
+        if halves is None or not any(rng[0] <= a and b <= rng[1] for a, b in finished):
+            return [rng]
+        return [sub for half in halves for sub in self.remaining(half, finished)]
 
-            if total_hits is None:
-                total_hits = int(data.get("hits", 0))
-                print("Total incorporations:", total_hits)
+    def prepare(self, inc_from, inc_to, split_days=SPLIT_DAYS, restart=False):
+        """Create the dataset directory; clear it when the window or split changed (or on restart)."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        window_path = os.path.join(self.out_dir, "_window.json")
+        window = {"incorporated_from": inc_from, "incorporated_to": inc_to, "split_days": split_days}
+        try:
+            with open(window_path, "r", encoding="utf-8") as f:
+                same = json.load(f) == window
+        except (OSError, ValueError):
+            same = False
+        if restart or not same:
+            for name in os.listdir(self.out_dir):
+                if name.startswith("part-") or name.endswith(".tmp"):
+                    os.remove(os.path.join(self.out_dir, name))
+            with open(window_path, "w", encoding="utf-8") as f:
+                json.dump(window, f)
 
-            items = data.get("items", [])
-            if not items:
-                break
+    def fetch_range(self, rng):
+        """Stream one range into its part file; returns the rows written or raises RangeSplit."""
+        path = self.part_path(rng)
+        # dot-prefixed so readers of the dataset skip it while it is being written
+        tmp = os.path.join(self.out_dir, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        writer = None
+        written = 0
+        start_index = 0
+        try:
+            while True:
+                data = self.get_page(rng, start_index)
+                hits = int(data.get("hits", 0))
+                if start_index == 0 and hits > self.max_range_hits:
+                    halves = bisect_range(rng)
+                    if halves:
+                        raise RangeSplit(halves)
+                items = data.get("items", [])
+                if not items:
+                    break
+                table = pa.Table.from_pylist([to_row(it) for it in items], schema=SCHEMA)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, SCHEMA)
+                writer.write_table(table)
+                written += len(items)
+                start_index += len(items)
+                if start_index >= hits:
+                    break
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, SCHEMA)  # empty range: keep a part so it is not refetched
+            writer.close()
+            writer = None
+            os.replace(tmp, path)
+            return written
+        finally:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
 
-            for it in items:
-                addr = it.get("registered_office_address") or {}
+    def run(self, inc_from=INC_FROM, inc_to=INC_TO, split_days=SPLIT_DAYS, restart=False):
+        """
+        Fetch every range without a finished part. Returns ``(rows, failed)``
+        where ``failed`` lists ``(range, error)`` to retry on the next run.
+        """
+        self.prepare(inc_from, inc_to, split_days, restart)
+        ranges = split_window(inc_from, inc_to, split_days)
+        finished = self.finished_parts()
+        left = [self.remaining(rng, finished) for rng in ranges]
+        todo = [sub for subs in left for sub in subs]
+        n_done = sum(not subs for subs in left)
+        if finished:
+            self.log(f"Resuming: {n_done} of {len(ranges)} ranges already downloaded"
+                     + (f", {len(todo)} (sub-)range(s) left" if todo else ""))
 
-                writer.writerow({
-                    "company_number": it.get("company_number"),
-                    "company_name": it.get("company_name"),
-                    "date_of_creation": it.get("date_of_creation"),
-                    "postal_code": addr.get("postal_code"),
-                })
+        rows = 0
+        failed = []
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {pool.submit(self.fetch_range, rng): rng for rng in todo}
+            try:
+                while pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        rng = pending.pop(fut)
+                        try:
+                            n = fut.result()
+                        except RangeSplit as split:
+                            for half in split.halves:
+                                if not os.path.exists(self.part_path(half)):
+                                    pending[pool.submit(self.fetch_range, half)] = half
+                            continue
+                        except SystemExit:
+                            raise
+                        except Exception as e:
+                            failed.append((rng, e))
+                            self.log(f"  ✗ {rng[0]}..{rng[1]}: {e}")
+                            continue
+                        rows += n
+                        elapsed = max(time.perf_counter() - t0, 1e-9)
+                        self.log(
+                            f"{rng[0]}..{rng[1]}: {n} companies ({rows / elapsed:,.0f} rows/s, "
+                            f"rate {self.bucket.rate:.2f} req/s)"
+                        )
+            except BaseException:
+                for f in pending:
+                    f.cancel()
+                raise
+        return rows, failed
 
-                written += 1
 
-            start_index += len(items)
-            print(f"Downloaded {written}/{total_hits}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download Companies House incorporations to Parquet.")
+    parser.add_argument("--from", dest="inc_from", default=INC_FROM)
+    parser.add_argument("--to", dest="inc_to", default=INC_TO)
+    parser.add_argument("--out", default=OUT_DIR, help="Parquet dataset directory")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="Max requests/sec")
+    parser.add_argument("--split-days", type=int, default=SPLIT_DAYS)
+    parser.add_argument("--restart", action="store_true", help="Discard finished parts and download again")
+    args = parser.parse_args(argv)
 
-            if start_index >= total_hits:
-                break
+    api_key = os.environ.get("CH_API_KEY")
+    if not api_key:
+        raise SystemExit("CH_API_KEY not found: set it to your Companies House API key.")
 
-            time.sleep(0.25)
+    fetcher = IncorporationsFetcher(api_key, args.out, workers=args.workers, rate=args.rate)
+    rows, failed = fetcher.run(args.inc_from, args.inc_to, args.split_days, args.restart)
 
-    print("Done. Saved to", OUT_FILE)
+    print(f"Done. {rows} companies this run ({fetcher.requests_sent} requests, "
+          f"{fetcher.bucket.throttle_count} throttled). Saved to", args.out)
+    if failed:
+        print(f"{len(failed)} range(s) failed and will be retried on the next run:",
+              ", ".join(f"{a}..{b}" for (a, b), _ in failed))
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
-    fetch_all()
\ No newline at end of file
+    main()
@@ -1,12 +1,10 @@
-import os
 import csv
 import json
 import statistics
 from datetime import datetime
-import requests
 
-IBEX_HOST = "https://ibex.seractech.co.uk"
-JWT_PATH = "ibex_jwt.txt"
+from ibex_cache import PageCache
+from ibex_client import IBEX_HOST, IbexClient
 
 # --- Time window for features ---
 DATE_FROM = "2025-04-01"
@@ -29,41 +27,10 @@ def parse_date(x):
         return None
 
 
-def load_jwt():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    return open(os.path.join(base_dir, JWT_PATH), "r", encoding="utf-8").read().strip()
-
-
-def call_applications(council_id: int, page: int):
-    jwt = load_jwt()
-    headers = {"Authorization": f"Bearer {jwt}", "Content-Type": "application/json"}
-    payload = {
-        "input": {
-            "date_range_type": DATE_RANGE_TYPE,
-            "date_from": DATE_FROM,
-            "date_to": DATE_TO,
-            "council_id": [council_id],
-            "page": page,
-            "page_size": PAGE_SIZE
-        }
-    }
-    r = requests.post(f"{IBEX_HOST}/applications", headers=headers, json=payload, timeout=60)
-    if r.status_code in (401, 403):
-        raise SystemExit(f"Auth error {r.status_code}: {r.text}")
-    if r.status_code == 400:
-        raise SystemExit(f"Bad request 400: {r.text}")
-    r.raise_for_status()
-    return r.json()
-
-
-def extract_items(resp):
-    if isinstance(resp, list):
-        return resp
-    if isinstance(resp, dict):
-        for k in ("items", "results", "applications", "data"):
-            if k in resp and isinstance(resp[k], list):
-                return resp[k]
-    return []
+def call_applications(client: IbexClient, council_id: int, page: int):
+    return client.applications(
+        page, PAGE_SIZE, DATE_FROM, DATE_TO, council_id=council_id, date_range_type=DATE_RANGE_TYPE
+    )
 
 
 def compute_features(apps):
@@ -103,11 +70,10 @@ def compute_features(apps):
     }
 
 
-def fetch_all_for_council(council_id: int):
+def fetch_all_for_council(client: IbexClient, council_id: int):
     all_apps = []
     for page in range(1, MAX_PAGES + 1):
-        resp = call_applications(council_id, page)
-        items = extract_items(resp)
+        items = call_applications(client, council_id, page)
         if not items:
             break
         all_apps.extend(items)
@@ -132,13 +98,14 @@ def main():
         )
         writer.writeheader()
 
-        for cid in COUNCIL_IDS:
-            print("Fetching council:", cid)
-            apps = fetch_all_for_council(cid)
-            feats = compute_features(apps)
-            feats["council_id"] = cid
-            writer.writerow(feats)
-            print(" ->", feats)
+        with IbexClient(IBEX_HOST, cache=PageCache()) as client:
+            for cid in COUNCIL_IDS:
+                print("Fetching council:", cid)
+                apps = fetch_all_for_council(client, cid)
+                feats = compute_features(apps)
+                feats["council_id"] = cid
+                writer.writerow(feats)
+                print(" ->", feats)
 
     print("Saved:", out_csv)
 
@@ -1,12 +1,45 @@
-﻿import os
-import json
+"""
+Fetch IBEX planning applications for every council in ibex_council_ids.json
+and write per-council features to ibex_features_by_council.csv.
+
+Councils are fetched concurrently on a bounded thread pool (pages within a
+council stay sequential, since the last short page ends it). Each page is
+folded into a FeatureAggregator as it arrives and then dropped, so memory per
+council stays flat however many applications it has. All workers share
+one IbexClient (ibex_client.py): a keep-alive connection pool sized to the
+pool, a JWT read once and refreshed on 401, and one token bucket for the IBEX
+host, so the pool size never raises the request rate above
+REQUESTS_PER_SECOND. 429 / 5xx / connection errors are retried with backoff,
+honouring Retry-After.
+
+Each finished council is appended to a JSONL checkpoint next to the CSV
+(ibex_features_by_council.checkpoint.jsonl). A crash or restart resumes with
+the councils that are not in it yet; the checkpoint is tied to the date
+window, so changing DATE_FROM / DATE_TO / DATE_RANGE_TYPE starts over. The
+CSV is rebuilt from the checkpoint at the end of every run.
+
+Raw pages are cached under ibex_cache/ (ibex_cache.py), so a --restart after
+changing the feature logic re-reads them from disk and only fetches pages
+that are new or stale.
+
+Usage:
+    python scripts/ingest/ibex_batch_from_json.py [--workers 8] [--rate 5] [--restart] [--no-cache]
+"""
+
+import argparse
 import csv
-import statistics
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-import requests
 
-IBEX_HOST = "https://ibex.seractech.co.uk"
-JWT_PATH = "ibex_jwt.txt"
+from ibex_cache import CACHE_DIR, OPEN_WINDOW_MAX_AGE, PageCache
+from ibex_client import IBEX_HOST, IbexClient
+from rate_limit import HostRateLimiter
+
 COUNCILS_JSON = "ibex_council_ids.json"
 
 # ====== FEATURE WINDOW ======
@@ -18,8 +51,19 @@ DATE_RANGE_TYPE = "validated"
 PAGE_SIZE = 1000
 MAX_PAGES = 50
 
+# ====== CONCURRENCY ======
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 5.0   # per host, shared by all workers
+# =========================
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+FIELDNAMES = [
+    "council_id", "council_name",
+    "apps_total", "apps_decided", "approval_rate",
+    "median_decision_days", "commercial_apps"
+]
+
 def parse_date(x):
     if not x:
         return None
@@ -28,132 +72,279 @@ def parse_date(x):
     except Exception:
         return None
 
-def load_jwt():
-    return open(os.path.join(BASE_DIR, JWT_PATH), "r", encoding="utf-8").read().strip()
-
-def extract_items(resp):
-    if isinstance(resp, list):
-        return resp
-    if isinstance(resp, dict):
-        for k in ("items", "results", "applications", "data"):
-            if k in resp and isinstance(resp[k], list):
-                return resp[k]
-    return []
-
-def call_applications(council_id, page):
-    jwt = load_jwt()
-    headers = {
-        "Authorization": f"Bearer {jwt}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "input": {
-            "date_range_type": DATE_RANGE_TYPE,
-            "date_from": DATE_FROM,
-            "date_to": DATE_TO,
-            "council_id": [council_id],
-            "page": page,
-            "page_size": PAGE_SIZE
-        }
-    }
+def make_client(host=IBEX_HOST, workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND, **kwargs):
+    """One pooled client (keep-alive connections, JWT read once) shared by every worker."""
+    return IbexClient(host, limiter=HostRateLimiter(rate), pool_size=workers, **kwargs)
 
-    r = requests.post(f"{IBEX_HOST}/applications", headers=headers, json=payload, timeout=60)
+def iter_app_pages(client, council_id):
+    """Yield one page of applications at a time for ``council_id``."""
+    return client.iter_pages(
+        MAX_PAGES, PAGE_SIZE,
+        date_from=DATE_FROM, date_to=DATE_TO, council_id=council_id, date_range_type=DATE_RANGE_TYPE,
+    )
 
-    if r.status_code in (401, 403):
-        raise SystemExit(f"Auth error {r.status_code}: {r.text}")
-    if r.status_code == 400:
-        raise SystemExit(f"Bad request 400: {r.text}")
+COMMERCIAL_KEYWORDS = [
+    "restaurant", "cafe", "café", "takeaway",
+    "shop", "retail", "office", "warehouse", "commercial"
+]
 
-    r.raise_for_status()
-    return r.json()
+def compute_features(apps):
+    """Features of one council's applications (FeatureAggregator over a single page)."""
+    return FeatureAggregator().add(apps).result()
 
-def fetch_all_apps(council_id):
-    apps = []
-    for page in range(1, MAX_PAGES + 1):
-        resp = call_applications(council_id, page)
-        items = extract_items(resp)
-        if not items:
-            break
-        apps.extend(items)
-        if len(items) < PAGE_SIZE:
-            break
-    return apps
 
-def compute_features(apps):
-    approved = 0
-    refused = 0
-    decision_days = []
-    commercial = 0
+class FeatureAggregator:
+    """
+    Per-council features, built one page of applications at a time.
+
+    Only counters are kept, so memory does not grow with the council: decision
+    times are whole days, so a day -> count histogram gives the exact median
+    (same value as statistics.median over the full list) in a few hundred
+    entries at most.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.approved = 0
+        self.refused = 0
+        self.commercial = 0
+        self.decision_days = Counter()
 
-    keywords = [
-        "restaurant", "cafe", "café", "takeaway",
-        "shop", "retail", "office", "warehouse", "commercial"
-    ]
+    def add(self, apps):
+        for a in apps:
+            proposal = (a.get("proposal") or a.get("description") or "")
+            p = str(proposal).lower()
+            if any(k in p for k in COMMERCIAL_KEYWORDS):
+                self.commercial += 1
 
-    for a in apps:
-        proposal = (a.get("proposal") or a.get("description") or "")
-        p = str(proposal).lower()
-        if any(k in p for k in keywords):
-            commercial += 1
+            decision = (a.get("normalised_decision") or a.get("raw_decision") or a.get("decision") or a.get("status") or "")
+            d = str(decision).lower()
+            if "approved" in d or "granted" in d:
+                self.approved += 1
+            elif "refused" in d:
+                self.refused += 1
 
-        decision = (a.get("normalised_decision") or a.get("raw_decision") or a.get("decision") or a.get("status") or "")
-        d = str(decision).lower()
+            start_dt = parse_date(a.get("application_date"))
+            end_dt = parse_date(a.get("decided_date"))
+            if start_dt and end_dt and end_dt >= start_dt:
+                self.decision_days[(end_dt - start_dt).days] += 1
+        self.total += len(apps)
+        return self
 
-        if "approved" in d or "granted" in d:
-            approved += 1
-        elif "refused" in d:
-            refused += 1
+    def median_decision_days(self):
+        n = sum(self.decision_days.values())
+        if not n:
+            return None
+        lo_rank, hi_rank = (n - 1) // 2, n // 2
+        lo = None
+        seen = 0
+        for days in sorted(self.decision_days):
+            seen += self.decision_days[days]
+            if lo is None and seen > lo_rank:
+                lo = days
+            if seen > hi_rank:
+                return lo if lo_rank == hi_rank else (lo + days) / 2
 
-        # IMPORTANT: these are the actual fields in your raw data
-        start_dt = parse_date(a.get("application_date"))
-        end_dt   = parse_date(a.get("decided_date"))
+    def result(self):
+        decided_n = self.approved + self.refused
+        return {
+            "apps_total": self.total,
+            "apps_decided": decided_n,
+            "approval_rate": (self.approved / decided_n) if decided_n else None,
+            "median_decision_days": self.median_decision_days(),
+            "commercial_apps": self.commercial
+        }
+
+def fetch_council(client, council):
+    cid = council.get("council_id")
+    features = FeatureAggregator()
+    for items in iter_app_pages(client, cid):
+        features.add(items)  # each page is dropped once counted
+    return {
+        "council_id": cid,
+        "council_name": council.get("council_name"),
+        **features.result()
+    }
+
+
+class Checkpoint:
+    """
+    Append-only JSONL of finished council rows.
+
+    The first line records the feature window; a checkpoint written for a
+    different window is discarded. Every row is flushed and fsynced before the
+    council counts as done, and a torn last line from a crash is ignored.
+    """
+
+    def __init__(self, path, window):
+        self.path = path
+        self.window = window
+        self.rows = {}
+        self._lock = threading.Lock()
+        self._torn_tail = False
+
+    def load(self):
+        self.rows = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = ""
+        lines = text.splitlines()
+        self._torn_tail = bool(text) and not text.endswith("\n")
 
-        if start_dt and end_dt and end_dt >= start_dt:
-            decision_days.append((end_dt - start_dt).days)
+        header = None
+        if lines:
+            try:
+                header = json.loads(lines[0])
+            except ValueError:
+                pass
+        if not header or header.get("window") != self.window:
+            self.reset()
+            return self.rows
 
-    decided_n = approved + refused
+        for line in lines[1:]:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            self.rows[row["council_id"]] = row
+        return self.rows
 
+    def reset(self):
+        self.rows = {}
+        self._torn_tail = False
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"window": self.window}) + "\n")
+
+    def add(self, row):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                if self._torn_tail:  # never append to a half-written line
+                    f.write("\n")
+                    self._torn_tail = False
+                f.write(json.dumps(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.rows[row["council_id"]] = row
+
+
+def feature_window():
     return {
-        "apps_total": len(apps),
-        "apps_decided": decided_n,
-        "approval_rate": (approved / decided_n) if decided_n else None,
-        "median_decision_days": statistics.median(decision_days) if decision_days else None,
-        "commercial_apps": commercial
+        "date_from": DATE_FROM,
+        "date_to": DATE_TO,
+        "date_range_type": DATE_RANGE_TYPE,
+        "page_size": PAGE_SIZE,
+        "max_pages": MAX_PAGES,
     }
 
-def main():
-    councils_path = os.path.join(BASE_DIR, COUNCILS_JSON)
-    councils = json.load(open(councils_path, "r", encoding="utf-8"))
-
-    out_csv = os.path.join(BASE_DIR, "ibex_features_by_council.csv")
-
-    with open(out_csv, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "council_id", "council_name",
-                "apps_total", "apps_decided", "approval_rate",
-                "median_decision_days", "commercial_apps"
-            ]
-        )
+def write_features_csv(out_csv, councils, rows):
+    """Write finished councils in ibex_council_ids.json order; atomic replace."""
+    tmp = f"{out_csv}.{os.getpid()}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
         writer.writeheader()
+        for c in councils:
+            row = rows.get(c.get("council_id"))
+            if row is not None:
+                writer.writerow({k: row.get(k) for k in FIELDNAMES})
+    os.replace(tmp, out_csv)
+
+def fetch_councils(
+    councils,
+    out_csv,
+    checkpoint_path=None,
+    host=IBEX_HOST,
+    workers=MAX_WORKERS,
+    rate=REQUESTS_PER_SECOND,
+    restart=False,
+    client=None,
+    cache=None,
+):
+    """
+    Fetch every council not yet in the checkpoint and rebuild ``out_csv``.
+
+    All workers share ``client`` (default: ``make_client(host, workers, rate,
+    cache=cache)``, closed at the end). Returns ``(n_fetched, failed)`` where ``failed`` lists ``(council_id,
+    error)`` for councils that will be retried on the next run.
+    """
+    checkpoint = Checkpoint(checkpoint_path or out_csv.replace(".csv", ".checkpoint.jsonl"), feature_window())
+    if restart:
+        checkpoint.reset()
+    else:
+        checkpoint.load()
+
+    todo = [c for c in councils if c.get("council_id") not in checkpoint.rows]
+    if len(todo) < len(councils):
+        print(f"Resuming: {len(councils) - len(todo)} of {len(councils)} councils already in the checkpoint")
+
+    own_client = client is None
+    if own_client:
+        client = make_client(host, workers, rate, cache=cache)
+    failed = []
+    done = 0
+    t0 = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_council, client, c): c for c in todo}
+        try:
+            for fut in as_completed(futures):
+                c = futures[fut]
+                cid, cname = c.get("council_id"), c.get("council_name")
+                try:
+                    row = fut.result()
+                except SystemExit:
+                    raise
+                except Exception as e:
+                    failed.append((cid, e))
+                    print(f"  ✗ Council {cid} - {cname}: {e}")
+                    continue
+                checkpoint.add(row)
+                done += 1
+                rate_now = done / max(time.perf_counter() - t0, 1e-9)
+                print(f"[{done}/{len(todo)}] Council {cid} - {cname}: {row['apps_total']} apps ({rate_now:.2f} councils/s)")
+        except BaseException:
+            # Auth/bad-request errors (or Ctrl+C) stop the run; what finished is kept
+            for f in futures:
+                f.cancel()
+            write_features_csv(out_csv, councils, checkpoint.rows)
+            raise
+        finally:
+            if own_client:
+                client.close()
 
-        for i, c in enumerate(councils, start=1):
-            cid = c.get("council_id")
-            cname = c.get("council_name")
-            print(f"[{i}/{len(councils)}] Council {cid} - {cname}")
+    write_features_csv(out_csv, councils, checkpoint.rows)
+    return done, failed
 
-            apps = fetch_all_apps(cid)
-            feats = compute_features(apps)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch IBEX features for every council, resumably.")
+    parser.add_argument("--councils", default=os.path.join(BASE_DIR, COUNCILS_JSON))
+    parser.add_argument("--out", default=os.path.join(BASE_DIR, "ibex_features_by_council.csv"))
+    parser.add_argument("--host", default=IBEX_HOST)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="Requests/sec to the host")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore the checkpoint and recompute every council (pages still come from the cache)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Raw page cache (see ibex_cache.py)")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch pages from the API")
+    parser.add_argument("--open-max-age", type=float, default=OPEN_WINDOW_MAX_AGE / 3600,
+                        help="Hours before a page of a still-open date window is refetched")
+    args = parser.parse_args(argv)
 
-            row = {
-                "council_id": cid,
-                "council_name": cname,
-                **feats
-            }
-            writer.writerow(row)
+    councils = json.load(open(args.councils, "r", encoding="utf-8"))
+    cache = None if args.no_cache else PageCache(args.cache_dir, open_max_age=args.open_max_age * 3600)
+    done, failed = fetch_councils(
+        councils, args.out, host=args.host, workers=args.workers, rate=args.rate, restart=args.restart,
+        cache=cache,
+    )
 
-    print("Saved:", out_csv)
+    if cache is not None:
+        print(f"Page cache: {cache.hits} hit(s), {cache.misses} fetched ({args.cache_dir})")
+    print("Saved:", args.out)
+    if failed:
+        print(f"{len(failed)} council(s) failed and will be retried on the next run:",
+              ", ".join(str(cid) for cid, _ in failed))
+        raise SystemExit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
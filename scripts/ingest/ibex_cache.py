@@ -0,0 +1,102 @@
+"""
+On-disk cache of raw IBEX /applications pages.
+
+Each page is stored as gzip-compressed JSONL under a content-addressed name:
+the SHA-256 of its request (host, council_id, date window, date_range_type,
+page, page_size). The first line is a header with the request and the fetch
+time, and each following line is one application. Recomputing features after
+a change to the feature logic then re-reads pages from disk instead of the
+API.
+
+A page is fresh when:
+  - the window had already closed (DATE_TO before the fetch day) when it was
+    fetched. Such pages are kept for ``closed_max_age`` seconds (default:
+    forever), because applications can still be decided after their window.
+  - the window was still open when it was fetched and the page is younger than
+    ``open_max_age`` (default one day).
+Stale, missing or unreadable pages are fetched again and atomically
+replaced.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ibex_cache")
+
+OPEN_WINDOW_MAX_AGE = 24 * 3600
+
+
+class PageCache:
+    def __init__(self, root=CACHE_DIR, open_max_age=OPEN_WINDOW_MAX_AGE, closed_max_age=None):
+        self.root = root
+        self.open_max_age = open_max_age
+        self.closed_max_age = closed_max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request):
+        blob = json.dumps(request, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def path(self, request):
+        k = self.key(request)
+        return os.path.join(self.root, k[:2], f"{k}.jsonl.gz")
+
+    def is_fresh(self, header, now=None):
+        now = time.time() if now is None else now
+        fetched_at = header["fetched_at"]
+        age = now - fetched_at
+        try:
+            closed = date.fromisoformat(str(header["request"].get("date_to"))[:10]) < \
+                datetime.fromtimestamp(fetched_at).date()
+        except ValueError:
+            closed = False
+        if closed:
+            return self.closed_max_age is None or age < self.closed_max_age
+        return age < self.open_max_age
+
+    def get(self, request):
+        """Cached items for ``request``, or None when missing or stale."""
+        path = self.path(request)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if header.get("request") != request or not self.is_fresh(header):
+                    items = None
+                else:
+                    items = [json.loads(line) for line in f]
+                    if len(items) != header.get("n"):
+                        items = None
+        except (OSError, EOFError, ValueError, KeyError):
+            items = None
+        with self._lock:
+            if items is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return items
+
+    def put(self, request, items, fetched_at=None):
+        path = self.path(request)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = {
+            "request": request,
+            "fetched_at": time.time() if fetched_at is None else fetched_at,
+            "n": len(items),
+        }
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            for item in items:
+                f.write(json.dumps(item) + "\n")
+        os.replace(tmp, path)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
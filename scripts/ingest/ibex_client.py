@@ -0,0 +1,180 @@
+"""
+Shared client for the IBEX planning API (POST /applications).
+
+One IbexClient keeps a requests.Session with a keep-alive connection pool, so
+thousands of page calls reuse a handful of TCP/TLS connections, and reads the
+JWT once (IBEX_JWT env var, else ibex_jwt.txt next to this file). On a 401 it
+re-reads the token once, in case it was rotated on disk, and retries; a
+second 401 (or a 403) stops the run. 429 / 5xx / connection errors are retried
+with backoff, honouring Retry-After, and every request can go through a
+shared rate limiter (see rate_limit.py). Pages can be served from a local
+PageCache (ibex_cache.py) so re-runs only fetch new or stale pages.
+
+The client is safe to share between threads; size ``pool_size`` to the number
+of workers so none of them waits for a connection.
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+IBEX_HOST = "https://ibex.seractech.co.uk"
+JWT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ibex_jwt.txt")
+
+MAX_RETRIES = 5
+
+
+def extract_items(resp):
+    if isinstance(resp, list):
+        return resp
+    if isinstance(resp, dict):
+        for k in ("items", "results", "applications", "data"):
+            if k in resp and isinstance(resp[k], list):
+                return resp[k]
+    return []
+
+
+def retry_delay(attempt, response=None):
+    """Seconds to wait before retry ``attempt`` (Retry-After when the server sends one)."""
+    if response is not None:
+        try:
+            return max(0.0, float(response.headers.get("Retry-After", "")))
+        except ValueError:
+            pass
+    return min(30.0, 0.5 * 2 ** attempt)
+
+
+class IbexClient:
+    def __init__(
+        self,
+        host=IBEX_HOST,
+        jwt_path=JWT_PATH,
+        limiter=None,
+        max_retries=MAX_RETRIES,
+        timeout=60,
+        pool_size=16,
+        cache=None,
+    ):
+        self.host = host.rstrip("/")
+        self.cache = cache
+        self.jwt_path = jwt_path
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        self._token = None
+        self._token_lock = threading.Lock()
+        self.token_loads = 0
+        self.requests_sent = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _load_token(self):
+        self.token_loads += 1
+        token = os.getenv("IBEX_JWT", "").strip()
+        if token:
+            return token
+        with open(self.jwt_path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+
+    @property
+    def token(self):
+        with self._token_lock:
+            if self._token is None:
+                self._token = self._load_token()
+            return self._token
+
+    def refresh_token(self, rejected):
+        """Re-read the token unless another thread already replaced ``rejected``; True if it changed."""
+        with self._token_lock:
+            if self._token == rejected:
+                self._token = self._load_token()
+            return self._token != rejected
+
+    def post(self, path, payload):
+        url = f"{self.host}/{path.lstrip('/')}"
+        refreshed = False
+        attempt = 0
+        while True:
+            token = self.token
+            if self.limiter is not None:
+                self.limiter.acquire(url)
+            try:
+                self.requests_sent += 1
+                r = self.session.post(
+                    url, headers={"Authorization": f"Bearer {token}"}, json=payload, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(retry_delay(attempt))
+                attempt += 1
+                continue
+
+            if r.status_code == 401 and not refreshed:
+                refreshed = True
+                if self.refresh_token(token):
+                    continue
+            if r.status_code in (401, 403):
+                raise SystemExit(f"Auth error {r.status_code}: {r.text}")
+            if r.status_code == 400:
+                raise SystemExit(f"Bad request 400: {r.text}")
+            if (r.status_code == 429 or r.status_code >= 500) and attempt < self.max_retries:
+                time.sleep(retry_delay(attempt, r))
+                attempt += 1
+                continue
+
+            r.raise_for_status()
+            return r.json()
+
+    def applications(self, page, page_size, date_from, date_to, council_id=None, date_range_type=None):
+        """
+        The items of one page of /applications; ``council_id`` /
+        ``date_range_type`` are optional filters.
+
+        With a ``cache`` (see ibex_cache.PageCache) a fresh cached page is
+        returned without calling the API.
+        """
+        payload = {
+            "date_from": date_from,
+            "date_to": date_to,
+            "page": page,
+            "page_size": page_size,
+        }
+        if date_range_type is not None:
+            payload["date_range_type"] = date_range_type
+        if council_id is not None:
+            payload["council_id"] = [council_id]
+        if self.cache is None:
+            return extract_items(self.post("/applications", {"input": payload}))
+
+        request = {"host": self.host, **payload}
+        items = self.cache.get(request)
+        if items is None:
+            items = extract_items(self.post("/applications", {"input": payload}))
+            self.cache.put(request, items)
+        return items
+
+    def iter_pages(self, max_pages, page_size, **filters):
+        """Yield the items of each page until an empty or short page (or ``max_pages``)."""
+        for page in range(1, max_pages + 1):
+            items = self.applications(page, page_size, **filters)
+            if not items:
+                return
+            yield items
+            if len(items) < page_size:
+                return
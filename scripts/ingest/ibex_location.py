@@ -2,10 +2,9 @@ import os
 import json
 import statistics
 from datetime import datetime
-import requests
 
-IBEX_HOST = "https://ibex.seractech.co.uk"
-JWT_PATH = "ibex_jwt.txt"
+from ibex_cache import PageCache
+from ibex_client import IBEX_HOST, IbexClient
 
 COUNCIL_ID = 10
 DATE_FROM = "2025-04-01"
@@ -24,41 +23,10 @@ def parse_date(x):
     except Exception:
         return None
 
-def load_jwt():
-    return open(os.path.join(BASE_DIR, JWT_PATH), "r", encoding="utf-8").read().strip()
-
-def call_applications(page: int):
-    jwt = load_jwt()
-    headers = {"Authorization": f"Bearer {jwt}", "Content-Type": "application/json"}
-
-    payload = {
-        "input": {
-            "date_range_type": DATE_RANGE_TYPE,
-            "date_to": DATE_TO,
-            "date_from": DATE_FROM,
-            "council_id": [COUNCIL_ID],
-            "page": page,
-            "page_size": PAGE_SIZE
-        }
-    }
-
-    r = requests.post(f"{IBEX_HOST}/applications", headers=headers, json=payload, timeout=60)
-
-    print("HTTP:", r.status_code)
-    if r.status_code != 200:
-        print("Response text:", r.text[:500])
-    r.raise_for_status()
-
-    return r.json()
-
-def extract_items(resp):
-    if isinstance(resp, list):
-        return resp
-    if isinstance(resp, dict):
-        for k in ("items", "results", "applications", "data"):
-            if k in resp and isinstance(resp[k], list):
-                return resp[k]
-    return []
+def call_applications(client: IbexClient, page: int):
+    return client.applications(
+        page, PAGE_SIZE, DATE_FROM, DATE_TO, council_id=COUNCIL_ID, date_range_type=DATE_RANGE_TYPE
+    )
 
 def compute_features(apps):
     approved = 0
@@ -105,15 +73,15 @@ def main():
     print("WROTE:", test_path)
 
     all_apps = []
-    for page in range(1, MAX_PAGES + 1):
-        resp = call_applications(page)
-        items = extract_items(resp)
-        print("PAGE", page, "ITEMS", len(items))
-        if not items:
-            break
-        all_apps.extend(items)
-        if len(items) < PAGE_SIZE:
-            break
+    with IbexClient(IBEX_HOST, cache=PageCache()) as client:
+        for page in range(1, MAX_PAGES + 1):
+            items = call_applications(client, page)
+            print("PAGE", page, "ITEMS", len(items))
+            if not items:
+                break
+            all_apps.extend(items)
+            if len(items) < PAGE_SIZE:
+                break
 
     feats = compute_features(all_apps)
     print("FEATURES:", json.dumps(feats, indent=2))
@@ -0,0 +1,108 @@
+"""
+Thread-safe rate limiting for the ingest scripts.
+
+TokenBucket allows ``rate`` requests per second with bursts of up to ``burst``;
+``acquire()`` blocks until a token is free. HostRateLimiter keeps one bucket
+per host so concurrent workers never exceed an API's limit however many
+councils or date ranges they are fetching in parallel. AdaptiveTokenBucket
+also reacts to the server: a 429 halves its rate and pauses every worker for
+the Retry-After period, and each success wins back a little of the rate.
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller of acquire() for ``seconds`` from now."""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self) -> float:
+        """Take one token, sleeping as long as needed; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                    self._updated = self._paused_until
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    TokenBucket whose rate follows the server (additive increase, multiplicative decrease).
+
+    ``throttled(retry_after)`` halves the rate, down to ``min_rate``, and pauses
+    all callers for ``retry_after`` seconds. ``succeeded()`` raises the rate by
+    ``recovery * max_rate``, up to the configured ``rate``.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = None, recovery: float = 0.05):
+        super().__init__(rate, burst)
+        self.max_rate = self.rate
+        self.min_rate = min(self.rate, min_rate or self.rate / 16)
+        self.recovery = recovery
+        self.throttle_count = 0
+
+    def throttled(self, retry_after: float = None) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.throttle_count += 1
+        if retry_after:
+            self.pause(retry_after)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.recovery * self.max_rate)
+
+
+class HostRateLimiter:
+    """One TokenBucket per URL host, created on first use."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url) -> TokenBucket:
+        host = urlsplit(url).netloc or url
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def acquire(self, url) -> float:
+        return self.bucket(url).acquire()
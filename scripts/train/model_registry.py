@@ -0,0 +1,53 @@
+"""
+Inspect and manage the model registry (models/registry/, regionmatch/registry.py).
+
+Usage:
+    python scripts/train/model_registry.py list
+    python scripts/train/model_registry.py activate v0002    # roll back / forward
+    python scripts/train/model_registry.py import-legacy     # publish models/*.joblib as a version
+
+A running app picks up the activated version on its next rerun.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import joblib
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from regionmatch.incremental import SufficientStats
+from regionmatch.registry import REGISTRY_DIR, current_version, get, publish, set_current, versions
+
+parser = argparse.ArgumentParser(description="Inspect and manage published model versions.")
+sub = parser.add_subparsers(dest="command", required=True)
+sub.add_parser("list", help="Published versions with their metrics")
+activate = sub.add_parser("activate", help="Point CURRENT at a published version")
+activate.add_argument("version")
+sub.add_parser("import-legacy", help="Publish the legacy models/ files as a new current version")
+args = parser.parse_args()
+
+if args.command == "list":
+    active = current_version(REGISTRY_DIR)
+    if not versions(REGISTRY_DIR):
+        print(f"No published versions in {REGISTRY_DIR}; the app uses the legacy files in models/")
+    for name in versions(REGISTRY_DIR):
+        manifest = get(name, REGISTRY_DIR).manifest()
+        metrics = ", ".join(
+            f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in manifest.get("metrics", {}).items() if not isinstance(v, list)
+        )
+        print(f"{'*' if name == active else ' '} {name}  {manifest.get('created', '')}  "
+              f"{manifest.get('model', '?'):18s} {manifest.get('n_features', '?')} features  {metrics}")
+elif args.command == "activate":
+    set_current(args.version, REGISTRY_DIR)
+    print(f"✓ CURRENT -> {args.version}")
+else:
+    legacy = get(None)
+    pipeline = joblib.load(legacy.model_path)
+    features = joblib.load(legacy.features_path)
+    model_version = publish(pipeline, features, stats=SufficientStats.load(legacy.stats_path),
+                            source=str(legacy.model_path.relative_to(REPO_ROOT)))
+    print(f"✓ Published {legacy.model_path} as {model_version.version} (now current)")
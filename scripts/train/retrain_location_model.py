@@ -4,11 +4,20 @@ Retrain the location model using training_data_geo.csv
 This script:
 1. Loads the training data with geo features
 2. Selects appropriate features (excludes identifiers, locations, and target)
-3. Trains a scikit-learn Pipeline with Ridge regression
+3. Trains a scikit-learn Pipeline with Ridge regression, picking alpha on
+   the Ridge path: one SVD of the standardised features gives the exact
+   leave-one-out (or GCV) error for every alpha on the grid in closed form
+   (regionmatch/ridge_path.py)
 4. Evaluates with cross-validation and test split
-5. Saves the retrained model and feature list to models/
+5. Publishes the model, feature list, metrics and the sufficient statistics
+   for incremental updates (scripts/train/update_location_model.py) as a new
+   version in the model registry (models/registry/) and makes it current
+
+Pass --alpha to train at a fixed alpha instead.
 """
 
+import argparse
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.pipeline import Pipeline
@@ -17,18 +26,29 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import Ridge
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import joblib
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from regionmatch.incremental import SufficientStats
+from regionmatch.registry import publish
+from regionmatch.ridge_path import ALPHAS, CRITERIA, fit_ridge_path
+
+parser = argparse.ArgumentParser(description="Retrain the Ridge location model.")
+parser.add_argument("--alpha", type=float, default=None, help="Fixed Ridge alpha (skips the alpha path)")
+parser.add_argument("--criterion", choices=CRITERIA, default="loo",
+                    help="Closed-form error used to pick alpha: leave-one-out or generalised CV")
+args = parser.parse_args()
+
 # ============================================================
 # SETUP
 # ============================================================
 REPO_ROOT = Path(__file__).resolve().parents[2]  # Go up 2 levels from scripts/train/
 DATA_PATH = REPO_ROOT / "data" / "processed" / "training_data_geo.csv"
-MODEL_SAVE_PATH = REPO_ROOT / "models" / "location_model.joblib"
-FEATURES_SAVE_PATH = REPO_ROOT / "models" / "model_features.joblib"
+REGISTRY_PATH = REPO_ROOT / "models" / "registry"
+PATH_SAVE_PATH = REPO_ROOT / "data" / "outputs" / "ridge_path.csv"
 
 print("=" * 70)
 print("LOCATION MODEL RETRAINING SCRIPT")
@@ -99,16 +119,22 @@ print(f"✓ Train set: {len(X_train)} samples | Test set: {len(X_test)} samples"
 # ============================================================
 print(f"\n[4/5] Building and training pipeline...")
 
-pipeline = Pipeline([
-    ('imputer', SimpleImputer(strategy='median')),
-    ('scaler', StandardScaler()),
-    ('model', Ridge(alpha=1.0, random_state=42))
-])
-
 # Train on full data for final model
 print(f"  Training on full dataset ({len(X)} samples)...")
-pipeline.fit(X, y)
-print(f"✓ Pipeline trained")
+if args.alpha is None:
+    pipeline, alpha, path_table = fit_ridge_path(X, y, ALPHAS, args.criterion)
+    PATH_SAVE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    path_table.to_csv(PATH_SAVE_PATH, index=False)
+    print(f"  Alpha path ({len(path_table)} alphas) saved to {PATH_SAVE_PATH}")
+else:
+    alpha = args.alpha
+    pipeline = Pipeline([
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler()),
+        ('model', Ridge(alpha=alpha, random_state=42))
+    ])
+    pipeline.fit(X, y)
+print(f"✓ Pipeline trained (alpha={alpha:.4g})")
 
 # ============================================================
 # EVALUATION
@@ -147,27 +173,34 @@ print(f"    RMSE:      {test_rmse:.6f}")
 print(f"    MAE:       {test_mae:.6f}")
 
 # ============================================================
-# SAVE MODEL & FEATURES
+# PUBLISH MODEL & FEATURES
 # ============================================================
-print(f"\n[SAVING] Storing model and features...")
-
-# Save pipeline
-joblib.dump(pipeline, MODEL_SAVE_PATH)
-print(f"✓ Model saved to {MODEL_SAVE_PATH}")
-
-# Save feature list
-joblib.dump(feature_cols, FEATURES_SAVE_PATH)
-print(f"✓ Features saved to {FEATURES_SAVE_PATH}")
+print(f"\n[SAVING] Publishing model and features...")
+
+# Sufficient statistics of the training rows, for update_location_model.py
+stats = SufficientStats.from_rows(pipeline, df.loc[X.index, 'lad_code'], X, y, feature_cols)
+metrics = {
+    'alpha': alpha,
+    'train_rows': len(X),
+    'cv_r2_mean': cv_scores.mean(),
+    'cv_r2_std': cv_scores.std(),
+    'test_r2': test_r2,
+    'test_rmse': test_rmse,
+    'test_mae': test_mae,
+}
+model_version = publish(pipeline, feature_cols, metrics, stats=stats,
+                        source="scripts/train/retrain_location_model.py", registry_dir=REGISTRY_PATH)
+print(f"✓ Published model version {model_version.version} to {model_version.directory} (now current)")
 
 print("\n" + "=" * 70)
 print("RETRAINING COMPLETE")
 print("=" * 70)
 print(f"\nSummary:")
-print(f"  • Model: Ridge Regression (alpha=1.0)")
+print(f"  • Model: Ridge Regression (alpha={alpha:.4g})")
 print(f"  • Features: {len(feature_cols)}")
 print(f"  • Training samples: {len(X)}")
 print(f"  • Test R² Score: {test_r2:.6f}")
 print(f"  • CV Mean R²: {cv_scores.mean():.6f}")
-print(f"\nNext: Restart the Streamlit app to use the new model:")
-print(f"  python -m streamlit run app/app.py")
+print(f"  • Model version: {model_version.version}")
+print(f"\nA running app switches to the new version on its next rerun.")
 print("=" * 70)
@@ -9,30 +9,51 @@ This script trains multiple regression models on training_data_geo.csv:
 - Random Forest (ensemble method)
 - Gradient Boosting (ensemble method)
 
-Compares performance and saves the best model.
+All candidate x fold fits share precomputed CV folds and per-fold
+imputer/scaler transforms and run in one process pool
+(regionmatch/model_selection.py). Compares accuracy, fit time and predict
+latency (table in data/outputs/model_selection.csv) and publishes the best
+model as a new, current version in the model registry (models/registry/).
+
+With --search, the training split is first searched with successive halving
+(regionmatch/search.py, trials logged to data/cache/search/ so an interrupted
+search resumes) and the best tuned configurations are compared alongside the
+defaults below.
 """
 
+import argparse
 import pandas as pd
-import numpy as np
-from sklearn.pipeline import Pipeline
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler
+import sys
 from sklearn.linear_model import LinearRegression, Ridge, Lasso, ElasticNet
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import joblib
+from sklearn.model_selection import train_test_split
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from regionmatch.incremental import SufficientStats, supports
+from regionmatch.model_selection import Candidate, select_models
+from regionmatch.registry import publish
+from regionmatch.search import TRIALS_PATH, TrialStore, make_candidate, successive_halving
+
+parser = argparse.ArgumentParser(description="Train the candidate models and save the best one.")
+parser.add_argument("--search", action="store_true",
+                    help="Tune the candidates with successive halving first; the tuned configs join the comparison")
+parser.add_argument("--configs", type=int, default=30, help="Configurations sampled for --search")
+parser.add_argument("--fresh", action="store_true", help="Discard trials logged by earlier (interrupted) searches")
+args = parser.parse_args()
+
 # ============================================================
 # SETUP
 # ============================================================
 REPO_ROOT = Path(__file__).resolve().parents[2]
 DATA_PATH = REPO_ROOT / "data" / "processed" / "training_data_geo.csv"
-MODEL_SAVE_PATH = REPO_ROOT / "models" / "location_model.joblib"
-FEATURES_SAVE_PATH = REPO_ROOT / "models" / "model_features.joblib"
+REGISTRY_PATH = REPO_ROOT / "models" / "registry"
+RESULTS_SAVE_PATH = REPO_ROOT / "data" / "outputs" / "model_selection.csv"
+N_JOBS = -1  # candidate x fold fits run in parallel on every core
+TUNED_CANDIDATES = 3  # best --search configurations added to the comparison
 
 print("=" * 80)
 print("ADVANCED LOCATION MODEL RETRAINING - MULTIPLE ALGORITHMS")
@@ -84,69 +105,43 @@ print(f"✓ Train: {len(X_train)} | Test: {len(X_test)} samples")
 # ============================================================
 print(f"\n[STEP 4] Training multiple models...")
 
-models = {
-    'Linear Regression': Pipeline([
-        ('imputer', SimpleImputer(strategy='median')),
-        ('scaler', StandardScaler()),
-        ('model', LinearRegression())
-    ]),
-    'Ridge Regression': Pipeline([
-        ('imputer', SimpleImputer(strategy='median')),
-        ('scaler', StandardScaler()),
-        ('model', Ridge(alpha=1.0, random_state=42))
-    ]),
-    'Lasso Regression': Pipeline([
-        ('imputer', SimpleImputer(strategy='median')),
-        ('scaler', StandardScaler()),
-        ('model', Lasso(alpha=0.001, random_state=42, max_iter=5000))
-    ]),
-    'Elastic Net': Pipeline([
-        ('imputer', SimpleImputer(strategy='median')),
-        ('scaler', StandardScaler()),
-        ('model', ElasticNet(alpha=0.005, l1_ratio=0.5, random_state=42, max_iter=5000))
-    ]),
-    'Random Forest': Pipeline([
-        ('imputer', SimpleImputer(strategy='median')),
-        ('model', RandomForestRegressor(n_estimators=200, max_depth=20, random_state=42, n_jobs=-1))
-    ]),
-    'Gradient Boosting': Pipeline([
-        ('imputer', SimpleImputer(strategy='median')),
-        ('model', GradientBoostingRegressor(n_estimators=150, learning_rate=0.1, max_depth=5, random_state=42))
-    ])
-}
-
-results = {}
-
-for name, pipeline in models.items():
-    print(f"\n  Training {name}...")
-    
-    # Train
-    pipeline.fit(X_train, y_train)
-    
-    # Cross-validation
-    cv_scores = cross_val_score(pipeline, X, y, cv=5, scoring='r2', n_jobs=-1)
-    
-    # Test predictions
-    y_pred_test = pipeline.predict(X_test)
-    
-    # Metrics
-    test_r2 = r2_score(y_test, y_pred_test)
-    test_rmse = np.sqrt(mean_squared_error(y_test, y_pred_test))
-    test_mae = mean_absolute_error(y_test, y_pred_test)
-    
-    results[name] = {
-        'pipeline': pipeline,
-        'cv_mean': cv_scores.mean(),
-        'cv_std': cv_scores.std(),
-        'test_r2': test_r2,
-        'test_rmse': test_rmse,
-        'test_mae': test_mae
-    }
-    
-    print(f"    ✓ CV R² (mean): {cv_scores.mean():.6f} ± {cv_scores.std():.6f}")
-    print(f"    ✓ Test R²: {test_r2:.6f}")
-    print(f"    ✓ Test RMSE: {test_rmse:.6f}")
-    print(f"    ✓ Test MAE: {test_mae:.6f}")
+# Each candidate runs behind a median imputer (+ StandardScaler when scale=True)
+candidates = [
+    Candidate('Linear Regression', LinearRegression()),
+    Candidate('Ridge Regression', Ridge(alpha=1.0, random_state=42)),
+    Candidate('Lasso Regression', Lasso(alpha=0.001, random_state=42, max_iter=5000)),
+    Candidate('Elastic Net', ElasticNet(alpha=0.005, l1_ratio=0.5, random_state=42, max_iter=5000)),
+    Candidate('Random Forest',
+              RandomForestRegressor(n_estimators=200, max_depth=20, random_state=42, n_jobs=-1), scale=False),
+    Candidate('Gradient Boosting',
+              GradientBoostingRegressor(n_estimators=150, learning_rate=0.1, max_depth=5, random_state=42), scale=False),
+]
+
+if args.search:
+    print(f"\n  Searching {args.configs} configurations (successive halving on the training split)...")
+    if args.fresh and TRIALS_PATH.exists():
+        TRIALS_PATH.unlink()
+    store = TrialStore(TRIALS_PATH)
+    search = successive_halving(X_train, y_train, n_configs=args.configs, n_jobs=N_JOBS, store=store)
+    print(f"  ✓ {len(search.trials)} rung results, {store.replayed} trials replayed from {TRIALS_PATH}")
+    candidates += [make_candidate(family, params) for family, params in search.best[:TUNED_CANDIDATES]]
+
+# One process pool for every candidate x fold fit, over shared 5-fold indices
+table, pipelines = select_models(
+    candidates, X, y, X.index.get_indexer(X_train.index), X.index.get_indexer(X_test.index), cv=5, n_jobs=N_JOBS
+)
+
+for _, row in table.iterrows():
+    print(f"\n  {row['model']}")
+    print(f"    ✓ CV R² (mean): {row['cv_mean']:.6f} ± {row['cv_std']:.6f}")
+    print(f"    ✓ Test R²: {row['test_r2']:.6f}")
+    print(f"    ✓ Test RMSE: {row['test_rmse']:.6f}")
+    print(f"    ✓ Test MAE: {row['test_mae']:.6f}")
+    print(f"    ✓ Fit: {row['fit_seconds']:.3f} s | Predict: {row['predict_us_per_row']:.1f} µs/row, "
+          f"{row['predict_ms_single']:.2f} ms single")
+
+RESULTS_SAVE_PATH.parent.mkdir(parents=True, exist_ok=True)
+table.to_csv(RESULTS_SAVE_PATH, index=False)
 
 # ============================================================
 # COMPARE & SELECT BEST
@@ -155,29 +150,36 @@ print(f"\n[STEP 5] Comparing model performance...")
 print("\nModel Rankings (by Test R²):")
 print("-" * 80)
 
-sorted_models = sorted(results.items(), key=lambda x: x[1]['test_r2'], reverse=True)
-
-for rank, (name, metrics) in enumerate(sorted_models, 1):
-    print(f"{rank}. {name:25s} | R²: {metrics['test_r2']:.6f} | RMSE: {metrics['test_rmse']:.6f}")
+print(table.to_string(index=False, float_format=lambda v: f"{v:.6f}"))
 
-best_name, best_metrics = sorted_models[0]
+best_metrics = table.iloc[0]
+best_name = best_metrics['model']
 print("-" * 80)
 print(f"\n✓ BEST MODEL: {best_name}")
 print(f"  Test R² Score: {best_metrics['test_r2']:.6f}")
 print(f"  Test RMSE: {best_metrics['test_rmse']:.6f}")
 print(f"  CV R² (mean): {best_metrics['cv_mean']:.6f}")
+print(f"  Results table saved to {RESULTS_SAVE_PATH}")
 
 # ============================================================
 # SAVE BEST MODEL
 # ============================================================
-print(f"\n[STEP 6] Saving best model...")
+print(f"\n[STEP 6] Publishing best model...")
+
+best_pipeline = pipelines[best_name]
 
-best_pipeline = best_metrics['pipeline']
-joblib.dump(best_pipeline, MODEL_SAVE_PATH)
-joblib.dump(feature_cols, FEATURES_SAVE_PATH)
+# Sufficient statistics of the training split, for update_location_model.py
+stats = None
+if supports(best_pipeline):
+    stats = SufficientStats.from_rows(best_pipeline, df.loc[X_train.index, 'lad_code'], X_train, y_train, feature_cols)
 
-print(f"✓ Model saved to {MODEL_SAVE_PATH}")
-print(f"✓ Features saved to {FEATURES_SAVE_PATH}")
+metrics = {'algorithm': best_name, 'train_rows': len(X_train)}
+metrics.update({k: best_metrics[k] for k in ['cv_mean', 'cv_std', 'test_r2', 'test_rmse', 'test_mae']})
+model_version = publish(best_pipeline, feature_cols, metrics, stats=stats,
+                        source="scripts/train/retrain_model_advanced.py", registry_dir=REGISTRY_PATH)
+print(f"✓ Published model version {model_version.version} to {model_version.directory} (now current)")
+if stats is not None:
+    print(f"  with incremental-update statistics for {stats.n} rows")
 
 # ============================================================
 # SUMMARY
@@ -192,9 +194,8 @@ print(f"  • Training samples: {len(X)}")
 print(f"  • Test R² Score: {best_metrics['test_r2']:.6f}")
 print(f"  • Test RMSE: {best_metrics['test_rmse']:.6f}")
 print(f"  • CV Mean R²: {best_metrics['cv_mean']:.6f}")
-print(f"\nModels tested: {len(models)}")
-for i, (name, metrics) in enumerate(sorted_models, 1):
-    print(f"  {i}. {name:25s} (R²: {metrics['test_r2']:.6f})")
-print(f"\nTo use the new model, restart the Streamlit app:")
-print(f"  python -m streamlit run app/app.py")
+print(f"\nModels tested: {len(candidates)}")
+for i, row in enumerate(table.itertuples(), 1):
+    print(f"  {i}. {row.model:25s} (R²: {row.test_r2:.6f})")
+print(f"\nA running app switches to model version {model_version.version} on its next rerun.")
 print("=" * 80)
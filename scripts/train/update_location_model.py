@@ -0,0 +1,98 @@
+"""
+Update the linear location model with new or refreshed LAD rows, without a
+full retrain.
+
+This script:
+1. Loads the current model version from the registry (models/registry/) and
+   the sufficient statistics published with it by the training scripts
+2. Reads each batch CSV (lad_code, the model features and target_score)
+3. Appends new LADs and replaces the rows of LADs already in the stats
+4. Refits the scaler and coefficients from the updated statistics
+   (regionmatch/incremental.py) and publishes the result, with its
+   statistics, as a new current version
+
+The imputer's medians and the model's hyperparameters are kept; rerun a
+training script to revisit those. Use --init to build the statistics for a
+model that was saved without them, from the rows of a training table
+(--table, default training_data_geo.csv).
+"""
+
+import argparse
+import sys
+import time
+import numpy as np
+import pandas as pd
+import joblib
+from pathlib import Path
+import warnings
+warnings.filterwarnings('ignore')
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from regionmatch.incremental import COORDINATE_DESCENT, KEY_COLUMN, TARGET_COLUMN, SufficientStats, batch_rows, supports
+from regionmatch.registry import current, publish
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DATA_PATH = REPO_ROOT / "data" / "processed" / "training_data_geo.csv"
+REGISTRY_PATH = REPO_ROOT / "models" / "registry"
+
+parser = argparse.ArgumentParser(description="Apply batches of LAD rows to the linear location model.")
+parser.add_argument("batches", nargs="*", type=Path, help="CSV files with lad_code, the model features and target_score")
+parser.add_argument("--init", action="store_true", help="Build the statistics from the rows of --table first")
+parser.add_argument("--table", type=Path, default=DATA_PATH, help="Training table for --init")
+parser.add_argument("--dry-run", action="store_true", help="Report the update without saving anything")
+args = parser.parse_args()
+
+print("=" * 70)
+print("LOCATION MODEL INCREMENTAL UPDATE")
+print("=" * 70)
+
+model_version = current(REGISTRY_PATH)
+pipeline = joblib.load(model_version.model_path)
+feature_cols = joblib.load(model_version.features_path)
+if not supports(pipeline):
+    raise SystemExit(f"{type(pipeline[-1]).__name__} cannot be updated incrementally; rerun a training script")
+print(f"✓ Model version {model_version.label}: {type(pipeline[-1]).__name__} on {len(feature_cols)} features")
+
+if args.init:
+    table = pd.read_csv(args.table)
+    table = table[table[TARGET_COLUMN].notna()]
+    stats = SufficientStats.from_rows(pipeline, table[KEY_COLUMN], table[feature_cols], table[TARGET_COLUMN], feature_cols)
+    print(f"✓ Statistics built from {len(table)} rows of {args.table}")
+else:
+    stats = SufficientStats.load(model_version.stats_path)
+    if stats is None:
+        raise SystemExit(f"No statistics at {model_version.stats_path}; run with --init or rerun a training script")
+    print(f"✓ Statistics for {stats.n} rows loaded from {model_version.stats_path}")
+
+for batch_path in args.batches:
+    keys, rows = batch_rows(pipeline, feature_cols, pd.read_csv(batch_path))
+    appended, replaced = stats.upsert(keys, rows)
+    print(f"  {batch_path}: {appended} LADs appended, {replaced} replaced")
+
+t0 = time.perf_counter()
+updated = stats.refit(pipeline)
+print(f"✓ Refitted on {stats.n} rows in {1e3 * (time.perf_counter() - t0):.1f} ms")
+
+old_coef = np.ravel(pipeline[-1].coef_) / pipeline.named_steps["scaler"].scale_
+new_coef = np.ravel(updated[-1].coef_) / updated.named_steps["scaler"].scale_
+changes = pd.Series(new_coef - old_coef, index=stats.features)
+print("\n  Largest coefficient changes (per raw feature unit):")
+for name, delta in changes.reindex(changes.abs().sort_values(ascending=False).index).head(5).items():
+    print(f"    {name:35s} {delta:+.6g}")
+
+shift = np.abs(updated[1:].predict(stats.rows[:, :-1]) - pipeline[1:].predict(stats.rows[:, :-1]))
+print(f"\n  Prediction shift on the {stats.n} rows: max {shift.max():.4g}, mean {shift.mean():.4g}")
+if type(pipeline[-1]).__name__ in COORDINATE_DESCENT:
+    print(f"  (the refit converges fully; sklearn stops at tol={pipeline[-1].tol:g}, so with default tolerances"
+          " a refit alone shifts predictions by up to ~0.016 on an unchanged table)")
+
+if args.dry_run:
+    print("\n[DRY RUN] Nothing saved")
+else:
+    metrics = {'train_rows': stats.n, 'batches': [str(p) for p in args.batches]}
+    new_version = publish(updated, feature_cols, metrics, stats=stats, source="scripts/train/update_location_model.py",
+                          parent=model_version.version, registry_dir=REGISTRY_PATH)
+    print(f"\n✓ Published model version {new_version.version} to {new_version.directory} (now current)")
+
+print("=" * 70)